@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Benchmarks of Simulator.run: ticks (time steps) per second and wall time for models of different sizes and settings.
+Results are written as JSON and compared with a stored baseline, so that a slower hot path is noticed.
+
+Usage:
+    python benchmark.py                             run all cases and compare with benchmarks/baseline.json
+    python benchmark.py --quick                     smaller models and fewer ticks
+    python benchmark.py --filter scaling/vector     only cases whose name contains the text
+    python benchmark.py --output results.json       also write the results
+    python benchmark.py --save-baseline             store the results as the new baseline
+The exit status is 1 if a case is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import simulator
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+# fastest (ticks per second) is compared with the baseline; a case is a regression if it is slower than
+# baseline / (1 + TOLERANCE)
+TOLERANCE = 0.25
+IONS = {"cli": 2.03e-7, "ki": 1.96e-7, "nai": 1.33e-7}
+
+
+def build_chain(n, ions=("cli", "ki", "nai"), extra_edges=0, seed=0):
+    """
+    Dendrite of n compartments connected in a chain by Diffusion, with extra_edges edges per compartment between
+    random pairs of compartments.
+
+    :return: list of compartments
+    """
+    from compartment import Compartment
+    from diffusion import Diffusion
+    comp = Compartment("reference", z=-0.85, cli=0.0052, ki=0.0123, nai=0.014, length=10e-5, radius=0.5e-5)
+    comps = [comp] + [comp.copy("dendrite {}".format(i)) for i in range(1, n)]
+    coefficients = {ion: IONS[ion] for ion in ions}
+    if ions:
+        for comp_a, comp_b in zip(comps[:-1], comps[1:]):
+            Diffusion(comp_a, comp_b, dict(coefficients))
+        rng = np.random.default_rng(seed)
+        for _ in range(extra_edges * n if n > 1 else 0):
+            a, b = rng.choice(n, size=2, replace=False)
+            Diffusion(comps[a], comps[b], dict(coefficients))
+    return comps
+
+
+def build_main(nrcomps=7):
+    """
+    Model of main.main (from its steady state without diffusion): a reference compartment with one compartment to
+    its left and nrcomps + 1 to its right, with the reference's anion conductance, kcc2 ramp and charge change on
+    """
+    from compartment import Compartment
+    from diffusion import Diffusion
+    from colormap import Colormap
+    from common import default_radius_short
+    comp = Compartment("reference", z=-0.85, cli=0.0052, ki=0.0123, nai=0.014, length=10e-5,
+                       radius=default_radius_short)
+    compl = comp.copy("dendrite left")
+    compr = [comp.copy("dendrite right {}".format(i + 1)) for i in range(nrcomps + 1)]
+    simulator.Simulator.solve_steady_state()
+    Diffusion(compl, comp, dict(IONS))
+    Diffusion(comp, compr[0], dict(IONS))
+    for comp_a, comp_b in zip(compr[:-1], compr[1:]):
+        Diffusion(comp_a, comp_b, dict(IONS))
+    Colormap("cmap", 0, compr)
+    comp.gx = 1e-8
+    comp.dz = 1e-7
+    comp.jkccup = 1e-12
+    return [compl, comp] + compr
+
+
+def build_grow(nr=3):
+    """
+    Model of main.grow (from its steady state) after nr splits of the growth cone, with the growth cone's anion
+    conductance on
+    """
+    from compartment import Compartment
+    from diffusion import Diffusion
+    from colormap import Colormap
+    from common import default_radius_short
+    comps = [Compartment("initial growth cone", z=-0.85, cli=0.00433925284075134, ki=0.1109567493822927,
+                         nai=0.0255226350779378, length=5e-5, radius=default_radius_short)]
+    simulator.Simulator.solve_steady_state()
+    for i in range(nr + 1):
+        comps.insert(0, comps[0].copy("compartment {}".format(i)))
+        Diffusion(comps[0], comps[1], dict(IONS))
+    Colormap("dendrite", sum(comp.w for comp in comps), comps)
+    comps[0].gx = 1
+    return comps
+
+
+def cases(quick=False):
+    """
+    :param quick: smaller models and fewer ticks
+    :return: list of benchmark cases: dictionaries of the name, model (function and arguments) and run settings
+    """
+    ticks = 200 if quick else 1000
+    sizes = (1, 10, 100, 1000) if quick else (1, 10, 100, 1000, 10000)
+    all_cases = []
+    for engine in ("object", "vector"):
+        for n in sizes:
+            if engine == "object" and n > (100 if quick else 1000):
+                continue
+            # fewer ticks for large models so that each case takes about the same time
+            n_ticks = max(20, min(ticks, ticks * 100 // n))
+            all_cases.append({"name": "scaling/{}/n={}".format(engine, n), "model": (build_chain, {"n": n}),
+                              "engine": engine, "ticks": n_ticks})
+    for extra_edges in (0, 1, 4):
+        all_cases.append({"name": "edges/vector/n=100/extra={}".format(extra_edges),
+                          "model": (build_chain, {"n": 100, "extra_edges": extra_edges}), "engine": "vector",
+                          "ticks": ticks})
+    for ions in (("cli",), ("cli", "ki"), ("cli", "ki", "nai")):
+        for engine in ("object", "vector"):
+            all_cases.append({"name": "ions/{}/n=10/ions={}".format(engine, len(ions)),
+                              "model": (build_chain, {"n": 10, "ions": ions}), "engine": engine, "ticks": ticks})
+    for dt in (1e-6, 1e-3):
+        all_cases.append({"name": "dt/vector/n=10/dt={}".format(dt), "model": (build_chain, {"n": 10}),
+                          "engine": "vector", "ticks": ticks, "dt": dt})
+    for substeps in (1, 10):
+        all_cases.append({"name": "strang/vector/n=100/substeps={}".format(substeps), "model": (build_chain, {"n": 100}),
+                          "engine": "vector", "ticks": ticks, "solver": "strang", "substeps": substeps})
+    # with a tolerance of 1e-6 all compartments of the chain are stepped every tick, with 2e-5 every 4 ticks
+    for tolerance in (1e-6, 2e-5):
+        all_cases.append({"name": "local/vector/n=1000/tolerance={}".format(tolerance),
+                          "model": (build_chain, {"n": 1000}), "engine": "vector", "ticks": ticks,
+                          "solver": "local", "tolerance": tolerance})
+    for every in (1, 10, 100):
+        for collector in ("recorder", "graph"):
+            all_cases.append({"name": "collect/{}/n=10/every={}".format(collector, every),
+                              "model": (build_chain, {"n": 10}), "engine": "vector", "ticks": ticks,
+                              "collect_every": every, "collector": collector})
+    for engine in ("object", "vector"):
+        all_cases.append({"name": "reference/main/{}".format(engine), "model": (build_main, {}), "engine": engine,
+                          "ticks": ticks, "collect_every": 1000, "collector": "graph"})
+        all_cases.append({"name": "reference/grow/{}".format(engine), "model": (build_grow, {}), "engine": engine,
+                          "ticks": ticks, "collect_every": 1000, "collector": "graph"})
+    return all_cases
+
+
+def run_case(case, repeat=3):
+    """
+    Build the case's model in a new Simulator and time a run of its number of ticks, repeat times.
+
+    :return: dictionary of the case's name and settings, compartment and edge counts, and the wall time and ticks per
+    second of the fastest run
+    """
+    from compartment import Compartment
+    from diffusion import Diffusion
+    from recorder import Recorder
+    dt = case.get("dt", 1e-6)
+    ticks = case["ticks"]
+    every = case.get("collect_every")
+    # solver settings of the runs (default: forward Euler)
+    options = {key: case[key] for key in ("solver", "substeps", "tolerance") if key in case}
+    walls = []
+    for _ in range(repeat):
+        simulator.Simulator.dispose()
+        sim = simulator.Simulator(False)
+        function, kwargs = case["model"]
+        with contextlib.redirect_stdout(io.StringIO()), np.errstate(all="ignore"):
+            comps = function(**kwargs)
+        edges = [obj for obj in sim.object_list() if isinstance(obj, Diffusion)]
+        if case.get("collector") == "recorder":
+            recorder = sim.register_recorder(Recorder())
+            recorder.add(sim.time(), "time")
+            for comp in comps:
+                for var in ("cli", "V"):
+                    recorder.add(comp, var)
+        elif case.get("collector") == "graph":
+            graph = sim.gui().add_graph()
+            for comp in comps[:4]:
+                graph.add_ion_conc(comp, "cli").add_voltage(comp)
+        sim.use_engine(case["engine"])
+        interval = dt * every if every else dt * ticks
+        # forward Euler with dt of 1e-6 s is not stable for the reference models (nan appears within a few ticks),
+        # which does not matter for the time taken
+        with contextlib.redirect_stdout(io.StringIO()), np.errstate(all="ignore"):
+            # one tick first, so that binding compartments to the vector engine is not timed
+            sim.run(stop=dt, dt=dt, data_collect_interval=interval, plot_update_interval=dt * ticks,
+                    print_time=False, **options)
+            start = time.perf_counter()
+            sim.run(continuefor=dt * ticks, dt=dt, data_collect_interval=interval, plot_update_interval=dt * ticks,
+                    print_time=False, **options)
+            walls.append(time.perf_counter() - start)
+        if case.get("collector") == "graph":
+            sim.gui().close_graphs()
+        simulator.Simulator.dispose()
+    wall = min(walls)
+    n = sum(isinstance(comp, Compartment) for comp in comps)
+    return {"name": case["name"], "engine": case["engine"], "compartments": n, "edges": len(edges),
+            "ticks": ticks, "dt": dt, "collect_every": every, "collector": case.get("collector"),
+            "solver": case.get("solver"), "substeps": case.get("substeps"), "tolerance": case.get("tolerance"),
+            "wall": wall, "ticks_per_s": ticks / wall, "compartment_ticks_per_s": n * ticks / wall}
+
+
+def environment():
+    """
+    :return: dictionary describing where the benchmarks ran
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "processor": platform.processor(), "system": platform.system()}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    :param results: list of results of run_case
+    :param baseline: list of results of run_case stored earlier
+    :param tolerance: allowed slow-down, relative to the baseline
+    :return: list of (name, ticks per second, baseline ticks per second, ratio, regression) for the cases in both
+    """
+    stored = {result["name"]: result for result in baseline}
+    comparison = []
+    for result in results:
+        if result["name"] in stored:
+            before = stored[result["name"]]["ticks_per_s"]
+            ratio = result["ticks_per_s"] / before
+            comparison.append((result["name"], result["ticks_per_s"], before, ratio, ratio < 1 / (1 + tolerance)))
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of Simulator.run")
+    parser.add_argument("--quick", action="store_true", help="smaller models and fewer ticks")
+    parser.add_argument("--filter", default="", help="only cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each case (the fastest is kept)")
+    parser.add_argument("--output", help="file to write the results to (JSON)")
+    parser.add_argument("--baseline", default=BASELINE, help="results to compare with (JSON)")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slow-down (0.25: 25%%)")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("MCMA_HEADLESS", "1")
+
+    results = []
+    for case in cases(args.quick):
+        if args.filter in case["name"]:
+            result = run_case(case, args.repeat)
+            results.append(result)
+            print("{:<40} {:>8} comps {:>8} edges {:>12.1f} ticks/s {:>10.4f} s".format(
+                result["name"], result["compartments"], result["edges"], result["ticks_per_s"], result["wall"]))
+    report = {"environment": environment(), "quick": args.quick, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    regressions = []
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=1)
+        print("baseline saved to {}".format(args.baseline))
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["quick"] != args.quick:
+            print("\nbaseline {} was run {} --quick: not compared".format(args.baseline,
+                                                                         "with" if baseline["quick"] else "without"))
+            return 0
+        print("\ncompared with {} (commit {}, {})".format(args.baseline, baseline["environment"]["commit"],
+                                                            baseline["environment"]["date"]))
+        for name, tps, before, ratio, regression in compare(results, baseline["results"], args.tolerance):
+            print("{:<40} {:>12.1f} {:>12.1f} ticks/s {:>7.2f}x{}".format(name, tps, before, ratio,
+                                                                       "  REGRESSION" if regression else ""))
+            if regression:
+                regressions.append(name)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
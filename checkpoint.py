@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Save the state of a simulation to a file and load it back into the same model (see Simulator.checkpoint and
+Simulator.restore).
+
+A checkpoint is an uncompressed .npz file of arrays:
+    names                       name of every registered object, in order of registration
+    time                        time, dt and stop of the Simulator's Time
+    compartment.<variable>      every variable of engine.state_fields(), one value per compartment (nan for None)
+    diffusion.edges             index (among compartments) of comp_a and comp_b of each Diffusion
+    diffusion.ions              ions diffusing
+    diffusion.D, .ionjnet       per Diffusion and ion (nan where an ion does not diffuse)
+    diffusion.dx                distance between compartment midpoints of each Diffusion
+    object.<index>.<attribute>  numeric attributes of any other registered object (e.g. Colormap's totalh)
+"""
+import numbers
+import os
+import numpy as np
+from compartment import Compartment
+from diffusion import Diffusion
+from engine import state_fields, FIELD_DTYPES
+
+FORMAT_VERSION = 1
+
+
+class CheckpointError(ValueError):
+    pass
+
+
+def _scalars(obj):
+    """
+    :return: dictionary of the numeric attributes of obj
+    """
+    return {name: value for name, value in vars(obj).items()
+            if isinstance(value, (numbers.Number, np.number)) and not name.startswith("_")}
+
+
+def save(path: str, objects: list, _time):
+    """
+    Write the state of objects and time to path (atomically: an interrupted save leaves the previous checkpoint).
+
+    :param path: file to write (.npz is appended if missing)
+    :param objects: registered objects of the Simulator
+    :param _time: Time
+    :return: path written
+    """
+    if not path.endswith(".npz"):
+        path += ".npz"
+    compartments = [obj for obj in objects if isinstance(obj, Compartment)]
+    diffusion = [obj for obj in objects if isinstance(obj, Diffusion)]
+    index = {comp: i for i, comp in enumerate(compartments)}
+    arrays = {"version": np.array(FORMAT_VERSION),
+              "names": np.array([str(getattr(obj, "name", type(obj).__name__)) for obj in objects]),
+              "time": np.array([_time.time, _time.dt, _time.stop], dtype=np.float64)}
+    for field in state_fields():
+        arrays["compartment." + field] = np.array([np.nan if comp[field] is None else comp[field]
+                                                   for comp in compartments],
+                                                  dtype=FIELD_DTYPES.get(field, np.float64))
+    ions = sorted({ion for edge in diffusion for ion in edge.ions})
+    D = np.full((len(diffusion), len(ions)), np.nan)
+    ionjnet = np.full((len(diffusion), len(ions)), np.nan)
+    for e, edge in enumerate(diffusion):
+        for ion, value in edge.ions.items():
+            D[e, ions.index(ion)] = value
+            ionjnet[e, ions.index(ion)] = edge.ionjnet.get(ion, np.nan)
+    arrays["diffusion.edges"] = np.array([[index.get(edge.comp_a, -1), index.get(edge.comp_b, -1)]
+                                          for edge in diffusion], dtype=np.int64).reshape(-1, 2)
+    arrays["diffusion.ions"] = np.array(ions, dtype=str)
+    arrays["diffusion.D"] = D
+    arrays["diffusion.ionjnet"] = ionjnet
+    arrays["diffusion.dx"] = np.array([edge.dx for edge in diffusion], dtype=np.float64)
+    for i, obj in enumerate(objects):
+        if not isinstance(obj, (Compartment, Diffusion)):
+            for name, value in _scalars(obj).items():
+                arrays["object.{}.{}".format(i, name)] = np.array(value)
+    temp = "{}.{}.tmp.npz".format(path[:-4], os.getpid())
+    with open(temp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temp, path)
+    return path
+
+
+def load(path: str, objects: list, _time):
+    """
+    Set the state of objects and time from a checkpoint.
+    The objects must be those the checkpoint was saved from (same names, in the same order), e.g. created again by
+    the same script.
+
+    :param path: checkpoint file (.npz is appended if missing)
+    :param objects: registered objects of the Simulator (plain objects, not bound to the vector engine)
+    :param _time: Time
+    :raise CheckpointError if the checkpoint does not match the objects
+    """
+    if not path.endswith(".npz") and not os.path.exists(path):
+        path += ".npz"
+    with np.load(path) as checkpoint:
+        arrays = {key: checkpoint[key] for key in checkpoint.files}
+    if int(arrays["version"]) != FORMAT_VERSION:
+        raise CheckpointError("checkpoint {} has format {} (expected {})".format(path, int(arrays["version"]),
+                                                                                 FORMAT_VERSION))
+    names = [str(getattr(obj, "name", type(obj).__name__)) for obj in objects]
+    if list(arrays["names"]) != names:
+        raise CheckpointError("checkpoint {} is of different objects ({} saved, {} registered)".format(
+            path, len(arrays["names"]), len(names)))
+    compartments = [obj for obj in objects if isinstance(obj, Compartment)]
+    diffusion = [obj for obj in objects if isinstance(obj, Diffusion)]
+    index = {comp: i for i, comp in enumerate(compartments)}
+    edges = np.array([[index.get(edge.comp_a, -1), index.get(edge.comp_b, -1)] for edge in diffusion],
+                     dtype=np.int64).reshape(-1, 2)
+    if not np.array_equal(edges, arrays["diffusion.edges"]):
+        raise CheckpointError("checkpoint {} has a different diffusion topology".format(path))
+    for field in state_fields():
+        if "compartment." + field not in arrays:
+            raise CheckpointError("checkpoint {} has no {} (of a species registered since)".format(path, field))
+        values = arrays["compartment." + field]
+        for comp, value in zip(compartments, values.tolist()):
+            if field == "jkccup" and np.isnan(value):
+                value = None
+            comp[field] = value
+    ions = list(arrays["diffusion.ions"])
+    for edge, D, ionjnet, dx in zip(diffusion, arrays["diffusion.D"], arrays["diffusion.ionjnet"],
+                                    arrays["diffusion.dx"]):
+        edge.ions = {ion: float(D[k]) for k, ion in enumerate(ions) if not np.isnan(D[k])}
+        edge.ionjnet = {ion: float(ionjnet[k]) for k, ion in enumerate(ions) if not np.isnan(D[k])}
+        edge.dx = float(dx)
+    for i, obj in enumerate(objects):
+        prefix = "object.{}.".format(i)
+        for key, value in arrays.items():
+            if key.startswith(prefix):
+                setattr(obj, key[len(prefix):], value.item())
+    _time.time, _time.dt, _time.stop = (np.float64(value) for value in arrays["time"])
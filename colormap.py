@@ -1,11 +1,9 @@
 #methods for plotting and heatmaps
 #17 Feb 2017
 
-import matplotlib.pyplot as plt
 import numpy as np
 from sim_time import TimeMixin, Time
 import simulator
-from deferred_update import UpdateType
 
 class Colormap(TimeMixin):
 
@@ -14,49 +12,162 @@ class Colormap(TimeMixin):
         self.totalh = totalh
         self.comp = comp
         self.comp0w = comp[0].w
+        # images captured during runs (see capture) and their times
+        self.frames = []
+        self.frame_times = []
+        # canvas the images are composed in, and the figure they are drawn in (both reused by each call)
+        self.__canvas = None
+        self.__figure = None
+        self.__image = None
         simulator.Simulator.get_instance().register_colormap(self)
 
+    def __canvas_of(self, rows, width, h):
+        """
+        :return: canvas of rows x width filled with h (reusing the previous one if it has that shape)
+        """
+        if self.__canvas is None or self.__canvas.shape != (rows, width):
+            self.__canvas = np.empty((rows, width))
+        self.__canvas.fill(h)
+        return self.__canvas
+
+    def image(self, matrix=[1,2,3,4,5], rads=[1,2,3,4,5], h=10):
+        """
+        Compose the image of cmap: a bar of 30 rows for each compartment, as wide as its radius (out of 100 columns)
+        and of colour matrix * 1000, separated by blank rows of colour h.
+
+        :return: image (a view of the canvas, overwritten by the next image)
+        """
+        values = np.asarray(matrix, dtype=np.float64) * 1000
+        rd = np.round(np.asarray(rads, dtype=np.float64))
+        extra = np.round((100 - rd) / 2)
+        canvas = self.__canvas_of(1 + 31 * len(rd), 100, h)
+        columns = np.arange(100)
+        bars = np.where((columns >= extra[:, None]) & (columns < (extra + rd)[:, None]), values[:, None], h)
+        # the 30 rows of each bar, leaving the first row and a row after each bar blank
+        canvas[1:].reshape(len(rd), 31, 100)[:, :30, :] = bars[:, None, :]
+        return canvas
+
+    def image_hts(self, matrix=[1,2,3,4,5], heights=[1,2,3,4,5], totalhts=0, h=5):
+        """
+        Compose the image of cmap_hts: a bar of heights rows for each compartment (20 columns wide) of colour
+        matrix * 1000, separated by blank rows of colour h, padded with blank rows to totalhts.
+
+        :return: image (a view of the canvas, overwritten by the next image)
+        """
+        heights = np.asarray(heights, dtype=int)
+        change = int(sum(heights) - totalhts)
+        # colour and number of rows of each blank row, bar, blank row, ..., bar, blank row
+        colours = np.full(2 * len(heights) + 1, float(h))
+        colours[1::2] = np.asarray(matrix, dtype=np.float64) * 1000
+        counts = np.ones(2 * len(heights) + 1, dtype=int)
+        counts[1::2] = heights
+        counts[0] += max(-change, 0)
+        counts[-1] += max(change, 0)
+        canvas = self.__canvas_of(int(counts.sum()), 20, h)
+        canvas[:] = np.repeat(colours, counts)[:, None]
+        return canvas
+
+    def draw(self, image, r=0, h=10, color='hot', name='default', title=True):
+        """
+        Draw image in a figure, save it to name (unless 'default') and show it, titled name if title (after saving).
+        Shown figures stay open, so each image is drawn in a new figure; when the simulator is headless, one
+        off-screen Agg figure is created per colormap and reused for every image.
+        """
+        headless = simulator.Simulator.get_instance().headless()
+        if self.__figure is None or not headless:
+            if headless:
+                from matplotlib.figure import Figure
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                self.__figure = Figure()
+                FigureCanvasAgg(self.__figure)
+            else:
+                import matplotlib.pyplot as plt
+                self.__figure = plt.figure()
+            ax = self.__figure.add_subplot(1, 1, 1)
+            self.__image = ax.imshow(image, cmap=color, interpolation='nearest', vmin=r, vmax=h)
+            self.__figure.colorbar(self.__image)
+            ax.axis('off')
+        else:
+            self.__image.set_data(image)
+            self.__image.set_extent((-0.5, image.shape[1] - 0.5, image.shape[0] - 0.5, -0.5))
+            self.__image.set_cmap(color)
+            self.__image.set_clim(r, h)
+        ax = self.__image.axes
+        ax.set_title('')
+        if name != 'default':
+            self.__figure.savefig(name)
+            if title:
+                ax.set_title(name)
+        if not headless:
+            import matplotlib.pyplot as plt
+            plt.show()
+        return self.__figure
+
     def cmap(self, matrix=[1,2,3,4,5],rads=[1,2,3,4,5],totalhts=0,r=0,h=10,color='hot',name='default'):
-        blank_row=[h]*100
-        a=[blank_row]
-        for j in range(len(rads)):
-            rd=round(rads[j])
-            extra=round((100-rd)/2)
-            extra2=100-extra-rd
-            for i in range(30):
-                a.append(([h]*extra)+([matrix[j]*1000]*rd)+([h]*extra2))
-            a.append(blank_row)
         print("Radii:",rads)
-        plt.figure()
-        plt.imshow(a, cmap=color, interpolation='nearest', vmin=r, vmax=h)
-        plt.colorbar()
-        plt.axis('off')
-        if name != 'default':
-            plt.savefig(name)
-            plt.title(name)
-        plt.show()
-        
+        return self.draw(self.image(matrix, rads, h), r, h, color, name)
+
     def cmap_hts(self, matrix=[1,2,3,4,5],heights=[1,2,3,4,5],totalhts=0,r=0,h=5,color='hot',name='default'):
-        blank_row=[h]*20
-        a=[blank_row]
-        change=int(sum(heights)-totalhts)
-        if change <0:
-            for i in range(-change):
-                a.append([h]*20)
-        for j in range(len(heights)):
-            for i in range(heights[j]):
-                a.append([matrix[j]*1000]*20)
-            a.append(blank_row)
-        if change >0:
-            for i in range(change):
-                a.append(blank_row)
-        plt.figure()
-        plt.imshow(a, cmap=color, interpolation='nearest', vmin=r, vmax=h)
-        plt.colorbar()
-        plt.axis('off')
-        if name != 'default':
-            plt.savefig(name)
-        plt.show()
+        return self.draw(self.image_hts(matrix, heights, totalhts, h), r, h, color, name, title=False)
+
+    def capture(self, var='ecl', sc=1e7, radial=True, h=10):
+        """
+        Keep the image of var (e.g. 'ecl' or 'V', in mV) in each compartment at the current time as a frame.
+        Frames can be captured during a run with a protocol (see capture_every) and then saved together (see
+        save_frames and save_animation).
+
+        :param sc: scale of radii (radial) or lengths (not radial) to image columns or rows
+        :param radial: bars as wide as the compartments' radii (cmap) rather than as high as their lengths (cmap_hts)
+        """
+        values = [comp[var] for comp in self.comp]
+        if radial:
+            image = self.image(values, [comp.r * sc for comp in self.comp], h)
+        else:
+            image = self.image_hts(values, [int(comp.L * sc) for comp in self.comp], self.totalh, h)
+        self.frames.append(image.copy())
+        self.frame_times.append(simulator.Simulator.get_instance().time().time)
+
+    def capture_every(self, protocol, start, stop, interval, **kwargs):
+        """
+        Capture a frame at every interval from start to stop (inclusive) of a run with protocol.
+
+        :param protocol: protocol.Protocol of the run
+        :param kwargs: arguments of capture
+        :return: protocol
+        """
+        for t in np.arange(int(round((stop - start) / interval)) + 1) * interval + start:
+            protocol.call(t, lambda: self.capture(**kwargs))
+        return protocol
+
+    def save_frames(self, name, r=0, h=10, color='hot'):
+        """
+        Save each frame as an image file, without drawing figures.
+
+        :param name: file name, which may contain {index} and {time} (of the frame)
+        :return: file names written
+        """
+        from matplotlib import image
+        names = []
+        for index, (frame, t) in enumerate(zip(self.frames, self.frame_times)):
+            names.append(name.format(index=index, time=t))
+            image.imsave(names[-1], frame, cmap=color, vmin=r, vmax=h)
+        return names
+
+    def save_animation(self, path, fps=10, r=0, h=10, color='hot'):
+        """
+        Save the frames as an animation (e.g. .gif, or .mp4 if ffmpeg is installed) drawn in the colormap's figure.
+        """
+        from matplotlib import animation
+        figure = self.draw(self.frames[0], r, h, color)
+
+        def update(index):
+            self.__image.set_data(self.frames[index])
+            self.__image.axes.set_title("{:.6g} s".format(self.frame_times[index]))
+            return self.__image,
+
+        movie = animation.FuncAnimation(figure, update, frames=len(self.frames), blit=False)
+        movie.save(path, writer="pillow" if path.endswith(".gif") else "ffmpeg", fps=fps)
+        return path
 
 
     def heatmap(self,compl, comp, compr, sc, totalh, all=0, init_vals=None, title=['default','default','default']):
@@ -124,7 +235,7 @@ class Colormap(TimeMixin):
         return totalh, init_vals
 
     def step(self, _time: Time = None):
-        simulator.Simulator.get_instance().to_update(self, self.name, self.update_values, UpdateType.FUNCTION)
+        simulator.Simulator.get_instance().to_update_method(self, type(self).update_values)
 
     def update_values(self):
         new_w = 0
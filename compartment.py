@@ -6,7 +6,6 @@ Python 3.x targeted
 """
 import numpy as np
 import copy
-from deferred_update import UpdateType
 from constants import F
 from common import default_radius, default_length, \
     clo, ko, nao, xo_z, oso, \
@@ -17,6 +16,7 @@ from common import default_radius, default_length, \
     RTF, RT
 from sim_time import TimeMixin, Time
 import simulator
+import species
 import time
 
 nan = float("nan")
@@ -24,6 +24,7 @@ class Compartment(TimeMixin):
     """
 
     """
+    phase = "membrane"
 
     def __init__(self, name, radius=default_radius, length=default_length,
                  nai=0.033, ki=0.1038, cli=0.0052,
@@ -33,6 +34,8 @@ class Compartment(TimeMixin):
         self.r = radius  # in um
         self.r1 = radius
         self.L = length  # in um
+        # length below which the time step of a run with dt "auto" is evaluated again (see Simulator.geometry_changed)
+        self.L_stable = 0.0
         self.pkcc2 = pkcc2  # strength of kcc2
         self.z = z  # intracellular charge of impermeant anions
         self.w = np.pi * self.r ** 2 * self.L  # initial volume in liters
@@ -48,6 +51,12 @@ class Compartment(TimeMixin):
         # na,k,cl,x: intracellular starting concentrations
         self.nai = nai
         self.ki = ki
+        # species registered besides na, k and cl (see species.registry), and their charge
+        self.extra_species = species.registry.extra()
+        for sp in self.extra_species:
+            self[sp.internal] = sp.inside
+            self[sp.external] = sp.out
+        charge = sum(sp.z * sp.inside for sp in self.extra_species)
 
         if cli == 0:
             # setting chloride that is osmo- and electro-neutral initially.
@@ -57,9 +66,9 @@ class Compartment(TimeMixin):
 
         if self.ki == 0:
             self.xi = 155.858e-3
-            self.ki = self.cli-self.z*self.xi-self.nai
+            self.ki = self.cli-self.z*self.xi-self.nai-charge
         else:
-            self.xi = (self.cli - self.ki - self.nai) / self.z
+            self.xi = (self.cli - self.ki - self.nai - charge) / self.z
 
         # default conductance of impermeant anions
         self.gx = gx
@@ -68,7 +77,7 @@ class Compartment(TimeMixin):
             raise Exception("""Initial choice of either ki or nai resulted in negative concentration of
                                     intracellular ion - choose different starting values.""")
         # intracellular osmolarity
-        self.osi = self.nai + self.ki + self.cli + self.xi
+        self.osi = self.nai + self.ki + self.cli + self.xi + sum(sp.inside for sp in self.extra_species)
         if self.osi != oso:
             print("Compartment {} not osmo-neutral".format(self.name))
         self.nao = nao
@@ -81,6 +90,8 @@ class Compartment(TimeMixin):
         self.p = p
         # voltage
         self.V = self.FinvCAr * (self.nai + (self.ki + (self.z * self.xi) - self.cli))
+        if self.extra_species:
+            self.V += self.FinvCAr * charge
         # pump rate
         self.jp = self.p * (self.nai / nao) ** 3
         # kcc2
@@ -124,9 +135,7 @@ class Compartment(TimeMixin):
         """
         if _time is None:
             raise ValueError("{} has no time object specified".format(self.__class__.__name__))
-        # update voltage
-        self.xi = self.xm + self.xi_temp
-        self.V = self.FinvCAr * (self.nai + self.ki - self.cli + self.z * self.xi)
+        self.update_voltage()
         # update cubic pump rate (dependent on sodium gradient)
         self.jp = self.p * (self.nai / self.nao) ** 3
         # kcc2
@@ -157,28 +166,32 @@ class Compartment(TimeMixin):
         self.ek = RTF * np.log(self.ko / self.ki)
         self.ecl = RTF * np.log(self.cli / self.clo)
 
-        simulator.Simulator.get_instance().to_update_multi(self, {
-            'nai': {
-                "value": dnai,
-                "type": UpdateType.CHANGE
-            }, 'ki': {
-                "value": dki,
-                "type": UpdateType.CHANGE
-            }, 'cli': {
-                "value": dcli,
-                "type": UpdateType.CHANGE
-            }, 'xi_temp': {
-                "value": dxi,
-                "type": UpdateType.CHANGE
-            }
-        })
+        sim = simulator.Simulator.get_instance()
+        sim.to_update_change(self, 'nai', dnai)
+        sim.to_update_change(self, 'ki', dki)
+        sim.to_update_change(self, 'cli', dcli)
+        sim.to_update_change(self, 'xi_temp', dxi)
+        # leak of the other permeant species through the membrane
+        for sp in self.extra_species:
+            if sp.g != 0:
+                sim.to_update_change(self, sp.internal, -_time.dt * self.Ar * (
+                    sp.g * (self.V - RTF / sp.z * np.log(self[sp.external] / self[sp.internal])) / sp.z))
 
         self.w2 = self.w + _time.dt*(vw*pw*self.sa*(self.osi-oso))
 
         if self.stretch_w == True:
             self.w2=self.w+_time.dt*(vw*pw*self.sa*(self.osi-oso-4*km*np.pi*(1-self.r1/self.r)/(RT)))
 
-        simulator.Simulator.get_instance().to_update(self, self.name, self.update_values, UpdateType.FUNCTION)
+        sim.to_update_method(self, type(self).update_values)
+
+    def update_voltage(self):
+        """
+        Update voltage (and xi) from the concentrations
+        """
+        self.xi = self.xm + self.xi_temp
+        self.V = self.FinvCAr * (self.nai + self.ki - self.cli + self.z * self.xi)
+        if self.extra_species:
+            self.V += self.FinvCAr * sum(sp.z * self[sp.internal] for sp in self.extra_species)
 
     def update_values(self):
         """
@@ -188,6 +201,8 @@ class Compartment(TimeMixin):
         # intracellular osmolarity
         self.xi = self.xm + self.xi_temp
         self.osi = self.nai + self.ki + self.cli + self.xi
+        for sp in self.extra_species:
+            self.osi += self[sp.internal]
         # update volume
         #w2 = (self.w * self.osi) / oso  # update volume
 
@@ -197,6 +212,8 @@ class Compartment(TimeMixin):
         self.cli = (self.cli * self.w) / self.w2
         self.xi_temp = (self.xi_temp * self.w) / self.w2
         self.xm = (self.xm * self.w) / self.w2
+        for sp in self.extra_species:
+            self[sp.internal] = (self[sp.internal] * self.w) / self.w2
         self.w = self.w2
         # affect volume change into length change
         self.update_length()
@@ -210,6 +227,8 @@ class Compartment(TimeMixin):
 
     def update_length(self):
         self.L = self.w / (np.pi * self.r ** 2)
+        if self.L < self.L_stable:
+            simulator.Simulator.get_instance().geometry_changed()
 
     def copy(self, name):
         """
@@ -219,6 +238,8 @@ class Compartment(TimeMixin):
         """
         comp = Compartment(name, radius=self.r, length=self.L, pkcc2=self.pkcc2, z=self.z, nai=self.nai, ki=self.ki,
                            cli=self.cli, p=self.p)
+        for sp in self.extra_species:
+            comp[sp.internal] = self[sp.internal]
         return comp
 
     def deepcopy(self, name):
@@ -242,10 +263,10 @@ class Compartment(TimeMixin):
         return ion*self.w
 
     def __getitem__(self, item):
-        return self.__dict__[item]
+        return getattr(self, item)
 
     def __setitem__(self, key, value):
-        self.__dict__[key] = value
+        setattr(self, key, value)
 
     def __str__(self, *args, **kwargs):
         return self.name
@@ -21,7 +21,8 @@ Na = 6.022e23  # Avogadro's constant       mol-1
 
 
 def valence(ion: str):
-    ion = ion.lower()
-    if ion.endswith("i") or ion.endswith("o"):
-        ion = ion[:-1]
-    return {"cl": -1, "k": 1, "na": 1}[ion]
+    """
+    :return: valence of ion (e.g. 'cli', 'nao' or 'k'), from the registry of species (see species.SpeciesRegistry)
+    """
+    from species import registry
+    return registry.valence(ion)
@@ -1,4 +1,6 @@
+import functools
 from enum import Enum
+import numpy as np
 
 
 class UpdateType(Enum):
@@ -45,3 +47,220 @@ class DeferredUpdate(object):
         elif self.update_type == UpdateType.EVAL_RETURN:
             # evaluates a statement and assigns result to variable
             self.obj.var = eval(self.value)
+
+
+class DeferredUpdateBuffer(object):
+    """
+    Holds the deferred updates of a time step in preallocated storage, so no objects are created per update.
+    CHANGE updates accumulate in a delta array per variable (one slot per object and variable); SET and FUNCTION
+    updates are kept in reusable lists.
+    All updates are applied together at the end of the time step (apply) in this order:
+        1) CHANGE: each accumulated delta is added to its variable
+        2) SET: values replace variables' values
+        3) FUNCTION: functions are called in the order they were deferred
+        4) any other UpdateType, in the order deferred
+    Objects therefore always read the values from the start of the time step while the step is being processed.
+
+    Updates are grouped by type rather than applied in the order they were deferred (as a list of DeferredUpdate was).
+    For a compartment, the changes by Diffusion (deferred after its update_values) are therefore applied before
+    update_values rather than after it, and so are corrected for the volume change of the time step like its own.
+    With ordered, every update is kept as a DeferredUpdate and applied in the order deferred instead (slower, e.g. to
+    compare with the grouped order). Deltas of array-backed objects (add_block) are always applied first.
+    """
+
+    def __init__(self, capacity=16, ordered: bool = False):
+        """
+        :param capacity: initial number of slots per variable, and of SET and FUNCTION updates
+        :param ordered: apply updates in the order they were deferred (see class description)
+        """
+        self.ordered = ordered
+        self.__capacity = capacity
+        # obj -> {var: (delta array, index)}
+        self.__slots = {}
+        # var -> (list of objects, delta array) for objects whose variables are stored in their __dict__
+        self.__deltas = {}
+        # (state, {var: delta array}) for array-backed objects (see engine.CompartmentState)
+        self.__blocks = []
+        self.__set_objects = [None] * capacity
+        self.__set_vars = [None] * capacity
+        self.__set_values = [None] * capacity
+        self.__n_sets = 0
+        self.__functions = [None] * capacity
+        # object each function is called with (None: called without arguments)
+        self.__function_objects = [None] * capacity
+        self.__n_functions = 0
+        self.__others = []
+        self.pending = False
+
+    def __add_slot(self, obj, var):
+        """
+        Allocate a slot in the delta array of var for obj.
+        """
+        if var not in self.__deltas:
+            self.__deltas[var] = ([], np.zeros(self.__capacity))
+        objects, values = self.__deltas[var]
+        if len(objects) == len(values):
+            # double the capacity and point existing slots at the new array
+            values = np.concatenate([values, np.zeros(len(values))])
+            self.__deltas[var] = (objects, values)
+            for index, other in enumerate(objects):
+                self.__slots[other][var] = (values, index)
+        objects.append(obj)
+        slot = (values, len(objects) - 1)
+        self.__slots.setdefault(obj, {})[var] = slot
+        return slot
+
+    def add_block(self, state, deltas: dict, objects: list):
+        """
+        Accumulate CHANGE updates for array-backed objects directly in arrays aligned with their state.
+
+        :param state: indexable by variable name, giving the array of that variable for all objects
+        :param deltas: dictionary of {var: delta array}; state[var] += deltas[var] when applied
+        :param objects: objects in the same order as the arrays, each having an _index
+        """
+        self.__blocks.append((state, deltas))
+        for obj in objects:
+            slots = self.__slots.setdefault(obj, {})
+            for var, values in deltas.items():
+                slots[var] = (values, obj._index)
+
+    def change(self, obj, var, value):
+        """
+        Add value to obj's var at the end of the time step.
+        """
+        if self.ordered:
+            return self.__defer(obj, var, value, UpdateType.CHANGE)
+        try:
+            values, index = self.__slots[obj][var]
+        except KeyError:
+            values, index = self.__add_slot(obj, var)
+        values[index] += value
+        self.pending = True
+
+    def set(self, obj, var, value):
+        """
+        Set obj's var to value at the end of the time step.
+        """
+        if self.ordered:
+            return self.__defer(obj, var, value, UpdateType.SET)
+        n = self.__n_sets
+        if n == len(self.__set_objects):
+            self.__set_objects.extend([None] * n)
+            self.__set_vars.extend([None] * n)
+            self.__set_values.extend([None] * n)
+        self.__set_objects[n] = obj
+        self.__set_vars[n] = var
+        self.__set_values[n] = value
+        self.__n_sets = n + 1
+        self.pending = True
+
+    def function(self, func):
+        """
+        Call func at the end of the time step.
+        """
+        self.method(None, func)
+
+    def method(self, obj, func):
+        """
+        Call func(obj) at the end of the time step (func() if obj is None).
+        Deferring a method as the function of its class (e.g. type(self).update_values) creates no bound method.
+        """
+        if self.ordered:
+            return self.__defer(None, None, func if obj is None else functools.partial(func, obj), UpdateType.FUNCTION)
+        n = self.__n_functions
+        if n == len(self.__functions):
+            self.__functions.extend([None] * n)
+            self.__function_objects.extend([None] * n)
+        self.__functions[n] = func
+        self.__function_objects[n] = obj
+        self.__n_functions = n + 1
+        self.pending = True
+
+    def __defer(self, obj, var, value, update_type: UpdateType):
+        """
+        Keep an update as a DeferredUpdate, applied in the order deferred.
+        """
+        self.__others.append(DeferredUpdate(obj, var, value, update_type))
+        self.pending = True
+
+    def add(self, obj, var, value, update_type: UpdateType):
+        """
+        Defer an update of any UpdateType (see DeferredUpdate).
+        """
+        if update_type == UpdateType.CHANGE:
+            self.change(obj, var, value)
+        elif update_type == UpdateType.SET:
+            self.set(obj, var, value)
+        elif update_type == UpdateType.FUNCTION:
+            self.function(value)
+        else:
+            self.__defer(obj, var, value, update_type)
+
+    def apply(self):
+        """
+        Apply all deferred updates (see class description) and clear them.
+        """
+        for state, deltas in self.__blocks:
+            for var, values in deltas.items():
+                target = state[var]
+                target += values
+                values[:] = 0
+        for var, (objects, values) in self.__deltas.items():
+            for index, obj in enumerate(objects):
+                obj[var] += values[index]
+            values[:len(objects)] = 0
+        for i in range(self.__n_sets):
+            self.__set_objects[i][self.__set_vars[i]] = self.__set_values[i]
+        self.__n_sets = 0
+        functions, objects = self.__functions, self.__function_objects
+        for i in range(self.__n_functions):
+            obj = objects[i]
+            if obj is None:
+                functions[i]()
+            else:
+                functions[i](obj)
+                objects[i] = None
+        self.__n_functions = 0
+        if self.__others:
+            for deferred_update in self.__others:
+                deferred_update.apply_update()
+            self.__others = []
+        self.pending = False
+
+    def count(self):
+        """
+        :return: number of pending updates (a CHANGE counts once per object and variable changed)
+        """
+        n = self.__n_sets + self.__n_functions + len(self.__others)
+        for state, deltas in self.__blocks:
+            for values in deltas.values():
+                n += np.count_nonzero(values)
+        for objects, values in self.__deltas.values():
+            n += np.count_nonzero(values[:len(objects)])
+        return int(n)
+
+    def clear(self):
+        """
+        Discard all deferred updates.
+        """
+        for state, deltas in self.__blocks:
+            for values in deltas.values():
+                values[:] = 0
+        for objects, values in self.__deltas.values():
+            values[:] = 0
+        self.__n_sets = 0
+        self.__function_objects[:self.__n_functions] = [None] * self.__n_functions
+        self.__n_functions = 0
+        self.__others = []
+        self.pending = False
+
+    def reset(self):
+        """
+        Forget all slots and blocks, e.g. when objects are bound to or released from array-backed storage.
+        Pending updates are applied first so that none are lost.
+        """
+        if self.pending:
+            self.apply()
+        self.__slots = {}
+        self.__deltas = {}
+        self.__blocks = []
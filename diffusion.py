@@ -1,13 +1,15 @@
-import deferred_update
 import simulator
 from compartment import Compartment
 from sim_time import TimeMixin, Time
-from constants import k, q, valence
+from constants import k, q
+from species import registry
 from common import T, RTF
 
 
 class Diffusion(TimeMixin):
-    def __init__(self, comp_a: Compartment, comp_b: Compartment, ions: dict):
+    phase = "diffusion"
+
+    def __init__(self, comp_a: Compartment, comp_b: Compartment, ions: dict = None):
         """
         Create a connection between compartments that allows for diffusion of ions.
         :param comp_a:
@@ -15,7 +17,10 @@ class Diffusion(TimeMixin):
         :param ions: dictionary must be of the form {ion: D}, where
                 ion is the molecule of interest (str) (e.g. 'cli')
                 D is the diffusion coefficient for that ion (float) (dm2/s)
+                (default: every species with a diffusion coefficient, see species.registry)
         """
+        if ions is None:
+            ions = registry.diffusion_coefficients()
         self.name = comp_a.name + '<-' + comp_b.name
         print(self.name)
         self.comp_a = comp_a
@@ -37,17 +42,16 @@ class Diffusion(TimeMixin):
         Ohm's law calculates the diffusion due to ionic differences between compartments a and a
         Returned diffusion values are relative to comp_a
         """
+        sim = simulator.Simulator.get_instance()
         for ion, D in self.ions.items():
             # F in M * dm / s
             F = self.ficks_law(ion, D)
             # drift in M * dm / s
             d_drift = self.ohms_law(ion, D) * 1
             j_net = (F + d_drift / 2) * _time.dt
-            simulator.Simulator.get_instance().to_update(self.comp_a, ion, j_net / self.comp_a.L,
-                                                         deferred_update.UpdateType.CHANGE)
+            sim.to_update_change(self.comp_a, ion, j_net / self.comp_a.L)
             # -j_net for comp_b as it is equal but opposite of j_net w.r.t. comp_a
-            simulator.Simulator.get_instance().to_update(self.comp_b, ion, -j_net / self.comp_b.L,
-                                                         deferred_update.UpdateType.CHANGE)
+            sim.to_update_change(self.comp_b, ion, -j_net / self.comp_b.L)
             self.ionjnet[ion] = j_net  # jnet has units M*dm
 
     def ficks_law(self, ion: str, D: float):
@@ -88,7 +92,7 @@ class Diffusion(TimeMixin):
         # dx is calculated in init but must be recalculated as L changes with volume changes
         self.dx = self.comp_a.L / 2 + self.comp_b.L / 2
 
-        return - (D / RTF * valence(ion) * dV / self.dx) * (self.comp_a[ion] + self.comp_b[ion])
+        return - (D / RTF * registry.valence(ion) * dV / self.dx) * (self.comp_a[ion] + self.comp_b[ion])
 
     def __getitem__(self, item):
         return self.__dict__[item]
\ No newline at end of file
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import numpy as np
+from species import registry
+from common import RTF
+from sim_time import TimeMixin, Time
+
+
+class DiffusionNetwork(TimeMixin):
+    """
+    Diffusion between all compartments of a CompartmentState as one operator.
+    Every Diffusion edge (comp_a, comp_b) is a row of an incidence matrix B (edges x compartments) with +1 at comp_a
+    and -1 at comp_b. For the concentrations C (compartments x ions) and voltages V of the compartments:
+        B @ C       difference in concentration across each edge (Fick's law)
+        |B| @ C     sum of concentrations across each edge (drift)
+        B @ V       difference in voltage across each edge (drift)
+        B.T @ J     net flux into each compartment from the flux J along every edge
+    so the fluxes of all edges and ions come from a few sparse matrix products per step.
+    The equations are those of Diffusion.step.
+
+    Each row of B has exactly two entries, so the CSR arrays are preallocated (with spare capacity) and an edge is
+    added by filling in its row, and removed by moving the last row into its place. B is only re-wrapped (not
+    recomputed) after a change.
+    """
+    phase = "diffusion"
+
+    def __init__(self, state, delta: dict, capacity=8, kernels=None):
+        """
+        :param state: engine.CompartmentState of the compartments connected by edges
+        :param delta: dictionary of {ion: array} aligned with state, to which the change in ions is added
+        :param capacity: initial number of edges that can be stored
+        :param kernels: kernels.LoopKernels that do the work of a step (default: sparse matrix products)
+        """
+        self.name = "diffusion network"
+        self.kernels = kernels
+        self.state = state
+        self.delta = delta
+        self.edges = []
+        # edge -> its row
+        self.__rows = {}
+        self.ions = []
+        self.n_edges = 0
+        self.capacity = capacity
+        # CSR arrays of the incidence matrix (row e is [comp_a, comp_b] of edge e)
+        self.__indices = np.zeros(2 * capacity, dtype=np.int64)
+        self.__signs = np.tile([1.0, -1.0], capacity)
+        self.__ones = np.ones(2 * capacity)
+        self.__indptr = np.arange(0, 2 * capacity + 1, 2, dtype=np.int64)
+        # diffusion coefficient of each edge (rows) for each ion (columns); 0 if the edge does not carry the ion
+        self.D = np.zeros((capacity, 0))
+        # valence of each ion
+        self.z = np.zeros(0)
+        # net flux (M*dm) along each edge for each ion during the last step
+        self.jnet = np.zeros((capacity, 0))
+        # difference in distance between compartment midpoints of each edge
+        self.dx = np.zeros(capacity)
+        self.__B = None
+        self.__A = None
+        self.__BT = None
+
+    def __grow(self):
+        self.capacity *= 2
+        indices = np.zeros(2 * self.capacity, dtype=np.int64)
+        indices[:2 * self.n_edges] = self.__indices[:2 * self.n_edges]
+        self.__indices = indices
+        self.__signs = np.tile([1.0, -1.0], self.capacity)
+        self.__ones = np.ones(2 * self.capacity)
+        self.__indptr = np.arange(0, 2 * self.capacity + 1, 2, dtype=np.int64)
+        D = np.zeros((self.capacity, len(self.ions)))
+        D[:self.n_edges] = self.D[:self.n_edges]
+        self.D = D
+        self.jnet = np.zeros((self.capacity, len(self.ions)))
+        self.dx = np.zeros(self.capacity)
+
+    def __add_ion(self, ion):
+        self.ions.append(ion)
+        self.z = np.append(self.z, registry.valence(ion))
+        self.D = np.hstack([self.D, np.zeros((self.capacity, 1))])
+        self.jnet = np.hstack([self.jnet, np.zeros((self.capacity, 1))])
+
+    def add(self, diffusion):
+        """
+        Add a Diffusion edge to the network. Both of its compartments must be bound to the network's state.
+
+        :param diffusion: Diffusion object
+        :return: index of the edge
+        """
+        for ion in diffusion.ions:
+            if ion not in self.ions:
+                self.__add_ion(ion)
+        if self.n_edges == self.capacity:
+            self.__grow()
+        e = self.n_edges
+        self.__indices[2 * e] = diffusion.comp_a._index
+        self.__indices[2 * e + 1] = diffusion.comp_b._index
+        self.D[e] = 0
+        for ion, D in diffusion.ions.items():
+            self.D[e, self.ions.index(ion)] = D
+        self.edges.append(diffusion)
+        self.__rows[diffusion] = e
+        self.n_edges += 1
+        self.__B = None
+        return e
+
+    def __contains__(self, diffusion):
+        return diffusion in self.__rows
+
+    def row(self, diffusion):
+        """
+        :return: row of a Diffusion edge in the network's arrays (e.g. D), or None if it is not in the network
+        """
+        return self.__rows.get(diffusion)
+
+    def remove(self, diffusion):
+        """
+        Remove a Diffusion edge from the network (moving the last edge into its row)
+        """
+        e = self.__rows.pop(diffusion)
+        last = self.n_edges - 1
+        if e != last:
+            moved = self.edges[last]
+            self.__indices[2 * e:2 * e + 2] = self.__indices[2 * last:2 * last + 2]
+            self.D[e] = self.D[last]
+            self.jnet[e] = self.jnet[last]
+            self.dx[e] = self.dx[last]
+            self.edges[e] = moved
+            self.__rows[moved] = e
+        self.edges.pop()
+        self.n_edges -= 1
+        self.__B = None
+
+    def reconnect(self, diffusion):
+        """
+        Update the row of an edge after its comp_a or comp_b changed
+        """
+        e = self.__rows[diffusion]
+        self.__indices[2 * e] = diffusion.comp_a._index
+        self.__indices[2 * e + 1] = diffusion.comp_b._index
+        self.__B = None
+
+    def relabel(self, old: int, new: int):
+        """
+        Point edges of the compartment at index old of the state at index new (after it moved in the state's arrays)
+        """
+        if old != new:
+            indices = self.__indices[:2 * self.n_edges]
+            indices[indices == old] = new
+            self.__B = None
+
+    def incidence(self):
+        """
+        :return: incidence matrix B (edges x compartments) as a CSR matrix sharing the network's arrays
+        """
+        if self.__B is None or self.__B.shape[1] != self.state.n:
+            # (imported when first needed, so that importing the engine does not load scipy)
+            from scipy import sparse
+            e = self.n_edges
+            shape = (e, self.state.n)
+            self.__B = sparse.csr_matrix((self.__signs[:2 * e], self.__indices[:2 * e], self.__indptr[:e + 1]),
+                                         shape=shape, copy=False)
+            self.__A = sparse.csr_matrix((self.__ones[:2 * e], self.__indices[:2 * e], self.__indptr[:e + 1]),
+                                         shape=shape, copy=False)
+            self.__BT = self.__B.T
+        return self.__B
+
+    def endpoints(self):
+        """
+        :return: index of comp_a and comp_b of each edge (edges x 2)
+        """
+        return self.__indices[:2 * self.n_edges].reshape(self.n_edges, 2)
+
+    def concentrations(self):
+        """
+        :return: concentrations of the network's ions (compartments x ions)
+        """
+        return np.stack([self.state[ion] for ion in self.ions], axis=1)
+
+    def flux(self, C=None, V=None, L=None):
+        """
+        Fick's law and Ohm's law (drift) for every edge and ion (see Diffusion.ficks_law and Diffusion.ohms_law).
+
+        :param C: concentrations (compartments x ions), default: current concentrations
+        :param V: voltage of each compartment, default: current voltages
+        :param L: length of each compartment, default: current lengths
+        :return: flux along each edge, relative to comp_a (edges x ions) in M*dm/s
+        """
+        B = self.incidence()
+        if C is None:
+            C = self.concentrations()
+        if V is None:
+            V = self.state["V"]
+        if L is None:
+            L = self.state["L"]
+        return self.__flux(B, self.__A, self.D[:self.n_edges], C, V, L)
+
+    def __flux(self, B, A, D, C, V, L):
+        """
+        flux for the edges of the rows of B and A (|B|) with diffusion coefficients D
+        """
+        # difference in distance between compartment midpoints
+        dx = ((A @ L) / 2)[:, np.newaxis]
+        dV = (B @ V)[:, np.newaxis]
+        F = -D * (B @ C) / dx
+        drift = - (D / RTF * self.z * dV / dx) * (A @ C)
+        return F + drift / 2
+
+    def rate(self, C, V, L):
+        """
+        Rate of change of concentrations in each compartment due to diffusion.
+
+        :return: (compartments x ions) in M/s
+        """
+        if self.n_edges == 0:
+            return np.zeros_like(C)
+        J = self.flux(C, V, L)
+        return (self.__BT @ J) / L[:, np.newaxis]
+
+    def adjacency(self):
+        """
+        :return: sparse matrix (compartments x compartments) that is non-zero for compartments connected by an edge
+        """
+        self.incidence()
+        return (self.__A.T @ self.__A).tocsr()
+
+    def step(self, _time: Time = None):
+        """
+        Diffusion between all connected compartments for a time step.
+        The change in ions is added to the delta arrays (applied with the Simulator's deferred updates).
+        """
+        if self.n_edges == 0:
+            return
+        if self.kernels is not None:
+            dC = self.kernels.diffusion_step(self, _time.dt)
+        else:
+            e = self.n_edges
+            jnet = self.jnet[:e]
+            jnet[:] = self.flux() * _time.dt
+            self.dx[:e] = (self.__A @ self.state["L"]) / 2
+            dC = (self.__BT @ jnet) / self.state["L"][:, np.newaxis]
+        for i, ion in enumerate(self.ions):
+            self.delta[ion] += dC[:, i]
+
+    def edges_subset(self, rows):
+        """
+        :param rows: rows of some of the edges (sorted)
+        :return: the rows, the compartments they connect, and the incidence matrix B, |B| and B.T of these edges
+        limited to these compartments, for step_edges while the edges of the network do not change
+        """
+        B = self.incidence()
+        if len(rows) == self.n_edges:
+            return rows, slice(None), B, self.__A, self.__BT
+        cols = np.unique(self.endpoints()[rows])
+        B = B[rows][:, cols].tocsr()
+        return rows, cols, B, abs(B), B.T
+
+    def step_edges(self, subset, dt):
+        """
+        Diffusion along some of the edges, each for its own time step (see local_stepping.LocalTimeStepping).
+        The amount of each ion carried along an edge is added to one compartment and removed from the other, as in step.
+        Always done with sparse matrix products.
+
+        :param subset: edges (see edges_subset)
+        :param dt: time step of each edge
+        """
+        rows, cols, B, A, BT = subset
+        L = self.state["L"][cols]
+        C = np.stack([self.state[ion][cols] for ion in self.ions], axis=1)
+        jnet = self.__flux(B, A, self.D[rows], C, self.state["V"][cols], L) * dt[:, np.newaxis]
+        self.jnet[rows] = jnet
+        self.dx[rows] = (A @ L) / 2
+        dC = (BT @ jnet) / L[:, np.newaxis]
+        for i, ion in enumerate(self.ions):
+            self.delta[ion][cols] += dC[:, i]
+
+    def sync(self):
+        """
+        Write the last fluxes and distances back into the Diffusion objects (ionjnet, dx)
+        """
+        for e, diffusion in enumerate(self.edges):
+            diffusion.dx = self.dx[e]
+            for i, ion in enumerate(self.ions):
+                if ion in diffusion.ionjnet:
+                    diffusion.ionjnet[ion] = self.jnet[e, i]
+
+    def __getitem__(self, item):
+        return self.__dict__[item]
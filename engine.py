@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import numpy as np
+from deferred_update import UpdateType
+from common import clo, ko, nao, oso, \
+    ck, cna, \
+    pw, vw, km, \
+    RTF, RT
+from sim_time import TimeMixin, Time
+from diffusion_network import DiffusionNetwork
+import kernels
+import simulator
+import species
+
+# Compartment variables held in contiguous arrays while a compartment is bound to a CompartmentState
+STATE_FIELDS = ("nai", "ki", "cli", "xi", "xm", "xi_temp", "osi", "absox",
+                "w", "w2", "L", "r", "r1", "sa", "Ar", "C", "FinvCAr",
+                "V", "jp", "p", "pkcc2", "jkccup", "jkcc2", "ek", "ecl",
+                "z", "xz", "xmz", "gx", "dz", "ratio",
+                "nao", "ko", "clo",
+                "dnai", "dki", "dcli", "dxi",
+                "stretch_w")
+# fields that are not float64
+FIELD_DTYPES = {"stretch_w": np.bool_}
+# ions changed by deferred (CHANGE) updates during a time step
+DELTA_FIELDS = ("nai", "ki", "cli", "xi_temp")
+# fields written by a step of some of the compartments (VectorEngine.step_compartments) and by their update_values
+STEP_FIELDS = ("jp", "pkcc2", "jkcc2", "xz", "z", "dnai", "dki", "dcli", "dxi", "ek", "ecl", "w2")
+VALUES_FIELDS = ("xi", "osi", "nai", "ki", "cli", "xi_temp", "xm", "w", "L", "absox")
+# fields read or written by VectorEngine.update_voltage
+VOLTAGE_FIELDS = ("xi", "V", "xm", "xi_temp", "FinvCAr", "nai", "ki", "cli", "z")
+
+
+def state_fields():
+    """
+    :return: STATE_FIELDS and the concentrations of the species registered besides na, k and cl (see species.registry)
+    """
+    return STATE_FIELDS + species.registry.extra_fields()
+
+
+class StateVariable(object):
+    """
+    Data descriptor that reads and writes a Compartment variable from its CompartmentState array.
+    Data descriptors take precedence over the instance __dict__, so a bound compartment's attributes always reflect
+    the arrays.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj._state.arrays[self.name][obj._index]
+
+    def __set__(self, obj, value):
+        obj._state.arrays[self.name][obj._index] = value
+
+
+class OptionalStateVariable(StateVariable):
+    """
+    As StateVariable, but None is stored as nan (e.g. jkccup is None when kcc2 is not ramped)
+    """
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj._state.arrays[self.name][obj._index]
+        return None if np.isnan(value) else value
+
+    def __set__(self, obj, value):
+        obj._state.arrays[self.name][obj._index] = np.nan if value is None else value
+
+
+def _unbound_copy(cls, state):
+    """
+    Reconstruct a plain (unbound) object from its class and attribute dictionary. Used when copying/pickling a view.
+    """
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    return obj
+
+
+class CompartmentView(object):
+    """
+    Mixin for compartments bound to a CompartmentState.
+    The compartment becomes a lightweight view into the state arrays (see view_class).
+    """
+    # class of the compartment before it was bound
+    _base_class = None
+
+    def snapshot(self):
+        """
+        :return: attribute dictionary of the compartment as it would be if it were not bound
+        """
+        state = {key: value for key, value in self.__dict__.items() if key not in ("_state", "_index")}
+        for name in self._state.fields:
+            state[name] = getattr(self, name)
+        return state
+
+    def __reduce_ex__(self, protocol):
+        # copies and pickles of a view are plain compartments with the current values
+        return _unbound_copy, (self._base_class, self.snapshot())
+
+    def __repr__(self):
+        return str(self.snapshot())
+
+
+_view_classes = {}
+
+
+def view_class(cls, fields: tuple = STATE_FIELDS):
+    """
+    Get (or create) the view class of a compartment class.
+
+    :param cls: Compartment (sub)class
+    :param fields: variables stored in the CompartmentState (see state_fields)
+    :return: subclass of cls whose state variables are stored in a CompartmentState
+    """
+    try:
+        return _view_classes[cls, fields]
+    except KeyError:
+        attrs = {"_base_class": cls}
+        for name in fields:
+            attrs[name] = OptionalStateVariable(name) if name == "jkccup" else StateVariable(name)
+        view = type(cls)(cls.__name__, (CompartmentView, cls), attrs)
+        _view_classes[cls, fields] = view
+        return view
+
+
+class CompartmentState(object):
+    """
+    Struct-of-arrays store of Compartment variables.
+    Each variable in fields (see state_fields) is held in a contiguous array with one entry per bound compartment.
+    The intracellular and extracellular concentrations of the species are the rows of two blocks (species x
+    compartments, see species.SpeciesArrays), so that they can be used together along the species axis.
+    Arrays are allocated with spare capacity that doubles when full, so binding is amortized O(1).
+    """
+
+    def __init__(self, capacity=8):
+        self.n = 0
+        self.capacity = capacity
+        self.compartments = []
+        # changed whenever a compartment is bound or unbound (which can move another one), so that indices of
+        # compartments cached elsewhere (e.g. by recorder.Recorder) can be checked
+        self.generation = 0
+        self.species = species.registry.compile()
+        self.fields = state_fields()
+        self.arrays = {}
+        self.views = {}
+        self.__allocate()
+        self.__update_views()
+
+    def __allocate(self):
+        """
+        Allocate the arrays with the current capacity
+        """
+        self.inside = np.zeros((len(self.species), self.capacity))
+        self.outside = np.zeros((len(self.species), self.capacity))
+        blocks = set(self.species.names + self.species.outside)
+        for name in self.fields:
+            if name not in blocks:
+                self.arrays[name] = np.zeros(self.capacity, dtype=FIELD_DTYPES.get(name, np.float64))
+        for i, (name, name_out) in enumerate(zip(self.species.names, self.species.outside)):
+            self.arrays[name] = self.inside[i]
+            self.arrays[name_out] = self.outside[i]
+
+    def __update_views(self):
+        """
+        Views of the arrays limited to the bound compartments (used by vectorized kernels).
+        """
+        self.views = {name: array[:self.n] for name, array in self.arrays.items()}
+        # concentrations of the species (species x compartments)
+        self.concentrations = self.inside[:, :self.n]
+        self.concentrations_out = self.outside[:, :self.n]
+
+    def __grow(self):
+        arrays = self.arrays
+        self.arrays = {}
+        self.capacity *= 2
+        self.__allocate()
+        for name, array in arrays.items():
+            self.arrays[name][:self.n] = array[:self.n]
+
+    def bind(self, compartment):
+        """
+        Copy the compartment's variables into the arrays and turn the compartment into a view of them.
+
+        :param compartment: Compartment (not already bound)
+        :return: index of the compartment in the arrays
+        """
+        if isinstance(compartment, CompartmentView):
+            raise ValueError("{} is already bound".format(compartment))
+        if self.n == self.capacity:
+            self.__grow()
+        index = self.n
+        for name in self.fields:
+            value = compartment.__dict__[name]
+            self.arrays[name][index] = np.nan if value is None else value
+        compartment.__dict__["_state"] = self
+        compartment.__dict__["_index"] = index
+        compartment.__class__ = view_class(type(compartment), self.fields)
+        self.compartments.append(compartment)
+        self.n += 1
+        self.generation += 1
+        self.__update_views()
+        return index
+
+    def unbind(self, compartment):
+        """
+        Return the compartment to a plain object and remove it from the arrays by moving the last compartment into its
+        place (O(1)).
+
+        :return: former index of the compartment, and of the compartment moved into its place (equal if it was last)
+        """
+        index = compartment._index
+        last = self.n - 1
+        state = compartment.snapshot()
+        compartment.__class__ = compartment._base_class
+        compartment.__dict__.clear()
+        compartment.__dict__.update(state)
+        if index != last:
+            moved = self.compartments[last]
+            for array in self.arrays.values():
+                array[index] = array[last]
+            moved.__dict__["_index"] = index
+            self.compartments[index] = moved
+        self.compartments.pop()
+        self.n -= 1
+        self.generation += 1
+        self.__update_views()
+        return index, last
+
+    def unbind_all(self):
+        """
+        Write the arrays back into each compartment's __dict__ and restore its original class.
+        """
+        for compartment in self.compartments:
+            state = compartment.snapshot()
+            compartment.__class__ = compartment._base_class
+            compartment.__dict__.clear()
+            compartment.__dict__.update(state)
+        self.compartments = []
+        self.n = 0
+        self.generation += 1
+        self.__update_views()
+
+    def __getitem__(self, item):
+        return self.views[item]
+
+    def __len__(self):
+        return self.n
+
+
+def is_vectorizable(obj):
+    """
+    Only compartments that use the standard Compartment dynamics can be advanced by VectorEngine.
+    Subclasses that override step or update_values are stepped individually.
+    """
+    from compartment import Compartment
+    return isinstance(obj, Compartment) \
+        and type(obj).step is Compartment.step \
+        and type(obj).update_values is Compartment.update_values
+
+
+class VectorEngine(TimeMixin):
+    """
+    Advances all bound compartments with one set of array operations per step.
+    The equations are those of Compartment.step and Compartment.update_values.
+    Diffusion edges between bound compartments are compiled into a DiffusionNetwork, which is stepped in place of
+    the individual Diffusion objects.
+    Objects that cannot be vectorized (e.g. subclasses with their own step) are still stepped individually.
+    The arithmetic of a step is done by NumPy array operations, or by compiled loops (see kernels.py).
+    """
+    phase = "membrane"
+
+    def __init__(self, backend: str = "numpy"):
+        """
+        :param backend: kernels of a step (see kernels.BACKENDS)
+        :raise ValueError if backend is not recognised, or its kernels cannot step the registered species
+        """
+        self.name = "vector engine"
+        self.backend = backend
+        self.kernels = kernels.kernels(backend)
+        self.state = CompartmentState()
+        if self.kernels is not None and len(self.state.species) > self.state.species.n_core:
+            raise ValueError("backend '{}' only steps the species {} (use backend 'numpy')".format(
+                backend, ", ".join(species.CORE)))
+        # change in ions over a time step, aligned with the state arrays (applied by the Simulator's update buffer)
+        self.delta = {}
+        self.__reset_delta(0)
+        self.network = DiffusionNetwork(self.state, self.delta, kernels=self.kernels)
+        # (state generation, lengths below which the time step of a run with dt "auto" is evaluated again), see
+        # Compartment.update_length
+        self.stable_lengths = None
+
+    def __reset_delta(self, n: int):
+        """
+        Allocate the change in ions of n compartments, those of the species as the rows of one block (species x
+        compartments)
+        """
+        self.delta_concentrations = np.zeros((len(self.state.species), n))
+        for i, name in enumerate(self.state.species.names):
+            self.delta[name] = self.delta_concentrations[i]
+        for name in DELTA_FIELDS:
+            if name not in self.state.species.index:
+                self.delta[name] = np.zeros(n)
+
+    def is_network_edge(self, obj):
+        """
+        Only Diffusion (not subclasses) between compartments bound to this engine can be part of the network.
+        """
+        from diffusion import Diffusion
+        return type(obj) is Diffusion \
+            and isinstance(obj.comp_a, CompartmentView) and obj.comp_a._state is self.state \
+            and isinstance(obj.comp_b, CompartmentView) and obj.comp_b._state is self.state \
+            and all(ion in self.delta for ion in obj.ions)
+
+    def object_list(self, object_list, update_buffer):
+        """
+        Bind any newly registered vectorizable compartments and get the list of objects to step.
+
+        :param object_list: Simulator's list of registered objects
+        :param update_buffer: Simulator's DeferredUpdateBuffer, which accumulates ion changes in this engine's arrays
+        :return: object list with all bound compartments replaced by this engine (at the first one's position) and
+        all network edges replaced by the network
+        """
+        for obj in object_list:
+            if not isinstance(obj, CompartmentView) and is_vectorizable(obj):
+                self.state.bind(obj)
+        if len(self.delta["nai"]) != self.state.n:
+            update_buffer.reset()
+            self.__reset_delta(self.state.n)
+            update_buffer.add_block(self.state, self.delta, self.state.compartments)
+        edges = set(self.network.edges)
+        for obj in object_list:
+            if obj not in edges and self.is_network_edge(obj):
+                self.network.add(obj)
+                edges.add(obj)
+        step_list = []
+        engine_listed = network_listed = False
+        for obj in object_list:
+            if isinstance(obj, CompartmentView) and obj._state is self.state:
+                if not engine_listed:
+                    step_list.append(self)
+                    engine_listed = True
+            elif obj in edges:
+                if not network_listed:
+                    step_list.append(self.network)
+                    network_listed = True
+            else:
+                step_list.append(obj)
+        return step_list
+
+    def remove(self, obj):
+        """
+        Remove a bound compartment (returning it to a plain object) or a network edge from the engine.
+        Edges of a compartment must be removed before it.
+        """
+        if isinstance(obj, CompartmentView) and obj._state is self.state:
+            index, moved = self.state.unbind(obj)
+            self.network.relabel(moved, index)
+            # the update buffer's slots are aligned again with the arrays by the next object_list
+            self.__reset_delta(0)
+        elif obj in self.network:
+            self.network.remove(obj)
+
+    def sync(self):
+        """
+        Update objects that are not views of the state arrays (i.e. Diffusion objects) at the end of a run.
+        """
+        self.network.sync()
+
+    def release(self):
+        """
+        Return all compartments to plain objects.
+        """
+        self.network.sync()
+        self.state.unbind_all()
+        self.__reset_delta(0)
+        self.network = DiffusionNetwork(self.state, self.delta, kernels=self.kernels)
+
+    def step(self, _time: Time = None):
+        """
+        Vectorized Compartment.step for all bound compartments.
+        :param _time: time object for reference
+        """
+        if _time is None:
+            raise ValueError("{} has no time object specified".format(self.__class__.__name__))
+        if self.kernels is not None:
+            self.kernels.compartment_step(self.state.views, self.delta, _time.dt)
+            simulator.Simulator.get_instance().to_update_method(self, type(self).update_values)
+            return
+        s = self.state.views
+        self.update_voltage()
+        dC = self.__membrane(s, self.state.concentrations, self.state.concentrations_out, _time.dt)
+        self.delta_concentrations[:len(dC)] += dC
+        self.delta["xi_temp"] += s["dxi"]
+        simulator.Simulator.get_instance().to_update_method(self, type(self).update_values)
+
+    def step_compartments(self, index, dt, ratio):
+        """
+        Vectorized Compartment.step for some of the bound compartments, each with its own time step (see
+        local_stepping.LocalTimeStepping). Always done with NumPy array operations.
+
+        :param index: indices of the compartments in the state arrays (sorted)
+        :param dt: time step of each compartment
+        :param ratio: time step of each compartment relative to that jkccup and dz are defined for
+        """
+        s, C, C_out = self.__gather(index)
+        s = dict(s, jkccup=s["jkccup"] * ratio, dz=s["dz"] * ratio)
+        dC = self.__membrane(s, C, C_out, dt)
+        self.__scatter(index, s, STEP_FIELDS)
+        self.delta_concentrations[:len(dC), index] += dC
+        self.delta["xi_temp"][index] += s["dxi"]
+        simulator.Simulator.get_instance().to_update(self, self.name, lambda: self.update_values(index),
+                                                     UpdateType.FUNCTION)
+
+    def __gather(self, index, fields=None):
+        """
+        :param index: indices of the compartments in the state arrays (sorted)
+        :param fields: fields of the state arrays (default: all)
+        :return: the state arrays of the compartments at index, and their concentrations inside and outside (species x
+        compartments): the views of the state if index is all compartments, otherwise copies
+        """
+        state = self.state
+        if len(index) == state.n:
+            return state.views, state.concentrations, state.concentrations_out
+        if fields is None:
+            fields = state.views
+        return ({name: state.views[name][index] for name in fields}, state.concentrations[:, index],
+                state.concentrations_out[:, index])
+
+    def __scatter(self, index, s, fields):
+        """
+        Write the fields of the arrays s from __gather back into the state arrays
+        """
+        if len(index) != self.state.n:
+            for name in fields:
+                self.state.views[name][index] = s[name]
+
+    def __membrane(self, s, C, C_out, dt):
+        """
+        Membrane fluxes and volume change of Compartment.step, for the compartments of the arrays s (views or copies of
+        the state arrays) with concentrations C and C_out (species x compartments).
+        Writes the rates and reversal potentials (see STEP_FIELDS) into s.
+
+        :return: change in the concentrations of the permeant species (species x compartments)
+        """
+        sp = self.state.species
+        nai, ki, cli, xm, xi_temp = s["nai"], s["ki"], s["cli"], s["xm"], s["xi_temp"]
+        Ar = s["Ar"]
+        V = s["V"]
+        # update cubic pump rate (dependent on sodium gradient)
+        s["jp"][:] = s["p"] * (nai / s["nao"]) ** 3
+        # kcc2 (jkccup is nan where there is no ramp)
+        np.add(s["pkcc2"], s["jkccup"], out=s["pkcc2"], where=~np.isnan(s["jkccup"]))
+        s["jkcc2"][:] = s["pkcc2"] * (s["ek"] - s["ecl"])
+
+        s["xz"] -= s["dz"]
+        s["z"][:] = (s["xmz"] * xm + s["xz"] * xi_temp) / s["xi"]
+
+        # ionic flux equations, for all permeant species at once (species x compartments): the leak through the
+        # membrane conductance of each species, and the pump and KCC2 for na, k and cl (rows 0, 1 and 2)
+        permeant = sp.n_permeant
+        z = sp.z[:permeant, np.newaxis]
+        E = RTF / z * np.log(C_out[:permeant] / C[:permeant])
+        J = sp.g[:permeant, np.newaxis] * (V - E) / z
+        J[0] += cna * s["jp"]
+        J[1] -= ck * s["jp"]
+        J[1] -= s["jkcc2"]
+        J[2] -= s["jkcc2"]
+        dC = -dt * Ar * J
+        s["dnai"][:] = dC[0]
+        s["dki"][:] = dC[1]
+        s["dcli"][:] = dC[2]
+        s["dxi"][:] = np.where(s["gx"] != 0, 6e-9 * Ar * dt, 0)
+
+        s["ek"][:] = RTF * np.log(s["ko"] / ki)
+        s["ecl"][:] = RTF * np.log(cli / s["clo"])
+
+        w, sa = s["w"], s["sa"]
+        s["w2"][:] = np.where(s["stretch_w"],
+                              w + dt * (vw * pw * sa * (s["osi"] - oso - 4 * km * np.pi * (1 - s["r1"] / s["r"]) / RT)),
+                              w + dt * (vw * pw * sa * (s["osi"] - oso)))
+        return dC
+
+    def update_voltage(self, index=None):
+        """
+        Vectorized Compartment.update_voltage for all bound compartments.
+
+        :param index: indices of the compartments to update (default: all)
+        """
+        if index is None:
+            self.__voltage(self.state.views, self.state.concentrations)
+            return
+        s, C, C_out = self.__gather(index, VOLTAGE_FIELDS)
+        self.__voltage(s, C)
+        self.__scatter(index, s, ("xi", "V"))
+
+    def __voltage(self, s, C):
+        """
+        Write xi and V into the arrays s of compartments with concentrations C (see __membrane)
+        """
+        sp = self.state.species
+        s["xi"][:] = s["xm"] + s["xi_temp"]
+        s["V"][:] = s["FinvCAr"] * (s["nai"] + s["ki"] - s["cli"] + s["z"] * s["xi"])
+        if len(sp) > sp.n_core:
+            s["V"] += s["FinvCAr"] * (sp.z[sp.n_core:, np.newaxis] * C[sp.n_core:]).sum(axis=0)
+
+    def update_values(self, index=None):
+        """
+        Vectorized Compartment.update_values for all bound compartments.
+        Called after the deferred ion changes have been applied.
+
+        :param index: indices of the compartments to update (default: all), updated with NumPy array operations
+        """
+        if index is None:
+            if self.kernels is not None:
+                self.kernels.update_values(self.state.views)
+            else:
+                self.__values(self.state.views, self.state.concentrations[self.state.species.n_core:])
+            self.__check_lengths()
+            return
+        s, C, C_out = self.__gather(index, VALUES_FIELDS + ("w2", "r"))
+        extra = C[self.state.species.n_core:]
+        self.__values(s, extra)
+        self.__scatter(index, s, VALUES_FIELDS)
+        if len(index) != self.state.n:
+            self.state.concentrations[self.state.species.n_core:, index] = extra
+        self.__check_lengths(index)
+
+    def __check_lengths(self, index=None):
+        """
+        As Compartment.update_length, tell the Simulator when a compartment has become shorter than its stable length
+        (see stable_lengths)
+
+        :param index: indices of the compartments updated (default: all)
+        """
+        if self.stable_lengths is None or self.stable_lengths[0] != self.state.generation:
+            return
+        L, lengths = self.state["L"], self.stable_lengths[1]
+        if index is not None:
+            L, lengths = L[index], lengths[index]
+        if np.any(L < lengths):
+            simulator.Simulator.get_instance().geometry_changed()
+
+    def __values(self, s, extra):
+        """
+        Compartment.update_values for the arrays s of compartments with concentrations extra of the species besides na,
+        k and cl (see __membrane)
+        """
+        s["xi"][:] = s["xm"] + s["xi_temp"]
+        s["osi"][:] = s["nai"] + s["ki"] + s["cli"] + s["xi"]
+        for concentration in extra:
+            s["osi"] += concentration
+        # correct ionic concentrations by volume change
+        for name in ("nai", "ki", "cli", "xi_temp", "xm"):
+            s[name][:] = (s[name] * s["w"]) / s["w2"]
+        extra[:] = (extra * s["w"]) / s["w2"]
+        s["w"][:] = s["w2"]
+        # affect volume change into length change
+        s["L"][:] = s["w"] / (np.pi * s["r"] ** 2)
+        s["absox"][:] = s["xi"] * s["w"]
+
+    def __getitem__(self, item):
+        return self.__dict__[item]
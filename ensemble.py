@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import copy
+import numpy as np
+import simulator
+from compartment import Compartment
+from diffusion import Diffusion
+from engine import CompartmentView
+from sim_time import TimeMixin, Time
+
+
+class Ensemble(TimeMixin):
+    """
+    Many variants (members) of the same model advanced together in one Simulator.run.
+
+    The compartments and diffusion registered with the Simulator are the model (member 0). Each other member is a copy
+    of them, with the same topology, registered with the Simulator, so that the vector engine advances all members in
+    the same arrays. Parameters and state of the members are set and read as arrays with a leading member dimension:
+        ensemble.set("gx", [0, 1e-8, 2e-8])         one value per member for every compartment
+        ensemble.set("gx", values, compartment)     one value per member for one compartment of the model
+        ensemble["cli"]                             (members x compartments)
+        ensemble.traces("cli")                      (members x samples x compartments), at ensemble.times
+
+    Usage:
+        ...build the model...
+        ensemble = Ensemble(100)
+        ensemble.set("jkccup", np.linspace(0, 1e-12, 100))
+        ensemble.run(continuefor=10, dt=1e-3)
+        final_cli = ensemble["cli"]
+    """
+
+    def __init__(self, size: int, variables=("nai", "ki", "cli", "xi", "V", "w"), data_collect_interval=None):
+        """
+        :param size: number of members (including the model itself)
+        :param variables: compartment variables recorded during a run
+        :param data_collect_interval: time between recorded samples (in s) (default: every step of the run)
+        """
+        sim = simulator.Simulator.get_instance()
+        self.name = "ensemble"
+        self.size = size
+        self.variables = list(variables)
+        self.data_collect_interval = data_collect_interval
+        model = [obj for obj in sim.object_list() if isinstance(obj, Compartment)]
+        model_diffusion = [obj for obj in sim.object_list() if isinstance(obj, Diffusion)]
+        # compartments of each member (members x compartments) and their diffusion
+        self.compartments = [model]
+        self.diffusion = [model_diffusion]
+        for m in range(1, size):
+            copies = {}
+            for comp in model:
+                copies[comp] = comp.deepcopy("{} [{}]".format(comp.name, m))
+            self.compartments.append([copies[comp] for comp in model])
+            self.diffusion.append([self.__copy_diffusion(diffusion, copies, m) for diffusion in model_diffusion])
+        self.times = []
+        self.__samples = {var: [] for var in self.variables}
+        self.__last_sample = None
+        self.__index_cache = None
+        sim.register_compartment(self)
+
+    @staticmethod
+    def __copy_diffusion(diffusion, copies, m):
+        """
+        :return: copy of diffusion between the copies of its compartments
+        """
+        new = copy.copy(diffusion)
+        new.comp_a = copies[diffusion.comp_a]
+        new.comp_b = copies[diffusion.comp_b]
+        new.ions = dict(diffusion.ions)
+        new.ionjnet = dict(diffusion.ionjnet)
+        new.name = "{} [{}]".format(diffusion.name, m)
+        simulator.Simulator.get_instance().register_compartment(new)
+        return new
+
+    def __indices(self):
+        """
+        :return: index of each compartment in the vector engine's arrays (members x compartments), or None if not all
+        compartments are bound to the engine
+        """
+        engine = simulator.Simulator.engine()
+        if engine is None:
+            return None
+        state = engine.state
+        if self.__index_cache is not None and self.__index_cache[0] is state \
+                and self.__index_cache[1] == state.generation:
+            return self.__index_cache[2]
+        indices = np.empty((self.size, len(self.compartments[0])), dtype=np.int64)
+        for m, comps in enumerate(self.compartments):
+            for j, comp in enumerate(comps):
+                if not isinstance(comp, CompartmentView) or comp._state is not state:
+                    return None
+                indices[m, j] = comp._index
+        # compartments keep their index until a compartment is bound to or unbound from the state
+        self.__index_cache = (state, state.generation, indices)
+        return indices
+
+    def get(self, var: str):
+        """
+        :param var: compartment variable
+        :return: value of var of every compartment of every member (members x compartments)
+        """
+        indices = self.__indices()
+        if indices is not None:
+            return simulator.Simulator.engine().state[var][indices]
+        return np.array([[comp[var] for comp in comps] for comps in self.compartments], dtype=np.float64)
+
+    def __getitem__(self, var: str):
+        return self.get(var)
+
+    def set(self, var: str, values, compartment: Compartment = None):
+        """
+        Set a compartment variable (parameter or state) of each member.
+
+        :param var: compartment variable
+        :param values: one value per member, (members x compartments) values, or a single value for all
+        :param compartment: compartment of the model (member 0) to set var for in each member (default: all)
+        """
+        model = self.compartments[0]
+        columns = range(len(model)) if compartment is None else [model.index(compartment)]
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+        values = np.broadcast_to(values, (self.size, len(columns)))
+        for m, comps in enumerate(self.compartments):
+            for k, j in enumerate(columns):
+                comps[j][var] = values[m, k]
+
+    def set_diffusion(self, ion: str, values, diffusion: Diffusion = None):
+        """
+        Set the diffusion coefficient of an ion of each member.
+
+        :param ion: ion (e.g. 'cli')
+        :param values: one diffusion coefficient per member (dm2/s), or a single value for all
+        :param diffusion: Diffusion of the model (member 0) to set the coefficient for in each member (default: all
+        that carry ion)
+        """
+        model = self.diffusion[0]
+        columns = range(len(model)) if diffusion is None else [model.index(diffusion)]
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), (self.size,))
+        engine = simulator.Simulator.engine()
+        network = engine.network if engine is not None else None
+        for m, edges in enumerate(self.diffusion):
+            for j in columns:
+                edge = edges[j]
+                if ion not in edge.ions:
+                    continue
+                edge.ions[ion] = values[m]
+                row = None if network is None else network.row(edge)
+                if row is not None:
+                    network.D[row, network.ions.index(ion)] = values[m]
+
+    def step(self, _time: Time = None):
+        """
+        Record the variables of every member (once per sample time)
+        """
+        t = _time.time
+        interval = self.data_collect_interval or _time.dt
+        # (time moves back when a run starts again from 0)
+        if self.__last_sample is not None and self.__last_sample <= t < self.__last_sample + interval * (1 - 1e-9):
+            return
+        self.__last_sample = t
+        self.times.append(t)
+        indices = self.__indices()
+        for var in self.variables:
+            if indices is not None:
+                self.__samples[var].append(simulator.Simulator.engine().state[var][indices])
+            else:
+                self.__samples[var].append(self.get(var))
+
+    def traces(self, var: str):
+        """
+        :param var: one of the recorded variables
+        :return: recorded values of var (members x samples x compartments), sampled at times
+        """
+        if not self.__samples[var]:
+            return np.zeros((self.size, 0, len(self.compartments[0])))
+        return np.stack(self.__samples[var], axis=1)
+
+    def clear(self):
+        """
+        Discard the recorded samples
+        """
+        self.times = []
+        self.__samples = {var: [] for var in self.variables}
+        self.__last_sample = None
+
+    def run(self, **kwargs):
+        """
+        Simulator.run with the vector engine (all members advanced together)
+
+        :param kwargs: arguments of Simulator.run
+        """
+        kwargs.setdefault("engine", "vector")
+        simulator.Simulator.run(**kwargs)
+        return self
@@ -5,7 +5,7 @@ Python 3.x targeted
 @author: Chris Currin & Kira Dusterwald
 """
 import matplotlib.pyplot as plt
-import numpy as np
+from recorder import Recorder
 
 class Graph(object):
     """
@@ -19,6 +19,8 @@ class Graph(object):
         self.ax = self.fig.add_subplot(111)
         self.background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
         self.follow_list = []
+        # values of the variables tracked, recorded at each update
+        self.recorder = Recorder()
         self.fig.canvas.draw()
 
     def add_var(self, x_object: any, x_var: str or dict, y_object: any, y_var: str or dict, line_style: str = None,
@@ -80,12 +82,11 @@ class Graph(object):
             else:
                 line, = self.ax.plot([], [], line_style, label=label)
             plt.pause(0.000001)
-            # store
+            # store the recorder channels of the variables
             self.follow_list.append(
-                ((x_object, x_var, np.array([], dtype=np.float64)),
-                (y_object, y_var, np.array([], dtype=np.float64), y_units_scale),
+                ((x_object, x_var, self.__channels(x_object, x_var)),
+                (y_object, y_var, self.__channels(y_object, y_var, y_units_scale), y_units_scale),
                 line))
-            # self.follow_list.append(((x_object, x_var, []), (y_object, y_var, [], y_units_scale), line))
             # auto-legend
             self.ax.legend(loc=3)
             self.update()
@@ -112,37 +113,44 @@ class Graph(object):
         """
         return self.add_var(self.time, "time", y_object, ion, **kwargs)
 
+    def __channels(self, obj, var, units_scale=1.0):
+        """
+        :return: recorder channels of an object's variable (one per entry if var is a dictionary)
+        """
+        if isinstance(var, dict):
+            return [self.recorder.add(obj, {key: val}, units_scale) for (key, val) in var.items()]
+        return [self.recorder.add(obj, var, units_scale)]
+
+    def __values(self, channels):
+        """
+        :return: recorded values of channels (samples x channels if several, flattened by matplotlib), a view of the
+        recorder's storage if the channels are contiguous
+        """
+        if len(channels) == 1:
+            return self.recorder[channels[0]]
+        start = channels[0]
+        if channels == list(range(start, start + len(channels))):
+            return self.recorder.buffer.view()[:, start:start + len(channels)]
+        return self.recorder.buffer.view()[:, channels]
+
     def clear(self):
         """
         Clear the plot of all values, erasing history of x and y variables.
         """
-        for i, (x_tuple, y_tuple, line) in enumerate(self.follow_list):
-            (x_object, x_var, x_data) = x_tuple
-            (y_object, y_var, y_data, units_scale) = y_tuple
-            self.follow_list[i] = ((x_object, x_var, np.array([], dtype=np.float64)),
-                                   (y_object, y_var, np.array([], dtype=np.float64), units_scale), line)
+        self.recorder.clear()
 
     def update(self):
         """
         Get the values for x-var and y-var from their respective objects for future plotting.
         """
-        for i, (x_tuple, y_tuple, line) in enumerate(self.follow_list):
-            (x_object, x_var, x_data) = x_tuple
-            (y_object, y_var, y_data, units_scale) = y_tuple
-            if isinstance(x_var, str):
-                x_data = np.append(x_data,x_object[x_var])
-            elif isinstance(x_var, dict):
-                for (key, val) in x_var.items():
-                    x_data = np.append(x_data,x_object[key][val])
-            if isinstance(y_var, str):
-                y_data = np.append(y_data,y_object[y_var] * units_scale)
-            elif isinstance(y_var, dict):
-                for (key, val) in y_var.items():
-                    y_data = np.append(y_data,y_object[key][val] * units_scale)
-            # replace object at index i
-            self.follow_list[i] = ((x_object, x_var, x_data),
-                                   (y_object, y_var, y_data, units_scale),
-                                    line)
+        self.recorder.record()
+
+    def data(self):
+        """
+        :return: dictionary of {line label: (x values, y values)} recorded so far
+        """
+        return {line.get_label(): (self.__values(x_tuple[2]), self.__values(y_tuple[2]))
+                for x_tuple, y_tuple, line in self.follow_list}
 
     def plot_graph(self):
         """
@@ -150,11 +158,9 @@ class Graph(object):
         Graph is automatically scaled.
         plt.pause(small_time_value) is necessary to have the change be visible
         """
-        for i, (x_tuple, y_tuple, line) in enumerate(self.follow_list):
-            (x_object, x_var, x_data) = x_tuple
-            (y_object, y_var, y_data, units_scale) = y_tuple
-            line.set_xdata(x_data)
-            line.set_ydata(y_data)
+        for (x_tuple, y_tuple, line) in self.follow_list:
+            line.set_xdata(self.__values(x_tuple[2]))
+            line.set_ydata(self.__values(y_tuple[2]))
             self.fig.canvas.restore_region(self.background)
             # redraw just the points
             self.ax.draw_artist(line)
@@ -4,94 +4,89 @@ Created on Mon Aug 22 2016
 Python 3.x targeted
 @author: Chris Currin & Kira Dusterwald
 """
+import os
 import matplotlib
-matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 from graph import Graph
 
 
 class GUI(object):
     """
-    Instantiates a GUI
-    Unique Pattern
-    A note on patterns: http://stackoverflow.com/questions/1318406/why-is-the-borg-pattern-better-than-the-singleton-pattern-in-python
+    Graphs of a Simulator (see Simulator.gui), recorded and plotted on its clock. Each Simulator has its own GUI, so
+    that independent Simulators do not record into each other's graphs; the matplotlib window is that of the process.
     """
-    # list of graphs
-    __graph_list = []
-    # simulation time object reference
-    __time = None
 
-    def __init__(self):
-        raise SyntaxError("GUI called using __init__ instead of init")
+    def __init__(self, _time, headless=False):
+        """
+        Makes graphics interactive (non-blocking)
+        :param _time: simulation time object of the Simulator
+        :param headless: draw graphs off-screen (Agg backend), e.g. on machines without a display
+        """
+        # list of graphs
+        self.__graph_list = []
+        # simulation time object reference
+        self.__time = _time
+        # the backend can also be chosen with $MPLBACKEND
+        if "MPLBACKEND" not in os.environ:
+            matplotlib.use('Agg' if headless else 'TkAgg')
+        if not headless:
+            plt.ion()
 
     @classmethod
-    def init(cls, _time):
+    def init(cls, _time, headless=False):
         """
-        Instantiates a new GUI, or overwrites _time, and makes graphics interactive (non-blocking)
-        :param _time: simulation time object
-        :return: class object
+        Instantiates a new GUI (see __init__)
+        :return: GUI
 
         Usage:
-        gui = GUI.init()
+        gui = GUI.init(sim.time())
         """
-        GUI.__time = _time
-        plt.ion()
-        return cls
+        return cls(_time, headless)
 
-    @classmethod
-    def __graphs(cls):
+    def graphs(self):
         """
-        Get all graphs in GUI
-        :return: graph list
+        :return: list of the GUI's graphs
         """
-        return cls.__graph_list
+        return list(self.__graph_list)
 
-    @classmethod
-    def add_graph(cls):
+    def add_graph(self):
         """
         Add Graph object to graph list
         :return:
         """
-        g = Graph(cls.__time)
-        GUI.__graph_list.append(g)
+        g = Graph(self.__time)
+        self.__graph_list.append(g)
         return g
 
-    @classmethod
-    def clear_graphs(cls):
+    def clear_graphs(self):
         """
         Call all GUI's graphs to clear their contents
         """
-        for graph in cls.__graph_list:
+        for graph in self.__graph_list:
             graph.clear()
 
-    @classmethod
-    def close_graphs(cls):
+    def close_graphs(self):
         """
         Close all GUI's graph's
         """
-        plt.close('all')
-        cls.__graph_list = []
+        for graph in self.__graph_list:
+            plt.close(graph.fig)
+        self.__graph_list = []
 
-    @classmethod
-    def update_graphs(cls):
+    def update_graphs(self):
         """
         Call all GUI's graphs to update their values (does not mean plot)
         """
-        for graph in cls.__graph_list:
+        for graph in self.__graph_list:
             graph.update()
 
-    @classmethod
-    def plot_graphs(cls):
+    def plot_graphs(self):
         """
         Call all GUI's graphs to plot their contents
         """
-        for graph in cls.__graph_list:
+        for graph in self.__graph_list:
             graph.plot_graph()
 
-    @classmethod
-    def block(cls, block=True):
+    @staticmethod
+    def block(block=True):
         plt.show(block=block)
-
-
-# generator methods for class methods
-new_graph = GUI.add_graph
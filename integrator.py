@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import numpy as np
+from scipy import integrate
+
+# default tolerances
+RTOL = 1e-6
+ATOL = 1e-9
+
+
+def sample_grid(start, stop, interval):
+    """
+    Times that are multiples of interval in [start, stop), as for data collection in Simulator.run.
+    """
+    first = int(np.ceil(round(start / interval, 9)))
+    last = int(np.ceil(round(stop / interval, 9)))
+    return np.arange(first, last) * interval
+
+
+class Integrator(object):
+    """
+    Advances a CompartmentSystem (see system.py) from one time to another, calling back at requested sample times
+    with the state at exactly those times.
+    """
+
+    def __init__(self, system, rtol=RTOL, atol=ATOL):
+        """
+        :param system: CompartmentSystem
+        :param rtol: relative tolerance, or dictionary of {field: relative tolerance} (see system.SYSTEM_FIELDS)
+        :param atol: absolute tolerance, relative to the typical magnitude of each variable (see CompartmentSystem.scale),
+        or dictionary of {field: absolute tolerance} in the units of each field
+        """
+        self.system = system
+        self.rtol = rtol
+        self.atol = atol
+        self.stats = {}
+
+    def tolerances(self, y):
+        """
+        :param y: state vector at the start of integration
+        :return: relative and absolute tolerance of each variable
+        """
+        rtol = np.empty_like(y)
+        atol = self.atol * self.system.scale(y) if not isinstance(self.atol, dict) else np.empty_like(y)
+        rtols, atols = self.system.split(rtol), self.system.split(atol)
+        scale = self.system.split(self.system.scale(y))
+        for field in self.system.fields:
+            if isinstance(self.rtol, dict):
+                rtols[field][:] = self.rtol.get(field, RTOL)
+            else:
+                rtols[field][:] = self.rtol
+            if isinstance(self.atol, dict):
+                atols[field][:] = self.atol[field] if field in self.atol else ATOL * scale[field]
+        return rtol, atol
+
+    def integrate(self, t0, t_stop, sample_times=(), callback=None):
+        """
+        :param t0: start time (s)
+        :param t_stop: end time (s)
+        :param sample_times: sorted times in [t0, t_stop) at which to call callback
+        :param callback: function of (t, y)
+        :return: state vector at t_stop
+        """
+        raise NotImplementedError
+
+
+class ImplicitIntegrator(Integrator):
+    """
+    Implicit stiff integrator (scipy's variable-order BDF or Radau IIA).
+    The sparsity structure of the Jacobian is supplied by the system, so the Jacobian is formed from a few grouped
+    finite differences and factorised as a sparse matrix.
+    """
+    methods = {"bdf": integrate.BDF, "radau": integrate.Radau}
+
+    def __init__(self, system, method="bdf", rtol=RTOL, atol=ATOL, first_step=None, max_step=np.inf):
+        """
+        :param method: "bdf" or "radau"
+        :param first_step: initial step size (s), default: chosen by the solver
+        :param max_step: largest step size allowed (s)
+        """
+        super().__init__(system, rtol, atol)
+        if method.lower() not in self.methods:
+            raise ValueError("unknown method '{}', expected one of {}".format(method, list(self.methods)))
+        self.method = method.lower()
+        self.first_step = first_step
+        self.max_step = max_step
+
+    def integrate(self, t0, t_stop, sample_times=(), callback=None):
+        y0 = self.system.pack()
+        if t_stop <= t0:
+            return y0
+        rtol, atol = self.tolerances(y0)
+        # scipy takes a single relative tolerance, so the tightest one is used
+        solver = self.methods[self.method](self.system.rhs, t0, y0, t_stop, rtol=np.min(rtol), atol=atol,
+                                           jac_sparsity=self.system.jac_sparsity(),
+                                           first_step=self.first_step, max_step=self.max_step)
+        i = 0
+        while i < len(sample_times) and sample_times[i] <= t0:
+            if callback is not None:
+                callback(sample_times[i], y0)
+            i += 1
+        steps = 0
+        while solver.status == "running":
+            message = solver.step()
+            if solver.status == "failed":
+                raise RuntimeError("{} integration failed at t={}: {}".format(self.method, solver.t, message))
+            steps += 1
+            if i < len(sample_times) and sample_times[i] <= solver.t:
+                dense = solver.dense_output()
+                while i < len(sample_times) and sample_times[i] <= solver.t:
+                    if callback is not None:
+                        callback(sample_times[i], dense(sample_times[i]))
+                    i += 1
+        self.stats = {"steps": steps, "rhs evaluations": solver.nfev, "jacobian evaluations": solver.njev,
+                      "lu decompositions": solver.nlu}
+        return solver.y
+
+
+class AdaptiveIntegrator(Integrator):
+    """
+    Explicit Runge-Kutta integrator with adaptive step size: the Dormand-Prince 5(4) pair.
+    Each step is taken with the 5th order solution and its error is estimated from the embedded 4th order solution.
+    A step is accepted if the error of every variable is within atol + rtol * |y| (in the root-mean-square sense);
+    the next step size grows or shrinks with the error. Values between steps come from the method's 4th order
+    continuous extension, so samples are at exactly the requested times without shortening steps.
+    """
+    # Butcher tableau
+    C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1])
+    A = [np.array([]),
+         np.array([1 / 5]),
+         np.array([3 / 40, 9 / 40]),
+         np.array([44 / 45, -56 / 15, 32 / 9]),
+         np.array([19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729]),
+         np.array([9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656])]
+    B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+    # difference between the 5th and 4th order weights (the last stage is the derivative at the new point)
+    E = np.array([-71 / 57600, 0, 71 / 16695, -71 / 1920, 17253 / 339200, -22 / 525, 1 / 40])
+    # continuous extension: y(t + x*h) = y + h * K.T @ P @ [x, x^2, x^3, x^4]
+    P = np.array([
+        [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+        [0, 0, 0, 0],
+        [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+        [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+        [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+        [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+        [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423]])
+    # step size control
+    safety = 0.9
+    min_factor = 0.2
+    max_factor = 5.0
+
+    def __init__(self, system, rtol=RTOL, atol=ATOL, first_step=None, max_step=np.inf, min_step=1e-15):
+        """
+        :param first_step: initial step size (s), default: estimated from the derivatives at the start
+        :param max_step: largest step size allowed (s)
+        :param min_step: smallest step size allowed (s) before integration fails
+        """
+        super().__init__(system, rtol, atol)
+        self.first_step = first_step
+        self.max_step = max_step
+        self.min_step = min_step
+
+    def integrate(self, t0, t_stop, sample_times=(), callback=None):
+        evaluations = [0]
+
+        def rhs(_t, _y):
+            evaluations[0] += 1
+            return self.system.rhs(_t, _y)
+
+        y = self.system.pack()
+        if t_stop <= t0:
+            return y
+        rtol, atol = self.tolerances(y)
+        K = np.empty((7, len(y)))
+        K[0] = rhs(t0, y)
+        h = self.first_step
+        if h is None:
+            # step over which the solution changes by about the tolerance
+            d = np.sqrt(np.mean((K[0] / (atol + rtol * np.abs(y))) ** 2))
+            h = 0.01 / d if d > 1e-10 else 1e-6
+        h = min(h, self.max_step, t_stop - t0)
+        t = t0
+        accepted = rejected = 0
+        i = 0
+        while i < len(sample_times) and sample_times[i] <= t0:
+            if callback is not None:
+                callback(sample_times[i], y)
+            i += 1
+        while t < t_stop:
+            h = min(h, t_stop - t)
+            for s in range(1, 6):
+                K[s] = rhs(t + self.C[s] * h, y + h * (self.A[s] @ K[:s]))
+            y_new = y + h * (self.B @ K[:6])
+            K[6] = rhs(t + h, y_new)
+            error = h * (self.E @ K) / (atol + rtol * np.maximum(np.abs(y), np.abs(y_new)))
+            error_norm = np.sqrt(np.mean(error ** 2))
+            if not np.isfinite(error_norm) or error_norm > 1:
+                # reject the step and try again with a smaller one
+                rejected += 1
+                if np.isfinite(error_norm):
+                    h *= max(self.min_factor, self.safety * error_norm ** -0.2)
+                else:
+                    h *= self.min_factor
+                if h < self.min_step:
+                    raise RuntimeError("step size {} below minimum at t={}".format(h, t))
+                continue
+            accepted += 1
+            t_new = t + h
+            if t_stop - t_new < self.min_step:
+                t_new = t_stop
+            if i < len(sample_times) and sample_times[i] <= t_new:
+                Q = K.T @ self.P
+                while i < len(sample_times) and sample_times[i] <= t_new:
+                    x = (sample_times[i] - t) / h
+                    if callback is not None:
+                        callback(sample_times[i], y + h * (Q @ np.cumprod([x] * 4)))
+                    i += 1
+                # callbacks may change parameters, so the derivative at the new point is re-evaluated
+                K[6] = rhs(t_new, y_new)
+            t, y = t_new, y_new
+            K[0] = K[6]
+            if error_norm == 0:
+                factor = self.max_factor
+            else:
+                factor = min(self.max_factor, self.safety * error_norm ** -0.2)
+            h = min(h * factor, self.max_step)
+        self.stats = {"accepted steps": accepted, "rejected steps": rejected,
+                      "rhs evaluations": evaluations[0]}
+        return y
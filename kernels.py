@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Per-step kernels of the vector engine written as single loops over compartments and edges, which Numba (an optional
+dependency) compiles into machine code that fuses every operation of a step.
+
+Backends (see VectorEngine):
+    "numpy"     array operations of engine.VectorEngine and diffusion_network.DiffusionNetwork (default)
+    "loop"      the loops below run by the interpreter (slow; used to check the loops without Numba)
+    "jit"       the loops below compiled by Numba, or "numpy" if Numba is not installed
+"""
+import math
+import warnings
+import numpy as np
+from common import oso, gk, gna, gcl, ck, cna, pw, vw, km, RTF, RT
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("numpy", "loop", "jit")
+
+
+def _compartment_step(dt, nai, ki, cli, xi, xm, xi_temp, osi, w, w2, sa, r, r1, Ar, FinvCAr, V, jp, p, pkcc2,
+                      jkccup, jkcc2, ek, ecl, z, xz, xmz, gx, dz, nao, ko, clo, dnai, dki, dcli, dxi, stretch_w,
+                      delta_nai, delta_ki, delta_cli, delta_xi_temp):
+    """
+    Compartment.step of every compartment (see VectorEngine.step)
+    """
+    for i in range(nai.shape[0]):
+        # update voltage
+        xi[i] = xm[i] + xi_temp[i]
+        V[i] = FinvCAr[i] * (nai[i] + ki[i] - cli[i] + z[i] * xi[i])
+        # update cubic pump rate (dependent on sodium gradient)
+        jp[i] = p[i] * (nai[i] / nao[i]) ** 3
+        # kcc2 (jkccup is nan where there is no ramp)
+        if not math.isnan(jkccup[i]):
+            pkcc2[i] = pkcc2[i] + jkccup[i]
+        jkcc2[i] = pkcc2[i] * (ek[i] - ecl[i])
+
+        xz[i] = xz[i] - dz[i]
+        z[i] = (xmz[i] * xm[i] + xz[i] * xi_temp[i]) / xi[i]
+
+        # ionic flux equations
+        dnai[i] = -dt * Ar[i] * (gna * (V[i] - RTF * math.log(nao[i] / nai[i])) + cna * jp[i])
+        dki[i] = -dt * Ar[i] * (gk * (V[i] - RTF * math.log(ko[i] / ki[i])) - ck * jp[i] - jkcc2[i])
+        dcli[i] = dt * Ar[i] * (gcl * (V[i] + RTF * math.log(clo[i] / cli[i])) + jkcc2[i])
+        dxi[i] = 6e-9 * Ar[i] * dt if gx[i] != 0 else 0.0
+
+        ek[i] = RTF * math.log(ko[i] / ki[i])
+        ecl[i] = RTF * math.log(cli[i] / clo[i])
+
+        delta_nai[i] += dnai[i]
+        delta_ki[i] += dki[i]
+        delta_cli[i] += dcli[i]
+        delta_xi_temp[i] += dxi[i]
+
+        if stretch_w[i]:
+            w2[i] = w[i] + dt * (vw * pw * sa[i] * (osi[i] - oso - 4 * km * np.pi * (1 - r1[i] / r[i]) / RT))
+        else:
+            w2[i] = w[i] + dt * (vw * pw * sa[i] * (osi[i] - oso))
+
+
+def _update_values(nai, ki, cli, xi, xm, xi_temp, osi, absox, w, w2, L, r):
+    """
+    Compartment.update_values of every compartment (see VectorEngine.update_values)
+    """
+    for i in range(nai.shape[0]):
+        xi[i] = xm[i] + xi_temp[i]
+        osi[i] = nai[i] + ki[i] + cli[i] + xi[i]
+        # correct ionic concentrations by volume change
+        nai[i] = (nai[i] * w[i]) / w2[i]
+        ki[i] = (ki[i] * w[i]) / w2[i]
+        cli[i] = (cli[i] * w[i]) / w2[i]
+        xi_temp[i] = (xi_temp[i] * w[i]) / w2[i]
+        xm[i] = (xm[i] * w[i]) / w2[i]
+        w[i] = w2[i]
+        # affect volume change into length change
+        L[i] = w[i] / (np.pi * r[i] ** 2)
+        absox[i] = xi[i] * w[i]
+
+
+def _diffusion_step(dt, endpoints, D, z, C, V, L, jnet, dx, dC):
+    """
+    Diffusion.step of every edge (see DiffusionNetwork.step): flux along each edge into jnet, distance between
+    compartment midpoints into dx, and change in concentration of each compartment into dC
+    """
+    dC[:, :] = 0.0
+    for e in range(endpoints.shape[0]):
+        a = endpoints[e, 0]
+        b = endpoints[e, 1]
+        dx[e] = (L[a] + L[b]) / 2
+        dV = V[a] - V[b]
+        for k in range(C.shape[1]):
+            F = -D[e, k] * (C[a, k] - C[b, k]) / dx[e]
+            drift = - (D[e, k] / RTF * z[k] * dV / dx[e]) * (C[a, k] + C[b, k])
+            jnet[e, k] = (F + drift / 2) * dt
+            dC[a, k] += jnet[e, k]
+            dC[b, k] -= jnet[e, k]
+    for a in range(C.shape[0]):
+        for k in range(C.shape[1]):
+            dC[a, k] = dC[a, k] / L[a]
+
+
+class LoopKernels(object):
+    """
+    The per-step work of VectorEngine and DiffusionNetwork done by the loops of this module.
+    """
+
+    def __init__(self, compiled=True):
+        """
+        :param compiled: compile the loops with Numba (which must be installed)
+        """
+        self.compiled = compiled
+        if compiled:
+            jit = numba.njit(cache=True)
+            self.__compartment_step = jit(_compartment_step)
+            self.__update_values = jit(_update_values)
+            self.__diffusion_step = jit(_diffusion_step)
+        else:
+            self.__compartment_step = _compartment_step
+            self.__update_values = _update_values
+            self.__diffusion_step = _diffusion_step
+
+    def compartment_step(self, s: dict, delta: dict, dt: float):
+        """
+        :param s: arrays of the bound compartments (CompartmentState.views)
+        :param delta: change in ions, to which the changes of this step are added
+        :param dt: time step
+        """
+        self.__compartment_step(
+            float(dt), s["nai"], s["ki"], s["cli"], s["xi"], s["xm"], s["xi_temp"], s["osi"], s["w"], s["w2"],
+            s["sa"], s["r"], s["r1"], s["Ar"], s["FinvCAr"], s["V"], s["jp"], s["p"], s["pkcc2"], s["jkccup"],
+            s["jkcc2"], s["ek"], s["ecl"], s["z"], s["xz"], s["xmz"], s["gx"], s["dz"], s["nao"], s["ko"], s["clo"],
+            s["dnai"], s["dki"], s["dcli"], s["dxi"], s["stretch_w"],
+            delta["nai"], delta["ki"], delta["cli"], delta["xi_temp"])
+
+    def update_values(self, s: dict):
+        self.__update_values(s["nai"], s["ki"], s["cli"], s["xi"], s["xm"], s["xi_temp"], s["osi"], s["absox"],
+                             s["w"], s["w2"], s["L"], s["r"])
+
+    def diffusion_step(self, network, dt: float):
+        """
+        :param network: DiffusionNetwork to step
+        :param dt: time step
+        :return: change in concentration of each compartment (compartments x ions)
+        """
+        e = network.n_edges
+        C = network.concentrations()
+        dC = np.empty_like(C)
+        self.__diffusion_step(float(dt), network.endpoints(), network.D[:e], network.z, C, network.state["V"],
+                              network.state["L"], network.jnet[:e], network.dx[:e], dC)
+        return dC
+
+
+def kernels(backend: str = "numpy"):
+    """
+    :param backend: one of BACKENDS
+    :return: LoopKernels for the backend, or None for the NumPy array operations
+    :raise ValueError if backend is not recognised
+    """
+    if backend == "numpy":
+        return None
+    if backend == "loop":
+        return LoopKernels(compiled=False)
+    if backend == "jit":
+        if numba is None:
+            warnings.warn("numba is not installed: the vector engine uses its NumPy kernels")
+            return None
+        return LoopKernels(compiled=True)
+    raise ValueError("unknown backend '{}' (expected one of {})".format(backend, BACKENDS))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Local time stepping (see Simulator.run with solver "local"): compartments that change slowly are advanced with larger
+time steps than those that change quickly, e.g. the distant compartments of a large tree perturbed in one place.
+
+Compartments are grouped into levels 0 .. levels-1 by their rate of change: a compartment of level k is stepped every
+2**k ticks with a time step of dt * 2**k, the largest for which its concentrations change by at most tolerance
+(relative) per step. Levels of compartments connected by diffusion differ by at most 1. The groups are formed again
+every cycle of 2**(levels-1) ticks, when all compartments have been stepped to the same time; in the first cycle of a
+run (and after compartments or edges are added or removed) all compartments are stepped every tick.
+A compartment is stepped at the first tick of each of its steps, so between ticks of a cycle the coarse compartments
+are ahead of the time of the run (by less than their time step).
+
+A Diffusion edge is stepped at the level of the finer of its two compartments, and the amount of each ion it carries
+in a step is added to one compartment and removed from the other, so that the exchange between groups is
+conservative. Before each tick, the voltages of the compartments and edges stepped are updated from the
+concentrations (which change by diffusion between the steps of a coarse compartment).
+
+jkccup and dz are increments per tick, so a compartment of level k is given 2**k of them in each of its steps.
+The level of a compartment is also limited so that its time step is within its own stability limit (see
+stability.py), so that only the compartments with the fastest modes (e.g. the shortest) need the time step of level 0.
+
+Usage:
+    sim.run(stop=1, dt=1e-6, solver="local", levels=4, tolerance=1e-6)
+"""
+import numpy as np
+import stability
+
+# concentrations whose rate of change sets the level of a compartment
+RATE_FIELDS = ("nai", "ki", "cli")
+
+
+class LocalTimeStepping(object):
+    """
+    Steps the compartments and diffusion network of a VectorEngine, each compartment and edge at its own level.
+    """
+
+    def __init__(self, levels: int = 4, tolerance: float = 1e-6):
+        """
+        :param levels: number of levels: the largest time step is dt * 2**(levels-1)
+        :param tolerance: largest relative change of a concentration per step of a compartment
+        :raise ValueError if levels is less than 1 or tolerance is not positive
+        """
+        if int(levels) < 1:
+            raise ValueError("levels must be at least 1 ({} given)".format(levels))
+        if not tolerance > 0:
+            raise ValueError("tolerance must be positive ({} given)".format(tolerance))
+        self.levels = int(levels)
+        self.tolerance = tolerance
+        # ticks between the times when all compartments are at the same time (and are grouped again)
+        self.cycle = 2 ** (self.levels - 1)
+        self.engine = None
+        self.others = []
+        # level of each compartment of the engine's state
+        self.level = np.zeros(0, dtype=np.int64)
+        # number of steps of compartments and of edges (as opposed to ticks * compartments and ticks * edges)
+        self.steps = {"compartments": 0, "edges": 0}
+        self.__tick = 0
+        # compartments and edges of the engine when bound
+        self.__bound = None
+        # concentrations (RATE_FIELDS x compartments) at the start of the cycle
+        self.__start = None
+        # for each number of ticks 2**k since the start of the cycle that a tick is a multiple of: the compartments,
+        # their time step ratios, edges, their time step ratios, and the compartments of both (whose voltage is updated)
+        self.__due = []
+
+    def bind(self, engine, others: list):
+        """
+        :param engine: VectorEngine with the compartments and diffusion network to step
+        :param others: other objects (e.g. colormaps), stepped every tick
+        The levels are kept if the compartments and edges of the engine are those it was bound with before.
+        """
+        bound = (list(engine.state.compartments), list(engine.network.edges))
+        if engine is not self.engine or bound != self.__bound:
+            self.__tick = 0
+            self.__start = None
+        self.engine = engine
+        self.others = others
+        self.__bound = bound
+
+    def regroup(self, dt: float = None):
+        """
+        Group the compartments by their rate of change over the last cycle (all at level 0 if there was none).
+
+        :param dt: time step of level 0, to limit the time step of each compartment to its stability limit (default:
+        no limit)
+        """
+        state = self.engine.state
+        network = self.engine.network
+        C = np.stack([state[name] for name in RATE_FIELDS])
+        ends = network.endpoints()
+        a, b = ends[:, 0], ends[:, 1]
+        if self.__start is None or self.__start.shape != C.shape:
+            level = np.zeros(state.n, dtype=np.int64)
+        else:
+            # relative change per tick
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rate = np.max(np.abs(C - self.__start) / np.abs(C), axis=0) / self.cycle
+                level = np.floor(np.log2(self.tolerance / rate))
+            if dt is not None:
+                with np.errstate(divide="ignore"):
+                    stable = np.floor(np.log2(stability.SAFETY * 2 / (stability.engine_rate_bound(self.engine) * dt)))
+                level = np.minimum(level, stable)
+            level = np.clip(np.nan_to_num(level, nan=0), 0, self.levels - 1).astype(np.int64)
+            # neighbours differ by one level at most
+            for _ in range(self.levels - 1):
+                np.minimum.at(level, a, level[b] + 1)
+                np.minimum.at(level, b, level[a] + 1)
+        self.__start = C
+        self.level = level
+        edge_level = np.minimum(level[a], level[b])
+        self.__due = []
+        for k in range(self.levels):
+            index = np.flatnonzero(level <= k)
+            rows = np.flatnonzero(edge_level <= k)
+            voltage = np.zeros(state.n, dtype=np.bool_)
+            voltage[index] = True
+            voltage[ends[rows]] = True
+            self.__due.append((index, 2.0 ** level[index], network.edges_subset(rows), 2.0 ** edge_level[rows],
+                               np.flatnonzero(voltage)))
+
+    def step(self, _time):
+        """
+        Step the compartments and edges due at this tick, each with its time step, and the other objects.
+
+        :param _time: Time of the run (its dt is the time step of level 0)
+        """
+        t = self.__tick
+        dt = _time.dt
+        if t % self.cycle == 0:
+            self.regroup(dt)
+        # largest level due: number of times 2 divides t (all levels at the start of a cycle)
+        k = self.levels - 1 if t % self.cycle == 0 else (t & -t).bit_length() - 1
+        index, ratio, edges, edge_ratio, voltage = self.__due[k]
+        if len(voltage):
+            self.engine.update_voltage(voltage)
+        if len(index):
+            self.engine.step_compartments(index, dt * ratio, ratio)
+        if len(edge_ratio):
+            self.engine.network.step_edges(edges, dt * edge_ratio)
+        for obj in self.others:
+            obj.step(_time)
+        self.steps["compartments"] += len(index)
+        self.steps["edges"] += len(edge_ratio)
+        self.__tick = t + 1
@@ -10,6 +10,7 @@ from compartment import Compartment
 from diffusion import Diffusion
 from common import default_radius_short
 from colormap import Colormap
+from topology import Topology
 import numpy as np
 import datetime
 
@@ -54,7 +55,7 @@ def main(cli_D=2.03, new_gx=0e-8, anion_flux=False, default_xz=-0.85, jkccup=1e-
         compr.append(comp.copy("dendrite right " + str(i + 2)))
 
     # find steady-state values of ions
-    sim.run(stop=100, dt=0.001, plot_update_interval=50, data_collect_interval=5, block_after=False)
+    sim.solve_steady_state(advance=100)
 
     # set diffusion value
     cli_D *= 1e-7  # cm2 to dm2 (D in dm2/s)
@@ -226,7 +227,7 @@ def grow(nr=3, textra=10):
                             radius=default_radius_short))
 
     # steady state
-    sim.run(stop=100, dt=0.001, plot_update_interval=500, data_collect_interval=5, block_after=False)
+    sim.solve_steady_state(advance=100)
 
     # set diffusion value
     cli_D = 2.03
@@ -240,7 +241,9 @@ def grow(nr=3, textra=10):
     comp.append(comp[0].copy("compartment 1"))
     comp[1].L = 10e-5
     comp[1].w = np.pi * comp[1].r ** 2 * comp[1].L
-    diffusion_object = [Diffusion(comp[0], comp[1], ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})]
+    Diffusion(comp[0], comp[1], ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})
+    topology = Topology(comp)
+    comp = topology.compartments
 
     # heatmap incorporating compartment heights
     sc = 1e5
@@ -273,26 +276,13 @@ def grow(nr=3, textra=10):
         comp[0].gx = 0
         print_concentrations(comp,str(i))
 
-        # split compartments
-        comp.insert(0,comp[0].copy("compartment "+str(i)))
-        comp[1].L -= 5e-5
-        comp[0].L = 5e-5
-        comp[0].w = np.pi * comp[0].r ** 2 * comp[0].L
-        comp[1].w = np.pi * comp[1].r ** 2 * comp[1].L
+        # split compartments (comp is topology.compartments, which the heatmap also follows)
+        topology.split(comp[0], fraction=5e-5 / comp[0].L, name="compartment " + str(i), after=False)
 
         print_concentrations(comp,str(i))
 
-        # update total height
-        htplot.comp = comp
-
-        # update diffusion
-        diffusion_object.append(Diffusion(comp[0], comp[1], ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D}))
-
         for a in comp:
-            print(a.name)
-
-        for j in diffusion_object:
-            print(j.name)
+            print(a.name, [edge.name for edge in topology.edges[a]])
 
         sim.run(continuefor=10, dt=dt*0.001, plot_update_interval=5, data_collect_interval=textra/16)
 
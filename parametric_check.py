@@ -10,7 +10,6 @@ from constants import F
 from common import clo, ko, nao, gk, gna, gcl, oso, RTF
 from simulator import Simulator
 from compartment import Compartment
-import time
 import matplotlib.pyplot as plt
 import gui
 
@@ -53,13 +52,14 @@ def zplm(z, gkcc, ose):
 def checkpara(kcc2=1e-8, z=-0.85):
     ti = [[], [], [], [], []]
     T = [-8.0, -7.0, -6.0, -5.5, -5.0, -4.5, -4, -3.5, -3.0, -2.0]
-    sim = Simulator()
 
     for k in T:
         q = 10 ** (k) / F
-        comp = Compartment("soma with pump rate 1e" + str(k) + "/F", pkcc2=kcc2, z=z, p=q)
-        time.clock()
-        sim.run(continuefor=1000, plot_update_interval=5000,block_after=False)
+        # each pump rate in its own simulator, so that only its compartment is solved
+        sim = Simulator(_gui=False, current=False)
+        with sim.activate():
+            comp = Compartment("soma with pump rate 1e" + str(k) + "/F", pkcc2=kcc2, z=z, p=q)
+        sim.solve_steady_state()
         ti[0].append(comp.V)
         ti[1].append(comp.ki)
         ti[2].append(comp.nai)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Timers around the phases of Simulator.run (see Simulator.profile).
+
+Phases of a tick:
+    collect             data collection by graphs and recorders (Graph.update, Recorder.record)
+    plot                drawing of graphs (Graph.plot_graph, including plt.pause)
+    step:<type>         step of each registered object, per type (e.g. step:Compartment, step:VectorEngine)
+    time                moving time forward
+    updates             applying the deferred updates of the tick
+    checkpoint          saving checkpoints
+    events              actions of a protocol (see protocol.Protocol)
+Ticks end when their deferred updates are applied; with an adaptive solver a tick is the interval between data
+collections (and so includes the solver's work).
+
+Profiling is switched on by wrapping the functions the run loop calls, so a run that is not profiled runs the same
+loop with no timers at all.
+"""
+import json
+import sys
+import time
+
+_clock = time.perf_counter_ns
+
+
+class _TimedStep(object):
+    """
+    Registered object whose step is timed under the phase step:<type of the object>.
+    """
+    __slots__ = ("obj", "phase", "profiler")
+
+    def __init__(self, obj, profiler):
+        self.obj = obj
+        self.phase = "step:" + type(obj).__name__
+        self.profiler = profiler
+
+    def step(self, _time=None):
+        profiler = self.profiler
+        blocks = sys.getallocatedblocks() if profiler.allocations else 0
+        start = _clock()
+        self.obj.step(_time)
+        profiler.add(self.phase, start, _clock(), blocks)
+
+
+class Profiler(object):
+    """
+    Time, number of calls and net number of allocated memory blocks (sys.getallocatedblocks) of each phase of the
+    runs profiled, and the number of ticks and deferred updates. Results accumulate over runs until reset.
+    """
+
+    def __init__(self, trace: bool = True, allocations: bool = True, max_events: int = 1000000):
+        """
+        :param trace: keep every timed call as an event for write_trace
+        :param allocations: count allocated memory blocks of each phase (costs about 0.2 us per call)
+        :param max_events: events kept at most (later ones are only counted in the totals)
+        """
+        self.trace = trace
+        self.allocations = allocations
+        self.max_events = max_events
+        self.reset()
+
+    def reset(self):
+        """
+        Discard all results.
+        """
+        # phase -> [calls, time (ns), net allocated blocks]
+        self.phases = {}
+        self.ticks = 0
+        self.updates = 0
+        self.runs = 0
+        self.run_time = 0
+        # (phase, start (ns), duration (ns))
+        self.events = []
+        self.dropped = 0
+        self.__origin = _clock()
+        self.__run_start = None
+        self.__tick_start = None
+
+    def add(self, phase: str, start: int, end: int, blocks: int = 0):
+        """
+        Account a call of phase from start to end (ns).
+
+        :param blocks: allocated blocks before the call
+        """
+        totals = self.phases.get(phase)
+        if totals is None:
+            totals = self.phases[phase] = [0, 0, 0]
+        totals[0] += 1
+        totals[1] += end - start
+        if self.allocations:
+            totals[2] += sys.getallocatedblocks() - blocks
+        if self.trace:
+            if len(self.events) < self.max_events:
+                self.events.append((phase, start, end - start))
+            else:
+                self.dropped += 1
+
+    def timed(self, phase: str, func):
+        """
+        :return: func, timed under phase
+        """
+        def call(*args, **kwargs):
+            blocks = sys.getallocatedblocks() if self.allocations else 0
+            start = _clock()
+            result = func(*args, **kwargs)
+            self.add(phase, start, _clock(), blocks)
+            return result
+        return call
+
+    def step_list(self, objects: list):
+        """
+        :return: objects, each with its step timed under step:<type>
+        """
+        return [_TimedStep(obj, self) for obj in objects]
+
+    def apply_updates(self, buffer):
+        """
+        :param buffer: DeferredUpdateBuffer
+        :return: function applying the deferred updates of buffer, timed, which counts them and ends the tick
+        """
+        def apply():
+            self.updates += buffer.count()
+            blocks = sys.getallocatedblocks() if self.allocations else 0
+            start = _clock()
+            buffer.apply()
+            end = _clock()
+            self.add("updates", start, end, blocks)
+            self.ticks += 1
+            if self.trace and len(self.events) < self.max_events:
+                self.events.append(("tick", self.__tick_start, end - self.__tick_start))
+            self.__tick_start = end
+        return apply
+
+    def begin_run(self):
+        self.__run_start = self.__tick_start = _clock()
+
+    def end_run(self):
+        end = _clock()
+        self.runs += 1
+        self.run_time += end - self.__run_start
+        if self.trace:
+            self.events.append(("run", self.__run_start, end - self.__run_start))
+
+    def stats(self):
+        """
+        :return: dictionary of runs, ticks, updates, run time (s), and for each phase its calls, time (s) and net
+        allocated blocks
+        """
+        return {"runs": self.runs, "ticks": self.ticks, "updates": self.updates, "time": self.run_time * 1e-9,
+                "phases": {phase: {"calls": calls, "time": ns * 1e-9, "blocks": blocks}
+                           for phase, (calls, ns, blocks) in self.phases.items()}}
+
+    def summary(self):
+        """
+        :return: table of the phases, slowest first, with the run time not spent in any phase (the loop itself, an
+        adaptive solver, and the profiler's own overhead of a few microseconds per timed call) as "other"
+        """
+        total = max(self.run_time, 1)
+        rows = sorted(self.phases.items(), key=lambda item: -item[1][1])
+        other = self.run_time - sum(ns for calls, ns, blocks in self.phases.values())
+        lines = ["{} run(s), {} ticks, {} deferred updates, {:.6f} s".format(self.runs, self.ticks, self.updates,
+                                                                              self.run_time * 1e-9),
+                 "{:<28} {:>10} {:>12} {:>7} {:>12} {:>10}".format("phase", "calls", "time (s)", "%", "per call (us)",
+                                                                  "blocks")]
+        for phase, (calls, ns, blocks) in rows:
+            lines.append("{:<28} {:>10} {:>12.6f} {:>7.1f} {:>12.3f} {:>10}".format(
+                phase, calls, ns * 1e-9, 100 * ns / total, ns * 1e-3 / calls, blocks if self.allocations else "-"))
+        lines.append("{:<28} {:>10} {:>12.6f} {:>7.1f}".format("other", "", other * 1e-9, 100 * other / total))
+        return "\n".join(lines)
+
+    def write_trace(self, path: str):
+        """
+        Write the events as a Chrome trace (JSON, opened by chrome://tracing, Perfetto or speedscope), with runs,
+        ticks and phases nested.
+
+        :param path: file to write
+        :return: path
+        """
+        events = [{"name": phase, "cat": phase.split(":")[0], "ph": "X", "pid": 0, "tid": 0,
+                   "ts": (start - self.__origin) * 1e-3, "dur": duration * 1e-3}
+                  for phase, start, duration in sorted(self.events, key=lambda event: (event[1], -event[2]))]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"ticks": self.ticks, "updates": self.updates, "dropped": self.dropped}}, f)
+        return path
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Experimental protocols: changes to the model declared up front and applied at their simulated times within a single
+run (see Simulator.run's protocol), instead of stopping and continuing the run around each change.
+
+Usage:
+    protocol = Protocol() \\
+        .set(10, comp, "gx", 1e-8) \\
+        .ramp(10, 20, comp, "cli", by=5e-3, interval=1e-4) \\
+        .inject(30, comp, "nai", 1e-3) \\
+        .save_graphs(40, "{time}s_graph{index}.eps")
+    sim.run(stop=50, dt=1e-6, protocol=protocol)
+"""
+import numpy as np
+import simulator
+
+
+class Protocol(object):
+    """
+    Actions at simulated times. Each method adds an action and returns the protocol, so that calls can be chained.
+    Actions at the same time are applied in the order they were added, at the start of the time step of that time
+    (before data is collected and objects are stepped); those before the start of a run are ignored.
+    """
+
+    def __init__(self):
+        # (time, order of addition, function)
+        self.actions = []
+        # (order of addition, start, stop, obj, var, to, by, interval)
+        self.ramps = []
+
+    def call(self, t: float, func):
+        """
+        Call func() at time t (e.g. to print or plot the state of the model)
+        """
+        self.actions.append((np.float64(t), len(self.actions) + len(self.ramps), func))
+        return self
+
+    def set(self, t: float, obj, var: str, value):
+        """
+        Set obj's var to value at time t (a step change of a parameter, e.g. gx, jkccup or dz)
+        """
+        return self.call(t, lambda: setattr(obj, var, value))
+
+    def change(self, t: float, obj, var: str, delta):
+        """
+        Add delta to obj's var at time t
+        """
+        return self.call(t, lambda: setattr(obj, var, getattr(obj, var) + delta))
+
+    def inject(self, t: float, comp, ion: str, amount: float):
+        """
+        Increase the concentration of ion in comp by amount (M) at time t
+        """
+        return self.change(t, comp, ion, amount)
+
+    def ramp(self, start: float, stop: float, obj, var: str, to=None, by=None, interval: float = None):
+        """
+        Change obj's var linearly from start to stop, in steps of interval: either to reach the value to, or by a total
+        of by (which keeps changes from the model itself, e.g. a slow increase of a concentration).
+
+        :param interval: time between steps (default: the time step of an Euler run, or the data collection interval
+        of an adaptive solver)
+        :raise ValueError if neither or both of to and by are given, or stop is not after start
+        """
+        if (to is None) == (by is None):
+            raise ValueError("ramp of '{}' needs either to or by".format(var))
+        if stop <= start:
+            raise ValueError("ramp of '{}' stops ({}) before it starts ({})".format(var, stop, start))
+        self.ramps.append((len(self.actions) + len(self.ramps), np.float64(start), np.float64(stop), obj, var, to, by,
+                           interval))
+        return self
+
+    def save_graphs(self, t: float, name: str):
+        """
+        Plot the GUI's graphs and save each of them at time t.
+
+        :param name: file name, which may contain {index} (of the graph) and {time}
+        """
+        def save():
+            sim = simulator.Simulator.get_instance()
+            sim.plot_graphs()
+            for index, graph in enumerate(sim.gui().graphs()):
+                graph.save(name.format(index=index, time=t))
+        return self.call(t, save)
+
+    def schedule(self, start: float, stop: float, interval: float):
+        """
+        :param start: start time of the run
+        :param stop: stop time of the run
+        :param interval: default interval of ramps
+        :return: Schedule of the actions in [start, stop), with ramps expanded into steps
+        """
+        actions = list(self.actions)
+        for order, ramp_start, ramp_stop, obj, var, to, by, ramp_interval in self.ramps:
+            steps = max(1, int(round((ramp_stop - ramp_start) / (ramp_interval or interval))))
+            times = ramp_start + np.arange(steps) * (ramp_stop - ramp_start) / steps
+            for k, t in enumerate(times):
+                actions.append((t, order, _RampStep(obj, var, to, by, steps, k)))
+        actions.sort(key=lambda action: action[:2])
+        tolerance = interval * 1e-6
+        return Schedule([(t, func) for t, order, func in actions if start - tolerance <= t < stop - tolerance])
+
+
+class _RampStep(object):
+    """
+    Step k (of steps) of a ramp
+    """
+    __slots__ = ("obj", "var", "to", "by", "remaining")
+
+    def __init__(self, obj, var, to, by, steps, k):
+        self.obj = obj
+        self.var = var
+        self.to = to
+        self.by = by if by is None else by / steps
+        self.remaining = steps - k
+
+    def __call__(self):
+        value = getattr(self.obj, self.var)
+        if self.by is not None:
+            setattr(self.obj, self.var, value + self.by)
+        else:
+            # stay on the line from the current value to the final one
+            setattr(self.obj, self.var, value + (self.to - value) / self.remaining)
+
+
+class Schedule(object):
+    """
+    Actions of a protocol within a run, in order of time.
+    """
+
+    def __init__(self, actions: list):
+        """
+        :param actions: list of (time, function) sorted by time
+        """
+        self.times = np.array([t for t, func in actions], dtype=np.float64)
+        self.functions = [func for t, func in actions]
+        self.next = 0
+
+    def __len__(self):
+        return len(self.functions)
+
+    def next_tick(self, dt: float):
+        """
+        :return: time step (multiple of dt) of the next action (None if there are no more)
+        """
+        return int(round(self.times[self.next] / dt)) if self.next < len(self.times) else None
+
+    def times_between(self, start: float, stop: float):
+        """
+        :return: distinct times of actions in (start, stop)
+        """
+        times = self.times[(self.times > start) & (self.times < stop)]
+        return np.unique(times)
+
+    def apply(self, t: float, tolerance: float = 0.0):
+        """
+        Call the functions of all actions up to time t (+ tolerance) not applied yet.
+        """
+        while self.next < len(self.times) and self.times[self.next] <= t + tolerance:
+            self.functions[self.next]()
+            self.next += 1
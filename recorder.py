@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import os
+import tempfile
+import numpy as np
+import simulator
+from engine import CompartmentView
+
+
+class TraceBuffer(object):
+    """
+    Growable table of samples (samples x columns) for recording.
+    Storage is preallocated and its capacity doubles when full, so appending a sample is amortized O(1) (instead of
+    the O(n) copy of np.append). Storage larger than max_bytes is a memory-mapped temporary file in spill_directory
+    rather than memory. Recorded values are read as views of the storage (no copy), until the next growth.
+    """
+
+    def __init__(self, width: int, capacity: int = 1024, max_bytes: int = None, spill_directory: str = None):
+        """
+        :param width: number of columns
+        :param capacity: number of samples allocated at first
+        :param max_bytes: size above which storage is spilled to disk (default: never)
+        :param spill_directory: directory of spilled storage (default: the temporary directory)
+        """
+        self.width = width
+        self.n = 0
+        self.max_bytes = max_bytes
+        self.spill_directory = spill_directory
+        self.__files = []
+        self.data = np.empty((max(capacity, 1), width), dtype=np.float64)
+
+    @property
+    def capacity(self):
+        return self.data.shape[0]
+
+    def spilled(self):
+        """
+        :return: whether storage is memory-mapped from disk
+        """
+        return isinstance(self.data, np.memmap)
+
+    def __allocate(self, capacity, width):
+        if self.max_bytes is None or capacity * width * 8 <= self.max_bytes:
+            return np.empty((capacity, width), dtype=np.float64)
+        fd, path = tempfile.mkstemp(suffix=".trace", dir=self.spill_directory)
+        os.close(fd)
+        data = np.memmap(path, dtype=np.float64, mode="w+", shape=(capacity, width))
+        try:
+            # the mapping keeps the file's content until it is released
+            os.remove(path)
+        except OSError:
+            self.__files.append(path)
+        return data
+
+    def reserve(self, capacity: int, width: int = None):
+        """
+        Make room for at least capacity samples of width columns (new columns hold nan for earlier samples).
+        """
+        width = self.width if width is None else width
+        if capacity <= self.capacity and width == self.width:
+            return
+        capacity = max(capacity, self.capacity)
+        data = self.__allocate(capacity, width)
+        data[:self.n, :self.width] = self.data[:self.n]
+        data[:self.n, self.width:] = np.nan
+        self.data = data
+        self.width = width
+
+    def append(self, row):
+        """
+        :param row: one value per column
+        """
+        if self.n == self.capacity:
+            self.reserve(2 * self.capacity)
+        self.data[self.n] = row
+        self.n += 1
+
+    def view(self):
+        """
+        :return: recorded samples (samples x columns), a view of the storage
+        """
+        return self.data[:self.n]
+
+    def column(self, j: int):
+        """
+        :return: recorded values of column j, a view of the storage
+        """
+        return self.data[:self.n, j]
+
+    def clear(self):
+        """
+        Discard the recorded samples (storage is kept)
+        """
+        self.n = 0
+
+    def close(self):
+        """
+        Release the storage (and any spilled files)
+        """
+        self.data = np.empty((1, self.width), dtype=np.float64)
+        self.n = 0
+        for path in self.__files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.__files = []
+
+    def __len__(self):
+        return self.n
+
+
+class Recorder(object):
+    """
+    Records variables of objects (channels) at every data collection of a run, into a TraceBuffer.
+    A channel is (object, variable, scale): the object must implement __getitem__ (like Compartment, Time, Colormap) and
+    the variable is a name or a dictionary {key: value} for object[key][value].
+    Channels of compartments bound to the vector engine are read from its state arrays with one gather per variable
+    rather than one lookup per channel.
+
+    A Recorder is used by each Graph of the GUI, and can be used without a GUI:
+        recorder = Recorder()
+        t = recorder.add(sim.time(), "time")
+        cli = recorder.add(comp, "cli", scale=1e3)
+        sim.register_recorder(recorder)
+        sim.run(...)
+        recorder[t], recorder[cli]
+    """
+
+    def __init__(self, capacity: int = 1024, max_bytes: int = None, spill_directory: str = None):
+        """
+        :param capacity: number of samples allocated at first
+        :param max_bytes: size above which samples are kept on disk (see TraceBuffer)
+        :param spill_directory: directory of samples kept on disk
+        """
+        self.channels = []
+        self.buffer = TraceBuffer(0, capacity, max_bytes, spill_directory)
+        self.__row = np.empty(0)
+        self.__scales = np.empty(0)
+        self.__plan = None
+
+    def add(self, obj, var, scale: float = 1.0):
+        """
+        Add a channel, unless it is already recorded.
+
+        :param obj: object the variable belongs to
+        :param var: name of the variable, or dictionary {key: value} for obj[key][value]
+        :param scale: factor the recorded values are multiplied by
+        :return: index of the channel
+        """
+        if isinstance(var, dict):
+            (key, value), = var.items()
+            var = (key, value)
+        channel = (obj, var, float(scale))
+        for j, (other_obj, other_var, other_scale) in enumerate(self.channels):
+            if other_obj is obj and other_var == var and other_scale == channel[2]:
+                return j
+        self.channels.append(channel)
+        self.buffer.reserve(self.buffer.capacity, len(self.channels))
+        self.__row = np.empty(len(self.channels))
+        self.__scales = np.array([scale for _, _, scale in self.channels])
+        self.__plan = None
+        return len(self.channels) - 1
+
+    def __gather_plan(self):
+        """
+        :return: list of (variable, channel indices, array indices) read from the engine's state arrays, and list of
+        channel indices read individually
+        """
+        engine = simulator.Simulator.engine()
+        state = None if engine is None else engine.state
+        key = (state, None if state is None else state.generation)
+        if self.__plan is not None and self.__plan[0] == key:
+            return self.__plan[1], self.__plan[2]
+        groups = {}
+        others = []
+        for j, (obj, var, _) in enumerate(self.channels):
+            if state is not None and isinstance(var, str) and var in state.arrays \
+                    and isinstance(obj, CompartmentView) and obj._state is state:
+                groups.setdefault(var, ([], []))
+                groups[var][0].append(j)
+                groups[var][1].append(obj._index)
+            else:
+                others.append(j)
+        gathers = [(var, np.array(columns), np.array(indices)) for var, (columns, indices) in groups.items()]
+        self.__plan = (key, gathers, others)
+        return gathers, others
+
+    def record(self):
+        """
+        Record the current value of every channel (one sample)
+        """
+        if not self.channels:
+            return
+        row = self.__row
+        gathers, others = self.__gather_plan()
+        if gathers:
+            arrays = simulator.Simulator.engine().state.arrays
+            for var, columns, indices in gathers:
+                row[columns] = arrays[var][indices]
+        for j in others:
+            obj, var, _ = self.channels[j]
+            row[j] = obj[var] if isinstance(var, str) else obj[var[0]][var[1]]
+        row *= self.__scales
+        self.buffer.append(row)
+
+    def __getitem__(self, channel: int):
+        """
+        :return: recorded values of a channel (a view, valid until more samples are recorded)
+        """
+        return self.buffer.column(channel)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def clear(self):
+        """
+        Discard the recorded samples
+        """
+        self.buffer.clear()
+
+    def flush(self):
+        """
+        Called at the end of each run (samples are kept in memory)
+        """
+        pass
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Registered objects of the Simulator, kept in one registry per phase of a tick, and the order they are stepped in.
+
+Phases of a tick, in order:
+    membrane    compartments: voltage and membrane fluxes (Compartment, or VectorEngine for all bound compartments)
+    diffusion   fluxes between compartments, which use the voltages of the membrane phase (Diffusion, or
+                DiffusionNetwork for all network edges)
+    observer    objects that follow the model, e.g. Colormap (and any other object)
+Each object is stepped exactly once per tick, in its phase; within a phase, objects are stepped in the order they were
+registered. A class declares its phase with the class attribute phase (see sim_time.TimeMixin).
+"""
+
+MEMBRANE = "membrane"
+DIFFUSION = "diffusion"
+OBSERVER = "observer"
+PHASES = (MEMBRANE, DIFFUSION, OBSERVER)
+
+
+def phase_of(obj):
+    """
+    :return: phase obj is stepped in (OBSERVER if its class does not declare one of PHASES)
+    """
+    phase = getattr(obj, "phase", OBSERVER)
+    return phase if phase in PHASES else OBSERVER
+
+
+class Phase(object):
+    """
+    Objects stepped in one phase of a tick, with a single call. With the vector engine the membrane and diffusion
+    phases are each a single batched object (VectorEngine and DiffusionNetwork).
+    """
+    __slots__ = ("name", "objects")
+
+    def __init__(self, name: str, objects: list):
+        self.name = name
+        self.objects = objects
+
+    def step(self, _time=None):
+        for obj in self.objects:
+            obj.step(_time)
+
+    def __len__(self):
+        return len(self.objects)
+
+
+class Scheduler(object):
+    """
+    Registered objects: all of them in order of registration (objects), and those of each phase (registries).
+    """
+
+    def __init__(self):
+        self.objects = []
+        self.registries = {phase: [] for phase in PHASES}
+
+    def register(self, obj):
+        self.objects.append(obj)
+        self.registries[phase_of(obj)].append(obj)
+
+    def unregister(self, obj):
+        """
+        :raise ValueError if obj is not registered
+        """
+        self.objects.remove(obj)
+        self.registries[phase_of(obj)].remove(obj)
+
+    def clear(self):
+        self.objects.clear()
+        for registry in self.registries.values():
+            registry.clear()
+
+    def phases(self, step_list: list = None):
+        """
+        :param step_list: objects to step (default: the registered objects), e.g. those of VectorEngine.object_list
+        :return: Phase of each of PHASES that has objects, in order
+        """
+        if step_list is None:
+            registries = self.registries
+        else:
+            registries = {phase: [] for phase in PHASES}
+            for obj in step_list:
+                registries[phase_of(obj)].append(obj)
+        return [Phase(phase, list(registries[phase])) for phase in PHASES if registries[phase]]
@@ -8,6 +8,9 @@ from abc import ABCMeta, abstractmethod
 import numpy as np
 
 class TimeMixin(metaclass=ABCMeta):
+    # phase of a time step the object is stepped in (see scheduler.PHASES)
+    phase = "observer"
+
     @abstractmethod
     def step(self):
         pass
@@ -15,11 +18,8 @@ class TimeMixin(metaclass=ABCMeta):
 
 class Time(TimeMixin):
     """
-    Instantiates a Time control
-    Borg Pattern
-    A note on patterns: http://stackoverflow.com/questions/1318406/why-is-the-borg-pattern-better-than-the-singleton-pattern-in-python
+    Instantiates a Time control (the clock of a Simulator, see Simulator.time)
     """
-    __monostate = None
 
     def __init__(self, t=0.0, dt=1e-3, stop=5.0):
         """
@@ -28,14 +28,9 @@ class Time(TimeMixin):
         :param dt: s
         :param stop:
         """
-        if not Time.__monostate:
-            Time.__monostate = self.__dict__
-            # Your definitions here
-            self.time = np.float64(t)
-            self.dt = np.float64(dt)
-            self.stop = np.float64(stop)
-        else:
-            self.__dict__ = Time.__monostate
+        self.time = np.float64(t)
+        self.dt = np.float64(dt)
+        self.stop = np.float64(stop)
 
     def step(self):
         """
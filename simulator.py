@@ -4,135 +4,802 @@ Created on Mon Aug 22 2016
 Python 3.x targeted
 @author: Chris Currin & Kira Dusterwald
 """
+import os
+import sys
 import time
+import threading
+from contextlib import contextmanager
 import sim_time
-from deferred_update import UpdateType, DeferredUpdate
+from scheduler import Scheduler
+from deferred_update import UpdateType, DeferredUpdateBuffer
 import numpy as np
 
 
+def has_display():
+    """
+    :return: whether windows can be shown (always on Windows and macOS, otherwise if there is an X or Wayland display)
+    """
+    if sys.platform.startswith("win") or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def _next_tick(t: int, dt: float, interval: float, inclusive: bool = False):
+    """
+    :param t: tick of a run (at time t * dt)
+    :param inclusive: whether a multiple of interval at the time of tick t counts
+    :return: first tick at or after the next multiple of interval after (or at) the time of tick t, e.g. to collect
+    data at the same times when dt changes
+    """
+    ratio = t * dt / interval
+    multiple = np.ceil(ratio - 1e-6) if inclusive else np.floor(ratio + 1e-6) + 1
+    return max(t if inclusive else t + 1, int(np.ceil(multiple * interval / dt - 1e-6)))
+
+
+class simulatormethod(object):
+    """
+    Method of a Simulator that can also be called on the class, for the current Simulator of the thread (see
+    Simulator.current), e.g. Simulator.run(...) or Simulator.engine(), as when the Simulator was a singleton.
+    """
+
+    def __init__(self, func):
+        self.__func__ = func
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            instance = owner.get_instance()
+        return self.__func__.__get__(instance, owner)
+
+
 class Simulator(object):
     """
-    Main simulation controller
-    Singleton Pattern
-    A note on patterns: http://stackoverflow.com/questions/1318406/why-is-the-borg-pattern-better-than-the-singleton-pattern-in-python
+    Main simulation controller: clock, registered objects, deferred updates, engine, recorders and profiler of one
+    model.
+
+    Each thread has a current Simulator, which objects register with when they are created (see get_instance) and
+    whose methods are called when called on the class (e.g. Simulator.run). The first Simulator created in a thread
+    becomes its current Simulator; others are independent and made current for a block with activate. Independent
+    Simulators can be run concurrently in threads (the NumPy operations of the vector engine release the GIL).
+
+    Usage:
+        def simulate(gx):
+            sim = Simulator(_gui=False)  # current Simulator of this thread
+            comp = Compartment("soma")
+            comp.gx = gx
+            sim.run(stop=1, dt=1e-4, engine="vector", print_time=False)
+            return comp.V
+
+        with concurrent.futures.ThreadPoolExecutor() as pool:
+            voltages = list(pool.map(simulate, [0, 1e-8]))
+
+    or, in one thread:
+        sim2 = Simulator(_gui=False, current=False)
+        with sim2.activate():
+            comp2 = Compartment("soma")
+        sim2.run(stop=1, dt=1e-4)
     """
-    # reference to single instance
-    __single = None
-    # simulation time object
-    __time = None
-    # GUI object
-    __gui = None
-    # list of objects processed when running
-    __object_list = None
-    # objects that require updating at end of a time step
-    __update_list = None
-    # class control that can be used to determine what can only be done before/during or after a run.
-    run_done = None
-
-    def __init__(self, _gui=True):
-        """
-            Internal method, but allows explicit instantiation (or not) of a GUI at initial setup of the Simulator
-            instance. Should only be called if it can be guaranteed Simulator instance is new.
-            Should use get_instance() instead to get existing instance, or create a new one if it does not exist.
-
-            :raises RuntimeError if called when there is an existing Simulator object
-        """
-        if not Simulator.__single:
-            Simulator.__time = sim_time.Time()
-            Simulator.__object_list = []
-            Simulator.__update_list = []
-            if _gui:
-                import gui
-                Simulator.__gui = gui.GUI.init(Simulator.__time)
-            Simulator.__single = self
-        else:
+    # stack of the Simulators activated in each thread (the current one last)
+    __context = threading.local()
+
+    def __init__(self, _gui=True, current=True, ordered_updates=False):
+        """
+            Create a Simulator. Should use get_instance() instead to get the current instance, or create a new one if
+            there is none.
+
+            The GUI (and matplotlib) is only loaded when a graph is requested (see gui). Without an interactive GUI
+            (_gui False, $MCMA_HEADLESS set, or no display) the simulator is headless: graphs are drawn off-screen and
+            can only be saved. Each Simulator has its own graphs (see gui).
+
+            :param _gui: whether graphs are shown in an interactive GUI
+            :param current: make it the current Simulator of this thread (if False, the Simulator is independent, see
+            activate)
+            :param ordered_updates: apply deferred updates in the order they were deferred rather than grouped by type
+            (see deferred_update.DeferredUpdateBuffer)
+            :raises RuntimeError if current and this thread already has a current Simulator
+        """
+        if current and Simulator.current() is not None:
             raise RuntimeError('A Simulator already exists')
+        # simulation time object
+        self.__time = sim_time.Time()
+        # GUI object
+        self.__gui = None
+        # whether graphs are drawn without a display (see headless)
+        self.__headless = not _gui or bool(os.environ.get("MCMA_HEADLESS")) or not has_display()
+        # registered objects, in one registry per phase of a tick (see scheduler.py)
+        self.__scheduler = Scheduler()
+        # list of objects processed when running, in order of registration (the scheduler's objects)
+        self.__object_list = self.__scheduler.objects
+        # deferred updates to be applied at end of a time step
+        self.__update_list = DeferredUpdateBuffer(ordered=ordered_updates)
+        # recorders (besides those of the GUI's graphs) that collect data during a run
+        self.__recorders = []
+        # engine that advances compartments in bulk (None: each object is stepped individually)
+        self.__engine = None
+        # step counts of the adaptive solver of the last run
+        self.__solver_stats = {}
+        # profiler.Profiler timing the phases of runs (None: runs are not profiled)
+        self.__profiler = None
+        # whether compartments have been added, removed or shortened since the time step of a run with dt "auto" was
+        # found (see geometry_changed)
+        self.__geometry_changed = False
+        # control that can be used to determine what can only be done before/during or after a run.
+        self.run_done = None
+        if current:
+            Simulator.__stack().append(self)
+
+    @classmethod
+    def __stack(cls):
+        """
+        :return: stack of the Simulators activated in this thread
+        """
+        try:
+            return cls.__context.stack
+        except AttributeError:
+            stack = cls.__context.stack = []
+            return stack
+
+    @classmethod
+    def current(cls):
+        """
+        :return: current Simulator of this thread (None if there is none)
+        """
+        try:
+            return cls.__context.stack[-1]
+        except (AttributeError, IndexError):
+            return None
 
     @classmethod
     def get_instance(cls):
         """
-        Get existing Simulator instance, or create a new one and return it.
+        Get the current Simulator instance of this thread, or create a new one and return it.
 
         :return: Simulator instance
 
         Usage:
             sim = Simulator.get_instance()
         """
-        if not cls.__single:
-            cls.__single = Simulator()
-        return cls.__single
+        try:
+            return cls.__context.stack[-1]
+        except (AttributeError, IndexError):
+            return Simulator()
 
-    @classmethod
-    def run(cls, continuefor: np.float64 = None, stop: np.float64 = None, dt: np.float64 = None, plot_update_interval: float = 100,
-            data_collect_interval: np.float64 = None, block_after=False, print_time=True):
+    @contextmanager
+    def activate(self):
+        """
+        Make this the current Simulator of the thread within a with block: objects created in it register with this
+        Simulator, and Simulator methods called on the class are those of this Simulator. Runs activate their Simulator.
+
+        Usage:
+            with sim.activate():
+                comp = Compartment("soma")
+        """
+        stack = Simulator.__stack()
+        stack.append(self)
+        try:
+            yield self
+        finally:
+            # the last occurrence, as the block may have activated self again (or disposed it)
+            if self in stack:
+                del stack[len(stack) - 1 - stack[::-1].index(self)]
+
+    @simulatormethod
+    def run(self, continuefor: np.float64 = None, stop: np.float64 = None, dt: np.float64 = None, plot_update_interval: float = 100,
+            data_collect_interval: np.float64 = None, block_after=False, print_time=True, engine: str = None,
+            solver: str = None, rtol: float = 1e-6, atol: float = 1e-9, checkpoint_path: str = None,
+            checkpoint_interval: float = None, protocol=None, split: str = "diffusion", substeps: int = 1,
+            levels: int = 4, tolerance: float = 1e-6):
         """
         Run a time-based simulation.
         Each time-registered object is moved forward by dt
 
         :param continuefor: how long simulation should continue for
         :param stop: time to stop simulation
-        :param dt: time step to use for simulation run
+        :param dt: time step to use for simulation run, or "auto": the largest stable time step (see stable_dt),
+        evaluated again at the start of each run, after the actions of protocol, after a tick in which compartments were
+        added, removed or shortened (see geometry_changed) and every stability.CHECK_INTERVAL ticks. The run moves to
+        the new time step (and to stop) with a step shorter than it.
         :param plot_update_interval: frequency to update graphs (in s)
-        :param data_collect_interval: frequency to collect data for plotting (in s)
+        :param data_collect_interval: frequency to collect data for plotting (in s), at the first tick at or after each
+        multiple of it
         :param block_after: does gui cause a pause/block after run is finished. If True, graphs close immediately upon
         completion (default: False)
         :param print_time: whether to log to the console the simulation time moved forward and length of time taken
+        :param engine: how compartments are advanced, see use_engine (default: keep the current engine)
+        :param solver: "euler" (default): forward Euler with time step dt.
+            "rk45": explicit Dormand-Prince 5(4) with adaptive step size (see integrator.AdaptiveIntegrator).
+            "bdf" or "radau": implicit stiff integrator with adaptive step size (see integrator.ImplicitIntegrator).
+            Compartments are advanced by the vector engine; dt then only sets the rates of jkccup and dz (and the first
+            step size of rk45), and data is collected (and other objects stepped) every data_collect_interval of
+            simulated time. Step counts are reported by solver_stats().
+            "strang": Strang splitting of the membrane and diffusion processes with time step dt, where the fast
+            process (split) is sub-cycled with substeps steps in each half step (see splitting.StrangSplitting).
+            "local": forward Euler where compartments that change slowly (and the diffusion between them) are stepped
+            less often, with time steps of dt up to dt * 2**(levels-1) (see local_stepping.LocalTimeStepping).
+            Compartments are advanced by the vector engine.
+        :param rtol: relative tolerance of an adaptive solver, or dictionary of {variable: relative tolerance}
+        :param atol: absolute tolerance of an adaptive solver, relative to the magnitude of each variable, or dictionary
+        of {variable: absolute tolerance}
+        :param checkpoint_path: file to save the state to (see checkpoint) at the end of the run and every
+        checkpoint_interval, so that a long run can be continued with restore if it is interrupted
+        :param checkpoint_interval: time between checkpoints during the run (in s) (default: only at the end)
+        :param protocol: protocol.Protocol of changes to the model applied at their times during the run (an adaptive
+        solver integrates up to each change and restarts after it)
+        :param split: process sub-cycled by solver "strang": "diffusion" (default) or "membrane"
+        :param substeps: number of steps of the split process in each half step of solver "strang"
+        :param levels: number of time steps (dt * 2**k for k < levels) of solver "local"
+        :param tolerance: largest relative change of a concentration in a step of a compartment with solver "local"
+        :raise ValueError if split or substeps (solver "strang"), or levels or tolerance (solver "local") is not valid,
+        or dt is "auto" with a solver other than "euler" or "local"
+        :raise TypeError if a compartment or diffusion object cannot be advanced by the vector engine (solver "local")
+        """
+        with self.activate():
+            self.__run(continuefor, stop, dt, plot_update_interval, data_collect_interval, block_after, print_time, engine,
+                       solver, rtol, atol, checkpoint_path, checkpoint_interval, protocol, split, substeps, levels,
+                       tolerance)
+
+    def __run(self, continuefor, stop, dt, plot_update_interval, data_collect_interval, block_after, print_time, engine,
+              solver, rtol, atol, checkpoint_path, checkpoint_interval, protocol, split, substeps, levels, tolerance):
+        """
+        Run a time-based simulation (see run), with this Simulator active
         """
+        strang = None
+        if solver == "strang":
+            import splitting
+            strang = splitting.StrangSplitting(split, substeps)
+        local = None
+        if solver == "local":
+            import local_stepping
+            local = local_stepping.LocalTimeStepping(levels, tolerance)
+        if engine is not None:
+            self.use_engine(engine)
         # assign default values if not specified
         if stop is None:
-            stop = cls.__time.stop
+            stop = self.__time.stop
         if continuefor is not None:
-            stop = cls.__time.time + np.float64(continuefor)
+            stop = self.__time.time + np.float64(continuefor)
+        auto_dt = isinstance(dt, str) and dt == "auto"
+        if auto_dt:
+            if solver not in (None, "euler", "local"):
+                raise ValueError("dt 'auto' is the stability limit of forward Euler (not supported by solver '{}')"
+                                 .format(solver))
+            from stability import CHECK_INTERVAL as stability_interval
+            dt = self.__auto_dt()
         if dt is None:
-            dt = cls.__time.dt
+            dt = self.__time.dt
         if data_collect_interval is None:
             data_collect_interval = dt
         if plot_update_interval < data_collect_interval:
             data_collect_interval = plot_update_interval
-        # create variables for faster processing during loop
-        data_collect_interval_dt = (data_collect_interval / dt)
-        plot_update_interval_dt = (plot_update_interval / dt)
         if print_time:
-            print("running from {0:f} s until {1:f} s with time step of {2} seconds ".format(cls.__time.time, stop, dt))        # get state ready for run
-        cls.run_done = False
+            print("running from {0:f} s until {1:f} s with time step of {2} seconds ".format(self.__time.time, stop, dt))        # get state ready for run
+        self.run_done = False
         if continuefor is None:
-            cls.__time.reset()
-            cls.clear_graphs()
-        time.clock()
-        # set timestep value
-        cls.__time.stepsize(dt)
-        # go through a simulation
-        t_start = int(round(cls.__time.time / dt))
-        t_stop = int(round(stop / dt))
-        for t in range(t_start, t_stop):
-            if t % data_collect_interval_dt == 0:
-                cls.update_graphs()
-            if t % plot_update_interval_dt == 0:
-                cls.plot_graphs()
-            # go through each object and process it's step
-            for compartment in cls.__object_list:
-                compartment.step(cls.__time)
-            for colormap in cls.__object_list:
-                colormap.step(cls.__time)
-            # move global time step forward
-            cls.__time.step()
-            # apply updates to objects that required deferred updating of their variables
-            cls.__apply_updates()
-        cls.run_done = True
+            self.__time.reset()
+            self.clear_graphs()
+        run_start = time.perf_counter()
+        self.__solver_stats = {}
+        # functions of each phase of a tick (timed if profiling)
+        collect, plot, advance, apply_updates, checkpoint = self.__phases()
+        if self.__profiler is not None:
+            self.__profiler.begin_run()
+        euler = solver is None or solver == "euler" or strang is not None or local is not None
+        schedule = None
+        if protocol is not None:
+            schedule = protocol.schedule(self.__time.time, stop, dt if euler else data_collect_interval)
+        if euler:
+            phases = self.__tick_phases(strang, local)
+            if strang is not None:
+                # deferred updates between the steps of the processes (ticks are counted by apply_updates)
+                apply_split_updates = self.__timed("updates", self.__apply_updates)
+            if local is not None:
+                step_local = self.__timed("step:LocalTimeStepping", local.step)
+            if schedule is not None:
+                apply_events = self.__timed("events", schedule.apply)
+
+            def partial_step(step):
+                """
+                A tick of step, shorter than dt (and so also stable), to a multiple of dt or to stop (dt "auto"), with
+                its fraction of jkccup and dz
+
+                :return: number of ticks (0 if step is negligible)
+                """
+                if step <= self.__time.dt * 1e-6:
+                    return 0
+                from splitting import TickIncrements
+                tick_dt = self.__time.dt
+                increments = TickIncrements(self.__object_list + ([] if self.__engine is None else [self.__engine]))
+                self.__time.stepsize(step)
+                with increments.scaled(step / tick_dt):
+                    if strang is not None:
+                        strang.step(self.__time, apply_split_updates)
+                    elif local is not None:
+                        step_local(self.__time)
+                    else:
+                        for phase in phases:
+                            phase.step(self.__time)
+                advance()
+                apply_updates()
+                self.__time.stepsize(tick_dt)
+                return 1
+
+            ticks = 0
+            while True:
+                # set timestep value
+                self.__time.stepsize(dt)
+                # go through a simulation
+                t_start = int(round(self.__time.time / dt))
+                t_stop = int(round(stop / dt))
+                if auto_dt:
+                    # start and stop at multiples of the new dt
+                    t_start = int(np.ceil(self.__time.time / dt - 1e-6))
+                    t_stop = max(t_start, int(np.floor(stop / dt + 1e-6)))
+                    ticks += partial_step(min(t_start * dt, stop) - self.__time.time)
+                # create variables for faster processing during loop: the ticks of the next data collection and plot
+                # (at the first tick at or after each multiple of their intervals, whatever dt)
+                next_collect = _next_tick(t_start, dt, data_collect_interval, inclusive=True)
+                next_plot = _next_tick(t_start, dt, plot_update_interval, inclusive=True)
+                checkpoint_interval_dt = None
+                if checkpoint_path is not None and checkpoint_interval is not None:
+                    checkpoint_interval_dt = max(1, int(round(checkpoint_interval / dt)))
+                next_event = None if schedule is None else schedule.next_tick(dt)
+                if next_event is not None:
+                    # (actions during a partial step are applied at the first tick)
+                    next_event = max(next_event, t_start)
+                next_dt = None
+                for t in range(t_start, t_stop):
+                    if t == next_event:
+                        apply_events(t * dt, dt / 2)
+                        next_event = schedule.next_tick(dt)
+                        # actions may have added or removed objects (see topology.Topology)
+                        phases = self.__tick_phases(strang, local)
+                        if auto_dt:
+                            next_dt = self.__auto_dt()
+                            if next_dt is not None and next_dt != dt:
+                                # the time step of this tick is that of the new model
+                                break
+                            next_dt = None
+                    if t == next_collect:
+                        collect()
+                        next_collect = _next_tick(t, dt, data_collect_interval)
+                    if t == next_plot:
+                        plot()
+                        next_plot = _next_tick(t, dt, plot_update_interval)
+                    # step each object once, phase by phase (membrane, diffusion, observers)
+                    if strang is not None:
+                        strang.step(self.__time, apply_split_updates)
+                    elif local is not None:
+                        step_local(self.__time)
+                    else:
+                        for phase in phases:
+                            phase.step(self.__time)
+                    # move global time step forward
+                    advance()
+                    # apply updates to objects that required deferred updating of their variables
+                    apply_updates()
+                    if checkpoint_interval_dt is not None and (t + 1 - t_start) % checkpoint_interval_dt == 0:
+                        checkpoint(checkpoint_path)
+                    # the stability limit changes with the lengths of the compartments (e.g. growth, see
+                    # geometry_changed) and, more slowly, with their concentrations
+                    if auto_dt and (self.__geometry_changed or (t + 1 - t_start) % stability_interval == 0):
+                        next_dt = self.__auto_dt()
+                        if next_dt is not None and next_dt != dt:
+                            break
+                        next_dt = None
+                ticks += int(round(self.__time.time / dt)) - t_start
+                if next_dt is None:
+                    if auto_dt:
+                        ticks += partial_step(stop - self.__time.time)
+                        self.__stable_lengths(0)
+                    break
+                # continue with the time step of the new stability limit
+                dt = next_dt
+                if print_time:
+                    print("time step of {} seconds from {:f} s".format(dt, self.__time.time))
+            if local is not None:
+                self.__solver_stats = {"ticks": ticks,
+                                       "compartment steps": local.steps["compartments"],
+                                       "edge steps": local.steps["edges"],
+                                       "compartments per level": np.bincount(local.level,
+                                                                             minlength=local.levels).tolist()}
+        else:
+            self.__integrate(solver, stop, dt, data_collect_interval, plot_update_interval, rtol, atol,
+                            checkpoint_path, checkpoint_interval, schedule)
+        self.run_done = True
+        if self.__engine is not None:
+            self.__engine.sync()
+        for recorder in self.__recorders:
+            recorder.flush()
+        if checkpoint_path is not None:
+            checkpoint(checkpoint_path)
         # allows for delayed display
         if continuefor is not None and (continuefor - plot_update_interval) >= 0:
-            cls.update_graphs()
-            cls.plot_graphs()
+            collect()
+            plot()
+        if self.__profiler is not None:
+            self.__profiler.end_run()
         if print_time:
-            print("time taken: {}".format(time.clock()))
-        if block_after and cls.__gui is not None:
-            cls.plot_graphs()
-            cls.__gui.block()
+            print("time taken: {}".format(time.perf_counter() - run_start))
+            if self.__solver_stats:
+                print(", ".join("{}: {}".format(key, value) for key, value in self.__solver_stats.items()))
+        if block_after and self.__gui is not None and not self.__headless:
+            self.plot_graphs()
+            self.__gui.block()
 
-    @classmethod
-    def register_compartment(cls, compartment):
+    def __integrate(self, solver: str, stop, dt, data_collect_interval, plot_update_interval, rtol, atol,
+                    checkpoint_path=None, checkpoint_interval=None, schedule=None):
+        """
+        Advance the compartments from the current time to stop with an adaptive solver.
+        Objects that are not part of the vector engine (e.g. colormaps) are stepped at every data collection time.
+        The solver is restarted at the time of each action of schedule (protocol.Schedule), after it is applied.
+
+        :raise TypeError if a compartment or diffusion object cannot be advanced by the vector engine
+        """
+        import integrator
+        collect, plot, advance, apply_updates, checkpoint = self.__phases()
+        t0 = self.__time.time
+        plot_times = integrator.sample_grid(t0, stop, plot_update_interval)
+        next_plot = [0]
+        next_checkpoint = [None if checkpoint_path is None or checkpoint_interval is None else t0 + checkpoint_interval]
+        # system and other objects of the segment being integrated
+        segment = {}
+
+        def sample(t, y):
+            segment["system"].unpack(y)
+            self.__time.time = np.float64(t)
+            for obj in segment["others"]:
+                obj.step(self.__time)
+            apply_updates()
+            collect()
+            if next_plot[0] < len(plot_times) and t >= plot_times[next_plot[0]] - dt / 2:
+                plot()
+                next_plot[0] += 1
+            if next_checkpoint[0] is not None and t >= next_checkpoint[0] - dt / 2:
+                checkpoint(checkpoint_path)
+                next_checkpoint[0] += checkpoint_interval
+
+        sample_times = integrator.sample_grid(t0, stop, data_collect_interval)
+        ends = [stop]
+        if schedule is not None:
+            apply_events = self.__timed("events", schedule.apply)
+            ends = list(schedule.times_between(t0, stop)) + ends
+        stats = {}
+        start = t0
+        for end in ends:
+            if schedule is not None:
+                self.__time.time = np.float64(start)
+                apply_events(start)
+            # the system is formed again, as actions may have added or removed compartments (see topology.Topology)
+            system, others = self.__system(dt, "solver '{}' (use solver 'euler')".format(solver))
+            if self.__profiler is not None:
+                others = self.__profiler.step_list(others)
+            segment.update(system=system, others=others)
+            if solver == "rk45":
+                method = integrator.AdaptiveIntegrator(system, rtol=rtol, atol=atol, first_step=dt)
+            else:
+                method = integrator.ImplicitIntegrator(system, solver, rtol=rtol, atol=atol)
+            y = method.integrate(start, end, sample_times[(sample_times >= start) & (sample_times < end)], sample)
+            system.unpack(y)
+            for key, value in method.stats.items():
+                stats[key] = stats.get(key, 0) + value
+            start = end
+        self.__time.time = np.float64(stop)
+        self.__solver_stats = stats
+
+    def __tick_phases(self, strang=None, local=None):
+        """
+        :param strang: splitting.StrangSplitting to bind the phases to (None: not splitting)
+        :param local: local_stepping.LocalTimeStepping to bind the vector engine and other objects to (None: not local
+        time stepping), which then steps them in place of the phases
+        :return: phases of a tick (see scheduler.Scheduler.phases), with the vector engine and its diffusion network in
+        place of the compartments and edges they advance (see VectorEngine.object_list), timed if profiling
+        :raise TypeError if a compartment or diffusion object cannot be advanced by the vector engine (local)
+        """
+        if local is not None:
+            engine, others = self.__vector_objects("solver 'local' (use solver 'euler')")
+            if self.__profiler is not None:
+                others = self.__profiler.step_list(others)
+            local.bind(engine, others)
+            return []
+        if self.__engine is None:
+            phases = self.__scheduler.phases()
+        else:
+            phases = self.__scheduler.phases(self.__engine.object_list(self.__object_list, self.__update_list))
+        if strang is not None:
+            strang.bind(phases)
+        if self.__profiler is not None:
+            for phase in phases:
+                phase.objects = self.__profiler.step_list(phase.objects)
+        return phases
+
+    def __phases(self):
+        """
+        :return: functions called in the phases of a tick: collect data, plot, move time forward, apply deferred
+        updates and save a checkpoint (timed by the profiler if profiling, see profile)
+        """
+        if self.__profiler is None:
+            return self.update_graphs, self.plot_graphs, self.__time.step, self.__apply_updates, self.checkpoint
+        return (self.__timed("collect", self.update_graphs), self.__timed("plot", self.plot_graphs),
+                self.__timed("time", self.__time.step), self.__profiler.apply_updates(self.__update_list),
+                self.__timed("checkpoint", self.checkpoint))
+
+    def __timed(self, phase: str, func):
+        """
+        :return: func, timed under phase by the profiler if profiling
+        """
+        return func if self.__profiler is None else self.__profiler.timed(phase, func)
+
+    @simulatormethod
+    def profile(self, enable: bool = True, trace: bool = True, allocations: bool = True):
+        """
+        Time the phases of the following runs: data collection, plotting, the step of each type of registered object,
+        moving time forward, applying deferred updates and checkpoints; and count ticks, deferred updates and
+        allocated memory blocks (see profiler.Profiler). Runs that are not profiled have no timers at all.
+
+        :param enable: start profiling (discarding earlier results), or stop if False
+        :param trace: keep every timed call for export (Profiler.write_trace)
+        :param allocations: count allocated memory blocks per phase
+        :return: profiler.Profiler (None if not enabled)
+
+        Usage:
+            profiler = Simulator.get_instance().profile()
+            Simulator.get_instance().run(stop=1e-3, dt=1e-6)
+            print(profiler.summary())
+            profiler.write_trace("run.trace.json")
+        """
+        if enable:
+            import profiler
+            self.__profiler = profiler.Profiler(trace=trace, allocations=allocations)
+        else:
+            self.__profiler = None
+        return self.__profiler
+
+    @simulatormethod
+    def profiler(self):
+        """
+        :return: profiler.Profiler of the runs (None if not profiling, see profile)
+        """
+        return self.__profiler
+
+    def __system(self, dt, purpose: str):
+        """
+        Bind all compartments and diffusion to the vector engine and write them as a system of differential equations.
+
+        :param dt: time step that jkccup and dz are defined for
+        :param purpose: description used in the error message
+        :return: system.CompartmentSystem, list of the other registered objects (e.g. colormaps)
+        :raise TypeError if a compartment or diffusion object cannot be advanced by the vector engine
+        """
+        from system import CompartmentSystem
+        engine, others = self.__vector_objects(purpose)
+        return CompartmentSystem(engine, dt), others
+
+    def __vector_objects(self, purpose: str):
+        """
+        Bind all compartments and diffusion to the vector engine.
+
+        :param purpose: description used in the error message
+        :return: vector engine, list of the other registered objects (e.g. colormaps)
+        :raise TypeError if a compartment or diffusion object cannot be advanced by the vector engine
+        """
+        from compartment import Compartment
+        from diffusion import Diffusion
+        self.use_engine("vector")
+        engine = self.__engine
+        step_list = engine.object_list(self.__object_list, self.__update_list)
+        others = []
+        for obj in step_list:
+            if obj is engine or obj is engine.network:
+                continue
+            if isinstance(obj, (Compartment, Diffusion)):
+                raise TypeError("'{}' ({}) is not supported by {}".format(
+                    obj.name, type(obj).__name__, purpose))
+            others.append(obj)
+        return engine, others
+
+    @simulatormethod
+    def solve_steady_state(self, tol: float = 1e-10, max_iter: int = 50, cache=None, advance: float = 0):
+        """
+        Find the steady state of all compartments and diffusion directly (instead of a long run) and write it into the
+        compartments. Impermeant anion amounts, kcc2 strength and impermeant charge are kept at their current values,
+        i.e. gx, jkccup and dz are treated as off (see steady_state.SteadyStateSolver).
+        The compartments are solved with the vector engine; the engine in use before (see use_engine) is used again
+        afterwards.
+
+        :param tol: relative accuracy of the concentrations and volumes
+        :param max_iter: maximum number of iterations
+        :param cache: steady_state_cache.SteadyStateCache to look up (and store) the steady state in, or True for one in
+        the default directory (default: no cache)
+        :param advance: simulation time (in s) to move forward by, e.g. the length of the run to steady state that
+        this replaces, so that later runs continue from the same time (default: the time is not changed)
+        :return: dictionary of the method used, number of iterations and residual
+        :raise steady_state.SteadyStateError if no steady state was found
         """
-        Add compartment to list of compartments to be updated at each time step
+        vector = self.__engine is not None
+        try:
+            info = self.__solve_steady_state(tol, max_iter, cache)
+        finally:
+            if not vector:
+                self.use_engine("object")
+        self.__time.time += np.float64(advance)
+        return info
+
+    def __solve_steady_state(self, tol, max_iter, cache):
+        """
+        Find the steady state with the vector engine and write it into the compartments (see solve_steady_state)
+        """
+        import steady_state
+        system = self.__system(self.__time.dt, "solve_steady_state")[0]
+        if cache is True:
+            import steady_state_cache
+            cache = steady_state_cache.SteadyStateCache()
+        elif cache is False:
+            cache = None
+        if cache is not None:
+            key = cache.key(system, tol)
+            y = cache.get(key)
+            if y is not None:
+                system.unpack(y)
+                self.__engine.sync()
+                return {"method": "cache", "key": key}
+        solver = steady_state.SteadyStateSolver(system, tol=tol, max_iter=max_iter)
+        y = solver.solve()
+        system.unpack(y)
+        self.__engine.sync()
+        if cache is not None:
+            cache.put(key, y)
+        return solver.info
+
+    @simulatormethod
+    def checkpoint(self, path: str):
+        """
+        Save the state of every registered object (compartments, diffusion, colormaps, ...) and of Time to a file, to
+        continue the simulation later with restore (see checkpoint.py). Graphs and recorders are not saved.
+
+        :param path: file to write (.npz)
+        :return: path written
+        """
+        import checkpoint
+        if self.__engine is not None:
+            self.__engine.sync()
+        return checkpoint.save(path, self.__object_list, self.__time)
+
+    @simulatormethod
+    def restore(self, path: str):
+        """
+        Set the state of every registered object and of Time from a file written by checkpoint.
+        The model must be created again as it was when checkpointed (same objects, registered in the same order),
+        e.g. by the same script, before restoring.
+
+        Usage:
+            ...build the model...
+            sim.restore("checkpoints/main.npz")
+            sim.run(continuefor=...)
+
+        :param path: file written by checkpoint
+        :raise checkpoint.CheckpointError if the file is not a checkpoint of the registered objects
+        """
+        import checkpoint
+        vector = self.__engine is not None
+        self.use_engine("object")
+        checkpoint.load(path, self.__object_list, self.__time)
+        self.__update_list.clear()
+        if vector:
+            self.use_engine("vector")
+
+    @simulatormethod
+    def solver_stats(self):
+        """
+        :return: dictionary of step counts of the adaptive solver or of solver "local" of the last run (empty for
+        "euler")
+        """
+        return dict(self.__solver_stats)
+
+    @simulatormethod
+    def stable_dt(self, safety: float = None):
+        """
+        Largest time step for which forward Euler is stable with the registered compartments and diffusion, from a
+        bound of their rates of change (see stability.py), rounded down to 1, 2 or 5 times a power of 10.
+
+        :param safety: fraction of the stability limit used (default: stability.SAFETY)
+        :return: time step (in s), or None if there are no compartments
+        """
+        import stability
+        if safety is None:
+            safety = stability.SAFETY
+        return stability.stable_dt(self.__rate_bound(), safety)
+
+    def __rate_bound(self):
+        """
+        :return: stability.rate_bound of the registered compartments, from the vector engine's arrays if it holds every
+        compartment and edge
+        """
+        import stability
+        from compartment import Compartment
+        from diffusion import Diffusion
+        if self.__engine is not None:
+            step_list = self.__engine.object_list(self.__object_list, self.__update_list)
+            if not any(isinstance(obj, (Compartment, Diffusion)) for obj in step_list):
+                return stability.engine_rate_bound(self.__engine)
+        compartments = [obj for obj in self.__object_list if isinstance(obj, Compartment)]
+        edges = [obj for obj in self.__object_list if isinstance(obj, Diffusion)]
+        return stability.object_rate_bound(compartments, edges)
+
+    def __auto_dt(self):
+        """
+        stable_dt for a run with dt "auto", with the lengths below which it is evaluated again set on the compartments
+        and the vector engine (see stability.length_margin and geometry_changed)
+
+        :return: time step (in s), or None if there are no compartments
+        """
+        import stability
+        rate = self.__rate_bound()
+        dt = stability.stable_dt(rate)
+        self.__stable_lengths(stability.length_margin(rate, dt))
+        return dt
+
+    def __stable_lengths(self, margin: float):
+        """
+        Set the lengths below which the time step is evaluated again to margin times the length of each compartment
+        (0: never)
+        """
+        from compartment import Compartment
+        for obj in self.__object_list:
+            if isinstance(obj, Compartment):
+                obj.L_stable = obj.L * margin
+        if self.__engine is not None:
+            state = self.__engine.state
+            self.__engine.stable_lengths = (state.generation, state["L"] * margin) if margin else None
+        self.__geometry_changed = False
+
+    @simulatormethod
+    def geometry_changed(self):
+        """
+        Note that compartments have been added, removed or shortened (by Compartment.update_length, below their
+        L_stable), so that a run with dt "auto" evaluates its time step again before the next tick.
+        """
+        self.__geometry_changed = True
+
+    @simulatormethod
+    def use_engine(self, engine: str = "object", backend: str = None):
+        """
+        Choose how compartments are advanced during a run.
+            "object": each registered object's step is called in turn (default)
+            "vector": compartments with the standard Compartment dynamics are held in contiguous arrays and advanced
+                      together (see engine.VectorEngine). They remain accessible as views (comp["cli"], comp.gx = ...).
+
+        :param engine: "object" or "vector"
+        :param backend: kernels of the vector engine: "numpy", or "jit" for loops compiled by Numba (if installed)
+        (see kernels.py) (default: keep the current backend, or "numpy")
+        :raise ValueError if engine or backend is not recognised
+        """
+        if engine == "object":
+            if self.__engine is not None:
+                self.__engine.release()
+                self.__engine = None
+                self.__update_list.reset()
+        elif engine == "vector":
+            if self.__engine is not None and backend is not None and self.__engine.backend != backend:
+                self.use_engine("object")
+            if self.__engine is None:
+                import engine as vector_engine
+                self.__engine = vector_engine.VectorEngine(backend or "numpy")
+        else:
+            raise ValueError("unknown engine '{}'".format(engine))
+
+    @simulatormethod
+    def engine(self):
+        """
+        :return: engine advancing compartments in bulk (None if each object is stepped individually)
+        """
+        return self.__engine
+
+    @simulatormethod
+    def register_compartment(self, compartment):
+        """
+        Add compartment to list of compartments to be updated at each time step (once per time step, in the phase of
+        its class, see scheduler.py)
 
         :param compartment:
         :return:
@@ -143,24 +810,75 @@ class Simulator(object):
             Simulator.get_instance().register_compartment(self)
         """
         if isinstance(compartment, sim_time.TimeMixin):
-            cls.__object_list.append(compartment)
+            self.__scheduler.register(compartment)
+            self.__geometry_changed = True
         else:
             raise TypeError("Compartment instance expected {0} given".format(type(compartment)))
 
-    @classmethod
-    def register_colormap(cls, colormap):
+    @simulatormethod
+    def register_colormap(self, colormap):
         """
         As above but for colormap object (compartment heights)
         :param colormap:
         :return:
         """
         if isinstance(colormap, sim_time.TimeMixin):
-            cls.__object_list.append(colormap)
+            self.__scheduler.register(colormap)
         else:
             raise TypeError("Compartment instance expected {0} given".format(type(colormap)))
 
-    @classmethod
-    def to_update(cls, obj: object, var: str, value: any, update_type: UpdateType):
+    @simulatormethod
+    def unregister(self, obj):
+        """
+        Remove a registered object (e.g. a compartment or diffusion removed from the model, see topology.Topology), so
+        that it is no longer stepped. A compartment bound to the vector engine is returned to a plain object.
+
+        :param obj: registered object
+        :raise ValueError if obj is not registered
+        """
+        self.__scheduler.unregister(obj)
+        if self.__engine is not None:
+            self.__engine.remove(obj)
+        self.__geometry_changed = True
+
+    @simulatormethod
+    def register_recorder(self, recorder):
+        """
+        Add a recorder.Recorder to record its channels whenever data is collected during a run (with or without a GUI).
+        Its samples are discarded, like the graphs' data, when a run starts from time 0.
+
+        :param recorder: recorder.Recorder
+        :return: recorder
+        """
+        if recorder not in self.__recorders:
+            self.__recorders.append(recorder)
+        return recorder
+
+    @simulatormethod
+    def unregister_recorder(self, recorder):
+        """
+        Stop recording with recorder (if registered)
+        """
+        if self.__recorders is not None and recorder in self.__recorders:
+            self.__recorders.remove(recorder)
+
+    @simulatormethod
+    def write_trajectory(self, path: str, variables=("nai", "ki", "cli", "xi", "V", "w"), compartments=None, **kwargs):
+        """
+        Stream the time and variables of compartments to disk at every data collection of the following runs
+        (see trajectory.TrajectoryWriter, and trajectory.Trajectory to read them).
+
+        :param path: directory (or HDF5 file) to write
+        :param variables: compartment variables written
+        :param compartments: compartments whose variables are written (default: all registered compartments)
+        :param kwargs: other arguments of TrajectoryWriter (chunk_size, file_format)
+        :return: trajectory.TrajectoryWriter (close it when done)
+        """
+        import trajectory
+        return self.register_recorder(trajectory.TrajectoryWriter(path, variables, compartments, **kwargs))
+
+    @simulatormethod
+    def to_update(self, obj: object, var: str, value: any, update_type: UpdateType):
         """
         Stores the value change for a var to be applied at the end of the time step.
 
@@ -169,10 +887,26 @@ class Simulator(object):
         :param value: the value to be updated at the end of the time step
         :param update_type: the type of update to apply to the variable
         """
-        cls.__update_list.append(DeferredUpdate(obj, var, value, update_type))
+        self.__update_list.add(obj, var, value, update_type)
 
-    @classmethod
-    def to_update_multi(cls, obj: object, d: dict):
+    @simulatormethod
+    def to_update_method(self, obj, func):
+        """
+        Stores a call of func(obj) to be made at the end of the time step (after the CHANGE and SET updates).
+        Passing the function of the class (e.g. type(self).update_values) rather than a bound method creates no
+        object per call.
+
+        :param obj: object to call func with
+        :param func: function of one argument
+
+        Usage:
+        Within a class
+            Simulator.get_instance().to_update_method(self, type(self).update_values)
+        """
+        self.__update_list.method(obj, func)
+
+    @simulatormethod
+    def to_update_multi(self, obj: object, d: dict):
         """
         Allow multiple deferred updates to be referenced through a dictionary.
 
@@ -196,10 +930,10 @@ class Simulator(object):
 
         """
         for var, sub_dict in d.items():
-            cls.to_update(obj, var, sub_dict["value"], sub_dict["type"])
+            self.to_update(obj, var, sub_dict["value"], sub_dict["type"])
 
-    @classmethod
-    def to_update_change(cls, obj, var, delta_value):
+    @simulatormethod
+    def to_update_change(self, obj, var, delta_value):
         """
         Stores the value change for a var to be applied at the end of the time step.
         Convenient method so UpdateType does not need to specified as CHANGE
@@ -210,12 +944,12 @@ class Simulator(object):
 
         Usage:
         Within a class
-            Simulator.get_instance().to_update(self, self.name_of_variable, self.update_value)
+            Simulator.get_instance().to_update_change(self, "name_of_variable", delta_value)
         """
-        cls.__update_list.append(DeferredUpdate(obj, var, delta_value, UpdateType.CHANGE))
+        self.__update_list.change(obj, var, delta_value)
 
-    @classmethod
-    def to_update_set(cls, obj, var, value):
+    @simulatormethod
+    def to_update_set(self, obj, var, value):
         """
         Stores the value for a var to be set to at the end of the time step.
 
@@ -225,53 +959,53 @@ class Simulator(object):
 
         Usage:
         Within a class
-            Simulator.get_instance().to_update(self, self.name_of_variable, self.set_value)
+            Simulator.get_instance().to_update_set(self, "name_of_variable", value)
         """
-        cls.__update_list.append(DeferredUpdate(obj, var, value, UpdateType.SET))
+        self.__update_list.set(obj, var, value)
 
-    @classmethod
-    def __clear_updates(cls):
+    def __clear_updates(self):
         """
-        Empty deferred update list (set to []).
+        Discard all deferred updates.
         """
-        cls.__update_list = []
+        self.__update_list.clear()
 
-    @classmethod
-    def __apply_updates(cls):
+    def __apply_updates(self):
         """
-        Apply all deferred updates and then clear the list.
+        Apply all deferred updates (see DeferredUpdateBuffer.apply for the order) and then clear them.
         """
-        for deferred_update in cls.__update_list:
-            deferred_update.apply_update()
-        cls.__clear_updates()
+        self.__update_list.apply()
 
-    @classmethod
-    def clear_graphs(cls):
+    @simulatormethod
+    def clear_graphs(self):
         """
-        Call all GUI's graphs to clear their contents
+        Call all GUI's graphs and registered recorders to clear their contents
         """
-        if cls.__gui is not None:
-            cls.__gui.clear_graphs()
+        for recorder in self.__recorders:
+            recorder.clear()
+        if self.__gui is not None:
+            self.__gui.clear_graphs()
 
-    @classmethod
-    def update_graphs(cls):
+    @simulatormethod
+    def update_graphs(self):
         """
-        Call all GUI's graphs to update their values (does not mean plot)
+        Call all GUI's graphs and registered recorders to update their values (does not mean plot)
         """
-        if cls.run_done is False:
-            if cls.__gui is not None:
-                cls.__gui.update_graphs()
+        if self.run_done is False:
+            for recorder in self.__recorders:
+                recorder.record()
+            if self.__gui is not None:
+                self.__gui.update_graphs()
 
-    @classmethod
-    def plot_graphs(cls):
+    @simulatormethod
+    def plot_graphs(self):
         """
         Call all GUI's graphs to plot their contents
         """
-        if cls.__gui is not None:
-            cls.__gui.plot_graphs()
+        if self.__gui is not None:
+            self.__gui.plot_graphs()
 
-    @classmethod
-    def time(cls):
+    @simulatormethod
+    def time(self):
         """
         Get Time control
         Warning: time is a python library and so assigned variable should not be named such.
@@ -281,26 +1015,34 @@ class Simulator(object):
         Usage:
             sim_time = Simulator.get_instance().time()
         """
-        return cls.__time
+        return self.__time
 
-    @classmethod
-    def gui(cls):
+    @simulatormethod
+    def gui(self, create: bool = True):
         """
         Get GUI.
         Creates GUI if called and GUI does not exist.
 
+        :param create: create the GUI if it does not exist (if False, None is returned instead)
         :return: GUI object reference
 
         Usage:
             sim_time = Simulator.get_instance().gui()
         """
-        if cls.__gui is None:
+        if self.__gui is None and create:
             import gui
-            Simulator.__gui = gui.GUI.init(Simulator.__time)
-        return cls.__gui
+            self.__gui = gui.GUI(self.__time, headless=self.__headless)
+        return self.__gui
 
-    @classmethod
-    def object_list(cls, add=None):
+    @simulatormethod
+    def headless(self):
+        """
+        :return: whether graphs are drawn off-screen (non-interactive matplotlib backend) rather than shown
+        """
+        return self.__headless
+
+    @simulatormethod
+    def object_list(self, add=None):
         """
         Retrieve and optionally add to object list.
         Used for testing. Should use register_compartment instead.
@@ -309,17 +1051,25 @@ class Simulator(object):
         :return: object list
         """
         if add is not None:
-            cls.__object_list.append(add)
-        return cls.__object_list
+            self.__scheduler.register(add)
+        return self.__object_list
 
-    @classmethod
-    def dispose(cls):
+    @simulatormethod
+    def dispose(self):
         """
-        Cleaning of class.
+        Cleaning of the Simulator, which is no longer the current Simulator of this thread (a new one is created by
+        get_instance).
          Note: objects are not garbage collected explicitly, i.e. they still exist in memory.
         """
-        cls.__single = None
-        cls.__time = None
-        cls.__gui = None
-        cls.__object_list = None
-        cls.__update_list = None
+        if self.__engine is not None:
+            self.__engine.release()
+        stack = Simulator.__stack()
+        stack[:] = [sim for sim in stack if sim is not self]
+        self.__time = None
+        self.__gui = None
+        self.__engine = None
+        self.__scheduler = None
+        self.__object_list = None
+        self.__update_list = None
+        self.__recorders = None
+        self.__profiler = None
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Registry of the ion species of the model: name, valence, extracellular concentration, membrane conductance and
+diffusion coefficient of each.
+
+A species <name> is held by each compartment as its intracellular concentration <name>i and extracellular
+concentration <name>o (e.g. nai and nao). Sodium, potassium and chloride are registered by default; other species
+(e.g. bicarbonate, or a mobile impermeant with no conductance) are added to every compartment created after they are
+registered:
+
+    species.registry.register("hco3", z=-1, inside=15e-3, out=25e-3, g=0.2e-3/F, D=1.18e-7)
+
+The registry compiles into arrays along a species axis (see SpeciesArrays), so that the vector engine and the
+diffusion network compute the fluxes of all species in one operation.
+"""
+import numpy as np
+from common import nao, ko, clo, gna, gk, gcl
+
+# species of the Compartment equations (pump, KCC2), always registered and first on the species axis
+CORE = ("na", "k", "cl")
+
+
+class Species(object):
+    """
+    An ion species
+    """
+    __slots__ = ("name", "z", "inside", "out", "g", "D")
+
+    def __init__(self, name: str, z: float, inside: float = 0.0, out: float = 0.0, g: float = 0.0, D: float = 0.0):
+        """
+        :param name: name (e.g. 'na'), without the suffix of the intracellular (i) or extracellular (o) concentration
+        :param z: valence
+        :param inside: initial intracellular concentration (M) of new compartments (not used for CORE species)
+        :param out: extracellular concentration (M)
+        :param g: membrane conductance (S/dm^2 / F, as common.gna); 0 for an impermeant species
+        :param D: diffusion coefficient (dm2/s) between compartments
+        """
+        self.name = name
+        self.z = z
+        self.inside = inside
+        self.out = out
+        self.g = g
+        self.D = D
+
+    @property
+    def internal(self):
+        """
+        :return: name of the intracellular concentration (e.g. 'nai')
+        """
+        return self.name + "i"
+
+    @property
+    def external(self):
+        """
+        :return: name of the extracellular concentration (e.g. 'nao')
+        """
+        return self.name + "o"
+
+
+class SpeciesArrays(object):
+    """
+    Species compiled into arrays along a species axis: CORE species first, then the other permeant species, then the
+    impermeant ones, so that the permeant species are the first n_permeant.
+    """
+
+    def __init__(self, species: list):
+        core = [sp for sp in species if sp.name in CORE]
+        core.sort(key=lambda sp: CORE.index(sp.name))
+        others = [sp for sp in species if sp.name not in CORE]
+        self.species = tuple(core + [sp for sp in others if sp.g != 0] + [sp for sp in others if sp.g == 0])
+        # intracellular and extracellular concentration of each species
+        self.names = tuple(sp.internal for sp in self.species)
+        self.outside = tuple(sp.external for sp in self.species)
+        self.z = np.array([sp.z for sp in self.species], dtype=np.float64)
+        self.out = np.array([sp.out for sp in self.species], dtype=np.float64)
+        self.g = np.array([sp.g for sp in self.species], dtype=np.float64)
+        self.D = np.array([sp.D for sp in self.species], dtype=np.float64)
+        self.n_core = len(core)
+        self.n_permeant = int(np.count_nonzero(self.g))
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.species)
+
+
+class SpeciesRegistry(object):
+    """
+    Species by name, in order of registration.
+    """
+
+    def __init__(self):
+        self.species = {}
+        # ion (e.g. 'cli', 'Nao', 'k') -> valence, filled on first use
+        self.__valences = {}
+        self.__compiled = None
+
+    def register(self, name: str, z: float, inside: float = 0.0, out: float = 0.0, g: float = 0.0, D: float = 0.0):
+        """
+        Add a species (or replace the species of that name). See Species for the parameters.
+        Compartments created before a species is registered do not have it.
+
+        :return: Species
+        :raise ValueError if the name ends with i or o (the suffixes of its concentrations), or is a CORE species
+        (whose parameters are those of common.py)
+        """
+        name = name.lower()
+        if name.endswith("i") or name.endswith("o"):
+            raise ValueError("species '{}' must be named without the suffix i or o".format(name))
+        if name in CORE and name in self.species:
+            raise ValueError("species '{}' cannot be replaced".format(name))
+        self.species[name] = Species(name, z, inside, out, g, D)
+        self.__valences.clear()
+        self.__compiled = None
+        return self.species[name]
+
+    def unregister(self, name: str):
+        """
+        Remove a species that is not one of CORE
+
+        :raise ValueError if name is a CORE species
+        """
+        name = name.lower()
+        if name in CORE:
+            raise ValueError("species '{}' cannot be removed".format(name))
+        del self.species[name]
+        self.__valences.clear()
+        self.__compiled = None
+
+    def __getitem__(self, ion: str):
+        """
+        :param ion: species name or the name of its concentration (e.g. 'k', 'ki' or 'ko')
+        :return: Species
+        :raise KeyError if there is no such species
+        """
+        name = ion.lower()
+        if name not in self.species and (name.endswith("i") or name.endswith("o")):
+            name = name[:-1]
+        return self.species[name]
+
+    def __contains__(self, ion: str):
+        try:
+            self[ion]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.species.values())
+
+    def __len__(self):
+        return len(self.species)
+
+    def valence(self, ion: str):
+        """
+        :return: valence of ion (memoized, so an ion's name is only parsed once)
+        :raise KeyError if there is no such species
+        """
+        try:
+            return self.__valences[ion]
+        except KeyError:
+            z = self.__valences[ion] = self[ion].z
+            return z
+
+    def extra(self):
+        """
+        :return: registered species other than CORE, in the order of the species axis
+        """
+        return self.compile().species[len(CORE):]
+
+    def extra_fields(self):
+        """
+        :return: names of the intracellular and extracellular concentrations of the extra species
+        """
+        return tuple(name for sp in self.extra() for name in (sp.internal, sp.external))
+
+    def diffusion_coefficients(self):
+        """
+        :return: {intracellular concentration: D} of the species that diffuse (e.g. the ions of a Diffusion)
+        """
+        return {sp.internal: sp.D for sp in self.compile().species if sp.D != 0}
+
+    def compile(self):
+        """
+        :return: SpeciesArrays of the registered species (reused until the registry changes)
+        """
+        if self.__compiled is None:
+            self.__compiled = SpeciesArrays(list(self.species.values()))
+        return self.__compiled
+
+
+registry = SpeciesRegistry()
+registry.register("na", z=1, out=nao, g=gna, D=1.33e-7)
+registry.register("k", z=1, out=ko, g=gk, D=1.96e-7)
+registry.register("cl", z=-1, out=clo, g=gcl, D=2.03e-7)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Multirate operator splitting of the membrane and diffusion phases of a tick (see Simulator.run with solver "strang"),
+and a report of its accuracy against a single-rate run (accuracy_report).
+
+With Strang splitting, a tick of dt is
+    fast process    dt/2, in substeps steps of dt/(2*substeps)
+    slow process    dt, in one step
+    fast process    dt/2, in substeps steps of dt/(2*substeps)
+    observers       one step
+with the deferred updates applied after every step of a process, so that each process continues from the state left
+by the other, and the voltages updated from the concentrations before every step of diffusion (whose drift depends on
+them). The fast process (split) is diffusion between short compartments (default) or the membrane kinetics.
+The symmetric sequence keeps the splitting error second order in dt; each step is a forward Euler step of its process.
+jkccup and dz are increments per tick, so each step of a fast membrane process is given its fraction of them (see
+TickIncrements).
+
+Usage:
+    sim.run(stop=1, dt=1e-4, solver="strang", split="diffusion", substeps=20)
+"""
+import time
+from contextlib import contextmanager
+import numpy as np
+from scheduler import MEMBRANE, DIFFUSION
+
+# processes that can be sub-cycled (the other one is the slow process)
+SPLITS = (DIFFUSION, MEMBRANE)
+
+
+class StrangSplitting(object):
+    """
+    Steps the phases of a tick (see scheduler.Scheduler.phases) with Strang splitting of the membrane and diffusion
+    phases.
+    """
+
+    def __init__(self, split: str = DIFFUSION, substeps: int = 1):
+        """
+        :param split: fast process, sub-cycled: "diffusion" or "membrane"
+        :param substeps: number of steps of the fast process in each half tick
+        :raise ValueError if split is not one of SPLITS or substeps is less than 1
+        """
+        if split not in SPLITS:
+            raise ValueError("unknown split '{}' (expected one of {})".format(split, ", ".join(SPLITS)))
+        if int(substeps) < 1:
+            raise ValueError("substeps must be at least 1 ({} given)".format(substeps))
+        self.split = split
+        self.slow = MEMBRANE if split == DIFFUSION else DIFFUSION
+        self.substeps = int(substeps)
+        self.__fast_phase = None
+        self.__slow_phase = None
+        self.__others = []
+        # update_voltage of the objects of the membrane phase (Compartment, VectorEngine)
+        self.__voltages = []
+        # jkccup and dz of the objects of the membrane phase
+        self.__increments = TickIncrements([])
+
+    def bind(self, phases: list):
+        """
+        :param phases: phases of a tick (see scheduler.Scheduler.phases), stepped by the following calls of step (bound
+        before the profiler wraps their objects, which are then timed, see Profiler.step_list)
+        """
+        self.__fast_phase = self.__slow_phase = None
+        self.__others = []
+        self.__voltages = []
+        for phase in phases:
+            if phase.name == self.split:
+                self.__fast_phase = phase
+            elif phase.name == self.slow:
+                self.__slow_phase = phase
+            else:
+                self.__others.append(phase)
+            if phase.name == MEMBRANE:
+                self.__voltages = [obj.update_voltage for obj in phase.objects if hasattr(obj, "update_voltage")]
+                self.__increments = TickIncrements(phase.objects)
+
+    def __step(self, phase, _time, apply_updates):
+        if phase.name == DIFFUSION:
+            for update_voltage in self.__voltages:
+                update_voltage()
+        phase.step(_time)
+        apply_updates()
+
+    def __step_fast(self, phase, _time, fast_dt, apply_updates):
+        """
+        Step the fast process substeps times with fast_dt (the membrane with its fraction of jkccup and dz)
+        """
+        dt = _time.dt
+        _time.dt = fast_dt
+        if phase.name == MEMBRANE:
+            with self.__increments.scaled(fast_dt / dt):
+                for i in range(self.substeps):
+                    self.__step(phase, _time, apply_updates)
+        else:
+            for i in range(self.substeps):
+                self.__step(phase, _time, apply_updates)
+        _time.dt = dt
+
+    def step(self, _time, apply_updates):
+        """
+        Step the bound phases for one tick of _time.dt. The fast process is stepped with a smaller dt, which is restored
+        before the slow process and the observers are stepped.
+
+        :param _time: Time of the run
+        :param apply_updates: function that applies the deferred updates
+        """
+        dt = _time.dt
+        fast_dt = np.float64(dt / (2 * self.substeps))
+        fast, slow = self.__fast_phase, self.__slow_phase
+        if fast is not None:
+            self.__step_fast(fast, _time, fast_dt, apply_updates)
+        if slow is not None:
+            self.__step(slow, _time, apply_updates)
+        if fast is not None:
+            self.__step_fast(fast, _time, fast_dt, apply_updates)
+        for phase in self.__others:
+            phase.step(_time)
+
+
+class TickIncrements(object):
+    """
+    jkccup and dz of compartments are increments per tick (of the dt of the run). For steps of a fraction of a tick
+    (the steps of a fast membrane process, or the last, shorter tick of a run with dt "auto") they are scaled by that
+    fraction, as for the coarse steps of local_stepping.
+    """
+
+    def __init__(self, objects: list):
+        """
+        :param objects: objects stepped (Compartment, VectorEngine for the compartments bound to it, and others)
+        """
+        from compartment import Compartment
+        from engine import CompartmentView, VectorEngine
+        self.compartments = [obj for obj in objects
+                             if isinstance(obj, Compartment) and not isinstance(obj, CompartmentView)]
+        self.states = [obj.state for obj in objects if isinstance(obj, VectorEngine)]
+
+    @contextmanager
+    def scaled(self, ratio: float):
+        """
+        Scale jkccup and dz by ratio within the block, and restore them after it
+        """
+        saved = [(comp.jkccup, comp.dz) for comp in self.compartments]
+        saved_states = [(state["jkccup"].copy(), state["dz"].copy()) for state in self.states]
+        for comp in self.compartments:
+            if comp.jkccup is not None:
+                comp.jkccup *= ratio
+            comp.dz *= ratio
+        for state in self.states:
+            state["jkccup"][:] *= ratio
+            state["dz"][:] *= ratio
+        try:
+            yield
+        finally:
+            for comp, (jkccup, dz) in zip(self.compartments, saved):
+                comp.jkccup, comp.dz = jkccup, dz
+            for state, (jkccup, dz) in zip(self.states, saved_states):
+                state["jkccup"][:] = jkccup
+                state["dz"][:] = dz
+
+
+def final_values(sim, variables):
+    """
+    :return: array (compartments x variables) of the values of the compartments registered with sim
+    """
+    from compartment import Compartment
+    return np.array([[obj[var] for var in variables] for obj in sim.object_list() if isinstance(obj, Compartment)])
+
+
+def accuracy_report(build, stop: float, dt: float, split: str = DIFFUSION, substeps: int = 10,
+                    reference_dt: float = None, engine: str = "vector", variables=("nai", "ki", "cli", "V", "w")):
+    """
+    Run a model with Strang splitting and with a single rate (forward Euler with reference_dt for both processes), each
+    in its own Simulator, and compare the values of its compartments at the end.
+
+    :param build: function that creates the model (compartments and diffusion) in the current Simulator
+    :param stop: time the model is run for (s)
+    :param dt: time step of the slow process (s)
+    :param split: fast process (see StrangSplitting)
+    :param substeps: number of steps of the fast process in each half tick
+    :param reference_dt: time step of the single-rate run (default: that of the fast process, dt / (2 * substeps))
+    :param engine: engine of both runs (see Simulator.use_engine)
+    :param variables: compartment variables compared
+    :return: dictionary of
+        error       {variable: largest difference of the split run from the single-rate run, relative to the largest
+                    magnitude of the variable in the single-rate run}
+        time        {"split": wall time, "reference": wall time} (s)
+        speedup     wall time of the single-rate run / wall time of the split run
+        dt          {"slow": dt, "fast": dt / (2 * substeps), "reference": reference_dt}
+    """
+    import simulator
+    if reference_dt is None:
+        reference_dt = dt / (2 * substeps)
+    runs = {"split": dict(dt=dt, solver="strang", split=split, substeps=substeps),
+            "reference": dict(dt=reference_dt)}
+    values, times = {}, {}
+    for name, kwargs in runs.items():
+        sim = simulator.Simulator(_gui=False, current=False)
+        with sim.activate():
+            build()
+        start = time.perf_counter()
+        sim.run(stop=stop, engine=engine, print_time=False, **kwargs)
+        times[name] = time.perf_counter() - start
+        values[name] = final_values(sim, variables)
+        sim.dispose()
+    reference = values["reference"]
+    scale = np.max(np.abs(reference), axis=0)
+    error = np.max(np.abs(values["split"] - reference), axis=0) / np.where(scale > 0, scale, 1)
+    return {"error": dict(zip(variables, error.tolist())),
+            "time": times,
+            "speedup": times["reference"] / times["split"],
+            "dt": {"slow": dt, "fast": dt / (2 * substeps), "reference": reference_dt}}
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Stability limit of the time step of forward Euler (see Simulator.stable_dt and Simulator.run with dt "auto").
+
+A forward Euler step of dt is stable while dt * |lambda| <= 2 for every eigenvalue lambda of the Jacobian of the
+compartments and diffusion. |lambda| is bounded by the largest sum, over a row of the Jacobian (Gershgorin), of
+    Fick        2 * D / (dx * L) for each edge of the compartment (largest over the ions)
+    drift       (F/(C*Ar) of both compartments) * sum over the ions of z**2 * D * c / (RTF * dx * L) for each edge,
+                where c is the mean concentration across the edge: the charge an edge moves changes the voltage of
+                both of its compartments, which drives the drift
+    membrane    F/C * sum of the conductances of the permeant species (common.gna, gk, gcl)
+for each compartment of length L, where dx is the distance between the midpoints of the compartments of an edge.
+The drift term is by far the largest; like the others it scales with 1/(dx * L), so the limit falls with the square of
+the segment length: about 2e-5 s for segments of 10 um, 2e-6 s for 3 um and 2e-7 s for 1 um. Without diffusion, the
+membrane limits the time step to about 0.03 s.
+
+During a run with dt "auto", the limit is evaluated again when compartments are added or removed, and when a compartment
+becomes shorter than the length for which the time step may no longer be stable (see length_margin).
+
+Usage:
+    dt = sim.stable_dt()
+    sim.run(stop=1, dt="auto")
+"""
+import numpy as np
+from common import RTF
+
+# fraction of the stability limit used as the time step
+SAFETY = 0.8
+# ticks between evaluations of the limit during a run with dt "auto" (for the changes in concentrations)
+CHECK_INTERVAL = 100
+
+
+def rate_bound(L, FinvCAr, Ar, g, ends, D, z, C):
+    """
+    :param L: length of each compartment (dm)
+    :param FinvCAr: F/(C*Ar) of each compartment
+    :param Ar: area to volume ratio of each compartment
+    :param g: sum of the membrane conductances of the permeant species
+    :param ends: index of comp_a and comp_b of each edge (edges x 2)
+    :param D: diffusion coefficient of each edge for each ion (edges x ions)
+    :param z: valence of each ion
+    :param C: concentration of each ion in each compartment (compartments x ions)
+    :return: bound of the rate of change (1/s) of the fastest mode of each compartment (see module description)
+    """
+    rate = Ar * FinvCAr * g
+    if len(ends):
+        a, b = ends[:, 0], ends[:, 1]
+        dx = (L[a] + L[b]) / 2
+        fick = 2 * np.max(D, axis=1) / dx
+        drift = (z ** 2 * D * (C[a] + C[b]) / 2).sum(axis=1) / (RTF * dx) * (FinvCAr[a] + FinvCAr[b])
+        np.add.at(rate, a, (fick + drift) / L[a])
+        np.add.at(rate, b, (fick + drift) / L[b])
+    return rate
+
+
+def engine_rate_bound(engine):
+    """
+    :param engine: VectorEngine
+    :return: rate_bound of the compartments bound to the engine, with the edges of its diffusion network
+    """
+    state, network = engine.state, engine.network
+    g = np.sum(state.species.g[:state.species.n_permeant])
+    return rate_bound(state["L"], state["FinvCAr"], state["Ar"], g, network.endpoints(), network.D[:network.n_edges],
+                      network.z, network.concentrations())
+
+
+def object_rate_bound(compartments: list, edges: list):
+    """
+    :param compartments: Compartment objects
+    :param edges: Diffusion objects between them
+    :return: rate_bound of the compartments, with the edges
+    """
+    from species import registry
+    sp = registry.compile()
+    g = np.sum(sp.g[:sp.n_permeant])
+    index = {id(comp): i for i, comp in enumerate(compartments)}
+    ions = sorted({ion for edge in edges for ion in edge.ions})
+    ends = np.array([[index[id(edge.comp_a)], index[id(edge.comp_b)]] for edge in edges], dtype=np.int64)
+    D = np.array([[edge.ions.get(ion, 0) for ion in ions] for edge in edges]).reshape(len(edges), len(ions))
+    z = np.array([registry.valence(ion) for ion in ions])
+    C = np.array([[comp[ion] for ion in ions] for comp in compartments]).reshape(len(compartments), len(ions))
+
+    def values(var):
+        return np.array([comp[var] for comp in compartments], dtype=np.float64)
+
+    return rate_bound(values("L"), values("FinvCAr"), values("Ar"), g, ends.reshape(len(edges), 2), D, z, C)
+
+
+def round_dt(dt: float):
+    """
+    :return: largest time step of 1, 2 or 5 times a power of 10 that is not larger than dt (so that data collection
+    and plot intervals are multiples of it)
+    """
+    exponent = int(np.floor(np.log10(dt)))
+    for mantissa in (5, 2, 1):
+        value = np.float64("{}e{}".format(mantissa, exponent))
+        if value <= dt:
+            return value
+    return np.float64("1e{}".format(exponent - 1))
+
+
+def stable_dt(rate, safety: float = SAFETY):
+    """
+    :param rate: rate_bound of the compartments
+    :param safety: fraction of the stability limit used
+    :return: largest stable time step (rounded down, see round_dt), or None if there are no compartments
+    """
+    if len(rate) == 0 or not np.max(rate) > 0:
+        return None
+    return round_dt(safety * 2 / np.max(rate))
+
+
+def length_margin(rate, dt, safety: float = SAFETY):
+    """
+    As compartments become shorter, the rate bound of each grows at most with the cube of 1/L: with 1/(dx * L), and
+    with the concentrations that drive the drift, which rise as the volume falls (the radius is fixed). So dt is within
+    safety of the limit while no compartment is shorter than a fraction of its length when rate was found.
+
+    :param rate: rate_bound of the compartments
+    :param dt: time step
+    :param safety: fraction of the stability limit used
+    :return: that fraction (0 if dt is None)
+    """
+    if dt is None:
+        return 0.0
+    return float(np.cbrt(min(1.0, dt * np.max(rate) / (2 * safety))))
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import numpy as np
+from scipy import sparse, integrate
+from scipy.sparse import linalg
+
+# unknowns of each compartment (solved for as logarithms so that they stay positive)
+UNKNOWNS = ("nai", "ki", "cli", "w")
+
+
+class SteadyStateError(RuntimeError):
+    pass
+
+
+class SteadyStateSolver(object):
+    """
+    Finds the steady state of a CompartmentSystem (see system.py) directly instead of by a long run.
+
+    The unknowns are log(nai), log(ki), log(cli), log(w) and the logarithms of the concentrations of the other permeant
+    species (see species.registry) of every compartment. The amounts of impermeant anions (xm*w and xi_temp*w, and
+    those of impermeant registered species), the kcc2 strength and the impermeant charge are held at their current
+    values, as they are during a run in which gx, jkccup and dz are off (otherwise there is no steady state).
+    The residual is the rate of change of the unknowns ((dc/dt)/c and (dw/dt)/w, in 1/s).
+
+    The residual is solved with damped Newton iterations. The Jacobian is sparse (a compartment only depends on the
+    compartments it is connected to by diffusion) and is found by complex-step differentiation of groups of columns that
+    share no rows, so that a network needs only a few residual evaluations per Jacobian. If Newton's method fails from the
+    initial state (which may be far from the steady state), pseudo-transient continuation is used: the dynamics are
+    followed with an implicit solver for a growing interval of time until Newton's method converges.
+    """
+
+    def __init__(self, system, tol=1e-10, max_iter=50):
+        """
+        :param system: CompartmentSystem
+        :param tol: relative accuracy of the concentrations and volumes at the steady state
+        :param max_iter: maximum number of iterations of each method
+        :raise ValueError if a registered species is impermeant and diffuses (its amount in each compartment is not
+        fixed, nor set by the membrane)
+        """
+        sp = system.species
+        permeant = sp.names[sp.n_core:sp.n_permeant]
+        impermeant = sp.names[sp.n_permeant:]
+        diffusing = [name for name in impermeant if name in system.network.ions]
+        if diffusing:
+            raise ValueError("the steady state cannot be found with the diffusing impermeant species {}".format(
+                ", ".join(diffusing)))
+        self.system = system
+        self.tol = tol
+        self.max_iter = max_iter
+        self.info = {}
+        self.unknowns = UNKNOWNS + permeant
+        y = system.pack()
+        v = system.split(y)
+        # fixed during the solve
+        self.y = y
+        self.amounts = {field: v[field] * v["w"] for field in ("xm", "xi_temp") + impermeant}
+        self.__groups = None
+
+    def initial(self):
+        """
+        :return: unknowns at the current state
+        """
+        v = self.system.split(self.y)
+        return np.log(np.concatenate([v[field] for field in self.unknowns]))
+
+    def state(self, u):
+        """
+        :param u: unknowns
+        :return: state vector of the system for the unknowns
+        """
+        n = self.system.n
+        y = self.y.astype(np.result_type(self.y, u))
+        v = self.system.split(y)
+        values = np.exp(u)
+        for k, field in enumerate(self.unknowns):
+            v[field][:] = values[k * n:(k + 1) * n]
+        for field, amount in self.amounts.items():
+            v[field][:] = amount / v["w"]
+        return y
+
+    def residual(self, u):
+        """
+        :param u: unknowns
+        :return: rate of change of the unknowns, i.e. relative rate of change of each concentration and volume (1/s)
+        """
+        y = self.state(u)
+        v = self.system.split(y)
+        dydt = self.system.split(self.system.rhs(0, y))
+        return np.concatenate([dydt[field] / v[field] for field in self.unknowns])
+
+    def structure(self):
+        """
+        :return: sparsity structure of the Jacobian of the residual (CSC)
+        """
+        system_structure = self.system.jac_sparsity()
+        connected = system_structure[:self.system.n, :self.system.n]
+        return sparse.kron(np.ones((len(self.unknowns), len(self.unknowns))), connected, format="csc")
+
+    def groups(self):
+        """
+        Columns of the Jacobian that share no rows can be found from the same finite difference.
+
+        :return: group of each column
+        """
+        if self.__groups is None:
+            structure = self.structure()
+            conflicts = (structure.T @ structure).tolil().rows
+            groups = np.full(structure.shape[1], -1)
+            for j in range(structure.shape[1]):
+                used = {groups[k] for k in conflicts[j]}
+                group = 0
+                while group in used:
+                    group += 1
+                groups[j] = group
+            self.__groups = groups
+        return self.__groups
+
+    def jacobian(self, u):
+        """
+        Jacobian of the residual by complex-step differentiation of groups of columns: the imaginary part of
+        residual(u + i*h*e) is h * J @ e to machine precision, without the cancellation of finite differences.
+        This matters as the Jacobian is ill-conditioned (diffusion between small compartments is much faster than the
+        membrane), so that the slow modes are lost in the error of a finite-difference Jacobian.
+
+        :param u: unknowns
+        :return: sparse Jacobian (CSC)
+        """
+        structure = self.structure()
+        groups = self.groups()
+        J = structure.astype(np.float64)
+        h = 1e-30
+        rows = J.indices
+        for group in range(groups.max() + 1):
+            columns = groups == group
+            dF = self.residual(u + 1j * h * columns).imag / h
+            for j in np.flatnonzero(columns):
+                start, end = J.indptr[j], J.indptr[j + 1]
+                J.data[start:end] = dF[rows[start:end]]
+        return J
+
+    def solve(self):
+        """
+        :return: state vector at the steady state
+        :raise SteadyStateError if neither method converges
+        """
+        u = self.initial()
+        try:
+            u = self.newton(u)
+        except SteadyStateError:
+            u = self.pseudo_transient(self.initial())
+        self.info["residual"] = np.max(np.abs(self.residual(u)))
+        return self.state(u)
+
+    def newton(self, u, max_iter=None):
+        """
+        Damped Newton iterations. The Jacobian is ill-conditioned, so the step is judged by the natural monotonicity
+        test rather than by the residual: a step of length lam is accepted if the Newton correction at the new point
+        (with the same Jacobian) is smaller than the step itself, otherwise lam is halved.
+        Converged when the Newton step changes no unknown by more than tol, i.e. the concentrations and volumes are
+        found to a relative accuracy of tol.
+
+        :param u: initial unknowns
+        :param max_iter: maximum number of iterations (default: max_iter of the solver)
+        :return: unknowns at the steady state
+        :raise SteadyStateError if not converged
+        """
+        max_iter = max_iter or self.max_iter
+        lam = 1.0
+        for k in range(max_iter):
+            F = self.residual(u)
+            try:
+                lu = linalg.splu(self.jacobian(u))
+            except RuntimeError:
+                break
+            du = -lu.solve(F)
+            if not np.all(np.isfinite(du)):
+                break
+            if np.max(np.abs(du)) <= self.tol:
+                self.info = {"method": "newton", "iterations": k + 1}
+                return u + du
+            norm = np.linalg.norm(du)
+            lam = min(1.0, 2 * lam)
+            while lam >= 1e-4:
+                F_new = self.residual(u + lam * du)
+                du_new = -lu.solve(F_new)
+                if np.all(np.isfinite(du_new)) and np.linalg.norm(du_new) < (1 - lam / 4) * norm:
+                    break
+                lam /= 2
+            else:
+                break
+            u = u + lam * du
+        raise SteadyStateError("Newton iterations did not converge")
+
+    def pseudo_transient(self, u, tau=1.0):
+        """
+        Pseudo-transient continuation: follow the dynamics du/dt = F(u) towards the steady state with an implicit
+        adaptive solver (BDF with the sparse Jacobian), for a pseudo time tau that grows tenfold, until Newton
+        iterations converge from the state reached.
+
+        :param u: initial unknowns
+        :param tau: first interval of pseudo time (s)
+        :return: unknowns at the steady state
+        :raise SteadyStateError if not converged
+        """
+        t = 0
+        for k in range(self.max_iter):
+            solution = integrate.solve_ivp(lambda _t, _u: self.residual(_u), (t, t + tau), u, method="BDF",
+                                           jac=lambda _t, _u: self.jacobian(_u), rtol=1e-6, atol=1e-9)
+            if not solution.success:
+                break
+            t, u = t + tau, solution.y[:, -1]
+            try:
+                u = self.newton(u, max_iter=20)
+                self.info = {"method": "pseudo-transient", "iterations": k + 1, "pseudo time": t,
+                             "newton iterations": self.info["iterations"]}
+                return u
+            except SteadyStateError:
+                tau *= 10
+        raise SteadyStateError("steady state not found by pseudo-transient continuation (residual {})".format(
+            np.max(np.abs(self.residual(u)))))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import hashlib
+import os
+import numbers
+import numpy as np
+import common
+import constants
+
+# variables of the state (besides those solved for) that the steady state depends on
+PARAMETERS = ("r", "r1", "sa", "Ar", "FinvCAr", "p", "xmz", "nao", "ko", "clo", "stretch_w")
+
+
+def default_directory():
+    """
+    :return: directory of the cache: $MCMA_CACHE_DIR, or ~/.cache/multi-compartment_multi-anion
+    """
+    return os.environ.get("MCMA_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "multi-compartment_multi-anion"))
+
+
+def module_constants(*modules):
+    """
+    :return: sorted list of (module, name, value) of the numeric globals of each module
+    """
+    values = []
+    for module in modules:
+        for name, value in vars(module).items():
+            if not name.startswith("_") and isinstance(value, numbers.Number):
+                values.append((module.__name__, name, repr(value)))
+    return sorted(values)
+
+
+class SteadyStateCache(object):
+    """
+    Steady states stored on disk, addressed by a hash of everything they depend on:
+        - the state and parameters of every compartment (system.SYSTEM_FIELDS and PARAMETERS)
+        - the registered species (valence, conductance and diffusion coefficient, and their concentrations in and
+          outside every compartment)
+        - the diffusion topology (compartments and diffusion coefficients of every edge)
+        - the numeric constants of common.py and constants.py
+        - the tolerance of the solver
+    so that an entry is never used for a different model, and entries become unreachable when a constant changes.
+
+    Each entry is an .npz file of the solved state vector. Reading an entry marks it as recently used (its
+    modification time); the least recently used entries are removed when there are more than max_entries or they take
+    more than max_bytes.
+    """
+
+    def __init__(self, directory=None, max_entries=256, max_bytes=256 * 2 ** 20):
+        """
+        :param directory: where entries are stored (default: default_directory())
+        :param max_entries: largest number of entries kept
+        :param max_bytes: largest total size of the entries kept
+        """
+        self.directory = directory or default_directory()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, system, tol):
+        """
+        :param system: CompartmentSystem before solving
+        :param tol: tolerance of the steady state solver
+        :return: hexadecimal key of the steady state of system
+        """
+        digest = hashlib.sha256()
+        state = system.state
+        digest.update(repr((system.n, system.fields, PARAMETERS, float(tol))).encode())
+        for field in system.fields + PARAMETERS:
+            digest.update(np.ascontiguousarray(state[field], dtype=np.float64).tobytes())
+        species = state.species
+        digest.update(repr(species.names).encode())
+        for values in (species.z, species.g, species.D, state.concentrations_out):
+            digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        network = system.network
+        digest.update(repr(network.ions).encode())
+        if network.n_edges:
+            digest.update(network.incidence().indices.tobytes())
+            digest.update(np.ascontiguousarray(network.D[:network.n_edges]).tobytes())
+        digest.update(repr(module_constants(common, constants)).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        """
+        :return: state vector stored for key, or None
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as entry:
+                y = entry["y"]
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return y
+
+    def put(self, key, y):
+        """
+        Store the state vector y for key and evict old entries.
+        """
+        path = self.path(key)
+        temp = "{}.{}.tmp.npz".format(path[:-4], os.getpid())
+        np.savez(temp, y=y)
+        os.replace(temp, path)
+        self.evict()
+
+    def entries(self):
+        """
+        :return: list of (modification time, size, path) of the entries, least recently used first
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz") and ".tmp" not in name:
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Remove the least recently used entries until within max_entries and max_bytes
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
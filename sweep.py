@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Run a scenario (e.g. main.main) for every combination of parameters, each in its own process.
+
+Usage:
+    from sweep import Sweep, parameter_grid
+    import main
+    grid = parameter_grid(new_gx=[0, 1], jkccup=[None, 1e-14], nrcomps=[7], textra=[15], say=['graphs/sweep_'])
+    sweep = Sweep(main.main, grid, "sweep_results", timeout=3600, processes=4)
+    results = sweep.run()
+"""
+import hashlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+
+# compartment variables stored for each task (as shown by main.print_concentrations)
+FINAL_VARIABLES = ("cli", "ki", "nai", "xi", "pkcc2", "gx", "w", "ecl", "V", "z")
+
+
+def parameter_grid(**values):
+    """
+    :param values: list of values of each parameter
+    :return: list of dictionaries of parameters, one for every combination of values
+    """
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+
+def task_id(params: dict):
+    """
+    :return: identifier of a task from its parameters (the same in every session)
+    """
+    return hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()[:16]
+
+
+def final_state(sim):
+    """
+    :return: dictionary of {compartment name: {variable: value}} for the compartments of sim
+    """
+    from compartment import Compartment
+    state = {}
+    for obj in sim.object_list():
+        if isinstance(obj, Compartment):
+            state[obj.name] = {var: obj[var] for var in FINAL_VARIABLES}
+    return state
+
+
+def traces(sim):
+    """
+    :return: dictionary of {line label: (x values, y values)} of every graph of sim's GUI (empty if it has none)
+    """
+    gui = sim.gui(create=False)
+    data = {}
+    if gui is None:
+        return data
+    for graph in gui.graphs():
+        data.update(graph.data())
+    return data
+
+
+def _save(record, path):
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        pickle.dump(record, f)
+    os.replace(temp, path)
+
+
+def _worker(function, params, workdir, result_path, directories):
+    """
+    Run function(**params) in workdir with a new Simulator and a headless GUI, and save a record of the outcome.
+    """
+    os.environ["MPLBACKEND"] = "Agg"
+    os.environ["MCMA_HEADLESS"] = "1"
+    os.chdir(workdir)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    log = open("log.txt", "w")
+    sys.stdout = sys.stderr = log
+    record = {"params": params, "status": "error"}
+    start = time.perf_counter()
+    try:
+        import simulator
+        value = function(**params)
+        sim = simulator.Simulator.get_instance()
+        record.update(status="done", final=final_state(sim), traces=traces(sim))
+        try:
+            pickle.dumps(value)
+        except Exception:
+            value = None
+        record["value"] = value
+    except BaseException:
+        record["error"] = traceback.format_exc()
+    record["time"] = time.perf_counter() - start
+    record["figures"] = sorted(os.path.join(workdir, root, name)
+                               for root, _, names in os.walk(".") for name in names
+                               if name != "log.txt" and not name.startswith("."))
+    log.flush()
+    _save(record, result_path)
+
+
+class Sweep(object):
+    """
+    Runs function(**params) for each params of a grid, each in a separate worker process (with its own Simulator and a
+    headless GUI) and in its own directory, so that figures saved with relative names do not overwrite each other.
+
+    The outcome of each task is stored in directory/<task id>/result.pickle as a dictionary with
+        params      the task's parameters
+        status      "done", "error" (an exception was raised), "crashed" (the worker died) or "timeout"
+        final       final values of FINAL_VARIABLES of every compartment (if done)
+        traces      recorded values of every graph (if done)
+        value       the return value of function, if it can be pickled
+        figures     files written by the task
+        error       traceback or reason (if not done)
+    Tasks that are already done are not run again, so an interrupted sweep is resumed by running it again.
+    """
+
+    def __init__(self, function, grid, directory, timeout=None, processes=None, directories=("graphs",),
+                 start_method="spawn"):
+        """
+        :param function: scenario to run, importable by the worker processes (i.e. defined at module level)
+        :param grid: list of dictionaries of parameters (see parameter_grid)
+        :param directory: where results are stored
+        :param timeout: longest time a task may take (in s) before it is stopped (default: no limit)
+        :param processes: number of tasks run at the same time (default: number of CPUs)
+        :param directories: directories created in each task's directory before it runs (e.g. for figures)
+        :param start_method: multiprocessing start method of the worker processes
+        """
+        self.function = function
+        self.grid = list(grid)
+        self.directory = os.path.abspath(directory)
+        self.timeout = timeout
+        self.processes = processes or os.cpu_count() or 1
+        self.directories = tuple(directories)
+        self.context = multiprocessing.get_context(start_method)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def task_directory(self, params):
+        return os.path.join(self.directory, task_id(params))
+
+    def result_path(self, params):
+        return os.path.join(self.task_directory(params), "result.pickle")
+
+    def record(self, params):
+        """
+        :return: stored outcome of the task with params, or None if it has not run
+        """
+        try:
+            with open(self.result_path(params), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def pending(self):
+        """
+        :return: parameters of the tasks that are not done
+        """
+        return [params for params in self.grid if (self.record(params) or {}).get("status") != "done"]
+
+    def __start(self, params):
+        workdir = self.task_directory(params)
+        os.makedirs(workdir, exist_ok=True)
+        result_path = self.result_path(params)
+        if os.path.exists(result_path):
+            os.remove(result_path)
+        process = self.context.Process(target=_worker, name=task_id(params),
+                                       args=(self.function, params, workdir, result_path, self.directories))
+        process.start()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        return process, deadline
+
+    def __fail(self, params, status, reason):
+        record = self.record(params) or {"params": params}
+        record.update(status=status, error=reason)
+        _save(record, self.result_path(params))
+
+    def run(self, verbose=True):
+        """
+        Run all tasks that are not done.
+
+        :param verbose: print progress
+        :return: list of the outcome of every task of the grid (see results)
+        """
+        pending = self.pending()
+        running = {}
+        total = len(pending)
+        finished = 0
+        while pending or running:
+            while pending and len(running) < self.processes:
+                params = pending.pop(0)
+                process, deadline = self.__start(params)
+                running[process.sentinel] = (params, process, deadline)
+            deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+            timeout = None if not deadlines else max(0.0, min(deadlines) - time.monotonic())
+            ready = wait(list(running), timeout=timeout)
+            now = time.monotonic()
+            for sentinel in list(running):
+                params, process, deadline = running[sentinel]
+                if sentinel in ready:
+                    process.join()
+                    record = self.record(params)
+                    if record is None:
+                        self.__fail(params, "crashed", "worker exited with code {}".format(process.exitcode))
+                elif deadline is not None and now >= deadline:
+                    process.terminate()
+                    process.join()
+                    self.__fail(params, "timeout", "stopped after {} s".format(self.timeout))
+                else:
+                    continue
+                del running[sentinel]
+                finished += 1
+                if verbose:
+                    print("[{}/{}] {} {}".format(finished, total, self.record(params)["status"], params))
+        return self.results()
+
+    def results(self):
+        """
+        :return: list of the outcome of every task of the grid, in grid order (None for tasks that have not run)
+        """
+        return [self.record(params) for params in self.grid]
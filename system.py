@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+"""
+import numpy as np
+from scipy import sparse
+from common import oso, \
+    gk, gna, gcl, \
+    ck, cna, \
+    pw, vw, km, \
+    RTF, RT
+
+# variables of each compartment integrated by a CompartmentSystem
+SYSTEM_FIELDS = ("nai", "ki", "cli", "xm", "xi_temp", "w", "pkcc2", "xz")
+
+
+class CompartmentSystem(object):
+    """
+    The compartments and diffusion network of a VectorEngine written as a system of ordinary differential equations
+        dy/dt = rhs(t, y)
+    so that it can be handed to any integrator.
+
+    The equations are those of Compartment.step, Compartment.update_values and Diffusion.step as dt -> 0:
+        - ions change by their membrane (leak, pump, KCC2) and diffusion fluxes
+        - volume changes by osmosis
+        - all intracellular concentrations are diluted by the change in volume (-c * dw/dt / w)
+        - length follows volume (radius is fixed)
+    jkccup and dz are increments per time step in Compartment.step, and so become the rates jkccup/dt and -dz/dt for
+    the time step dt of the run.
+    Parameters (gx, jkccup, dz, ...) are read from the state on every evaluation, so changes to them during a run take
+    effect immediately.
+
+    The species registered besides na, k and cl (see species.registry) are integrated as well: their charge is part of
+    V, their concentration part of the osmolarity, the permeant ones leak through the membrane and those with a
+    diffusion coefficient diffuse.
+
+    y holds one block of n values (one per compartment) for each variable in SYSTEM_FIELDS followed by the
+    intracellular concentrations of the extra species, in that order (see fields).
+    """
+
+    def __init__(self, engine, dt):
+        """
+        :param engine: VectorEngine with its compartments bound and diffusion network compiled
+        :param dt: time step that jkccup and dz are defined for (s)
+        """
+        self.state = engine.state
+        self.network = engine.network
+        self.n = self.state.n
+        self.dt = dt
+        self.species = self.state.species
+        # intracellular concentrations of the species besides na, k and cl
+        self.extra = self.species.names[self.species.n_core:]
+        self.fields = SYSTEM_FIELDS + self.extra
+
+    def __len__(self):
+        return len(self.fields) * self.n
+
+    def split(self, y):
+        """
+        :return: dictionary of {field: view of y for that field}
+        """
+        n = self.n
+        return {field: y[..., k * n:(k + 1) * n] for k, field in enumerate(self.fields)}
+
+    def pack(self):
+        """
+        :return: state vector y of the bound compartments
+        """
+        return np.concatenate([self.state[field] for field in self.fields])
+
+    def unpack(self, y):
+        """
+        Write the state vector y into the bound compartments and update the variables that depend on it
+        (xi, z, V, jp, ek, ecl, jkcc2, osi, L, absox).
+        """
+        s = self.state
+        for field, values in self.split(y).items():
+            s[field][:] = values
+        s["xi"][:] = s["xm"] + s["xi_temp"]
+        s["z"][:] = (s["xmz"] * s["xm"] + s["xz"] * s["xi_temp"]) / s["xi"]
+        s["V"][:] = s["FinvCAr"] * (s["nai"] + s["ki"] - s["cli"] + s["z"] * s["xi"] + self.extra_charge(s))
+        s["jp"][:] = s["p"] * (s["nai"] / s["nao"]) ** 3
+        s["ek"][:] = RTF * np.log(s["ko"] / s["ki"])
+        s["ecl"][:] = RTF * np.log(s["cli"] / s["clo"])
+        s["jkcc2"][:] = s["pkcc2"] * (s["ek"] - s["ecl"])
+        s["osi"][:] = s["nai"] + s["ki"] + s["cli"] + s["xi"] + sum(s[name] for name in self.extra)
+        s["w2"][:] = s["w"]
+        s["L"][:] = s["w"] / (np.pi * s["r"] ** 2)
+        s["absox"][:] = s["xi"] * s["w"]
+
+    def rhs(self, t, y):
+        """
+        :param t: time (s) (the system is autonomous)
+        :param y: state vector
+        :return: dy/dt
+        """
+        s = self.state
+        v = self.split(y)
+        nai, ki, cli, xm, xi_temp, w = v["nai"], v["ki"], v["cli"], v["xm"], v["xi_temp"], v["w"]
+        Ar = s["Ar"]
+        xi = xm + xi_temp
+        V = s["FinvCAr"] * (nai + ki - cli + s["xmz"] * xm + v["xz"] * xi_temp + self.extra_charge(v))
+        jp = s["p"] * (nai / s["nao"]) ** 3
+        ek = RTF * np.log(s["ko"] / ki)
+        ecl = RTF * np.log(cli / s["clo"])
+        jkcc2 = v["pkcc2"] * (ek - ecl)
+        # membrane fluxes (M/s)
+        dnai = -Ar * (gna * (V - RTF * np.log(s["nao"] / nai)) + cna * jp)
+        dki = -Ar * (gk * (V - ek) - ck * jp - jkcc2)
+        dcli = Ar * (gcl * (V - ecl) + jkcc2)
+        dxi = np.where(s["gx"] != 0, 6e-9 * Ar, 0)
+        rates = {"nai": dnai, "ki": dki, "cli": dcli, "xm": 0, "xi_temp": dxi}
+        # leak of the other permeant species through the membrane
+        sp = self.species
+        for k, name in enumerate(self.extra, sp.n_core):
+            if sp.g[k] != 0:
+                E = RTF / sp.z[k] * np.log(s[sp.outside[k]] / v[name])
+                rates[name] = -Ar * sp.g[k] * (V - E) / sp.z[k]
+            else:
+                rates[name] = 0
+        # diffusion
+        if self.network.n_edges:
+            L = w / (np.pi * s["r"] ** 2)
+            C = np.stack([v[ion] for ion in self.network.ions], axis=-1)
+            dC = self.network.rate(C, V, L)
+            for i, ion in enumerate(self.network.ions):
+                rates[ion] = rates[ion] + dC[:, i]
+        # volume
+        osi = nai + ki + cli + xi + sum(v[name] for name in self.extra)
+        dw = np.where(s["stretch_w"],
+                      vw * pw * s["sa"] * (osi - oso - 4 * km * np.pi * (1 - s["r1"] / s["r"]) / RT),
+                      vw * pw * s["sa"] * (osi - oso))
+        # concentrations are diluted by volume change
+        dilution = dw / w
+        return np.concatenate([rates[field] - v[field] * dilution for field in ("nai", "ki", "cli", "xm", "xi_temp")]
+                              + [dw, self.pkcc2_rate(), self.xz_rate()]
+                              + [rates[name] - v[name] * dilution for name in self.extra])
+
+    def extra_charge(self, v):
+        """
+        :param v: dictionary of the intracellular concentrations of the extra species (e.g. split(y) or the state)
+        :return: charge concentration of the species besides na, k and cl (M), 0 if there are none
+        """
+        sp = self.species
+        return sum(sp.z[k] * v[name] for k, name in enumerate(self.extra, sp.n_core))
+
+    def pkcc2_rate(self):
+        """
+        :return: rate of change of kcc2 strength (jkccup per time step, or 0 if jkccup is None)
+        """
+        jkccup = self.state["jkccup"]
+        return np.where(np.isnan(jkccup), 0, jkccup) / self.dt
+
+    def xz_rate(self):
+        """
+        :return: rate of change of impermeant charge (-dz per time step)
+        """
+        return -self.state["dz"] / self.dt
+
+    def jac_sparsity(self):
+        """
+        Variables of a compartment depend on all variables of that compartment and of the compartments it is connected
+        to by diffusion.
+
+        :return: sparsity structure of the Jacobian of rhs
+        """
+        if self.network.n_edges:
+            connected = (self.network.adjacency() + sparse.identity(self.n)).tocsr()
+        else:
+            connected = sparse.identity(self.n)
+        structure = sparse.kron(np.ones((len(self.fields), len(self.fields))), connected, format="csr")
+        structure.data[:] = 1
+        return structure
+
+    def scale(self, y):
+        """
+        Typical magnitude of each variable (the largest magnitude of its field, or 1 if the field is all zero).
+        Used for per-variable absolute tolerances.
+        """
+        scale = np.empty_like(y)
+        for field, values in self.split(y).items():
+            magnitude = np.max(np.abs(values)) if len(values) else 0
+            self.split(scale)[field][:] = magnitude if magnitude > 0 else 1.0
+        return scale
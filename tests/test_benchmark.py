@@ -0,0 +1,27 @@
+from unittest import TestCase
+import simulator
+import benchmark
+
+
+class TestBenchmark(TestCase):
+
+    def tearDown(self):
+        simulator.Simulator.dispose()
+        simulator.Simulator(False)
+
+    def test_run_case(self):
+        for engine in ("object", "vector"):
+            result = benchmark.run_case({"name": "chain", "model": (benchmark.build_chain, {"n": 3}),
+                                         "engine": engine, "ticks": 10, "collect_every": 5,
+                                         "collector": "recorder"}, repeat=1)
+            self.assertEqual(result["compartments"], 3)
+            self.assertEqual(result["edges"], 2)
+            self.assertGreater(result["ticks_per_s"], 0)
+
+    def test_compare(self):
+        baseline = [{"name": "a", "ticks_per_s": 100.0}, {"name": "b", "ticks_per_s": 100.0}]
+        results = [{"name": "a", "ticks_per_s": 90.0}, {"name": "b", "ticks_per_s": 50.0},
+                   {"name": "c", "ticks_per_s": 10.0}]
+        comparison = benchmark.compare(results, baseline, tolerance=0.25)
+        self.assertEqual([name for name, *_ in comparison], ["a", "b"])
+        self.assertEqual([regression for *_, regression in comparison], [False, True])
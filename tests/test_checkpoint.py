@@ -0,0 +1,68 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import numpy as np
+import simulator
+from checkpoint import CheckpointError
+from test_engine import build_dendrite
+
+
+class TestCheckpoint(TestCase):
+    variables = ["nai", "ki", "cli", "xi", "V", "w", "L", "pkcc2", "z", "jkccup"]
+
+    def setUp(self):
+        self.new_simulator()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "checkpoint.npz")
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+        shutil.rmtree(self.directory)
+
+    def values(self, comps):
+        return np.array([[np.nan if comp[var] is None else comp[var] for var in self.variables] for comp in comps])
+
+    def test_continue(self):
+        """
+        A run continued from a checkpoint in a new model is the same as the uninterrupted run
+        """
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            comps = build_dendrite(2)
+            comps[1].jkccup = None
+            self.sim.run(stop=0.0002, dt=1e-6, engine=engine, print_time=False, checkpoint_path=self.path)
+            self.sim.run(continuefor=0.0002, dt=1e-6, print_time=False)
+            expected = self.values(comps)
+            edge = [obj for obj in self.sim.object_list() if obj.name == "reference<-dendrite right 1"][0]
+            expected_jnet = dict(edge.ionjnet)
+
+            self.new_simulator()
+            comps = build_dendrite(2)
+            comps[0].gx = 0
+            self.sim.restore(self.path)
+            self.assertAlmostEqual(self.sim.time().time, 0.0002)
+            self.assertEqual(comps[0].gx, 1e-8)
+            self.sim.run(continuefor=0.0002, dt=1e-6, engine=engine, print_time=False)
+            np.testing.assert_array_equal(self.values(comps), expected)
+            edge = [obj for obj in self.sim.object_list() if obj.name == "reference<-dendrite right 1"][0]
+            self.assertDictEqual(edge.ionjnet, expected_jnet)
+
+    def test_periodic(self):
+        build_dendrite(1)
+        self.sim.run(stop=0.0005, dt=1e-6, checkpoint_path=self.path, checkpoint_interval=0.0002,
+                     solver="bdf", print_time=False)
+        with np.load(self.path) as checkpoint:
+            self.assertAlmostEqual(checkpoint["time"][0], 0.0005)
+
+    def test_different_model(self):
+        build_dendrite(2)
+        self.sim.checkpoint(self.path)
+        self.new_simulator()
+        build_dendrite(3)
+        with self.assertRaises(CheckpointError):
+            self.sim.restore(self.path)
@@ -0,0 +1,88 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+import simulator
+from colormap import Colormap
+from protocol import Protocol
+from test_engine import build_dendrite
+
+
+class TestColormap(TestCase):
+
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+        self.comps = build_dendrite(3)
+        self.colormap = Colormap("cmap", 0, self.comps)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.sim.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_image(self):
+        """
+        Bars of 30 rows, centred and as wide as the radii, between blank rows
+        """
+        image = self.colormap.image([0.001, 0.002], [50, 3], h=10)
+        self.assertEqual(image.shape, (63, 100))
+        np.testing.assert_array_equal(image[[0, 31, 62]], 10)
+        np.testing.assert_array_equal(image[1:31, 25:75], 1)
+        np.testing.assert_array_equal(image[1:31, :25], 10)
+        np.testing.assert_array_equal(image[1:31, 75:], 10)
+        np.testing.assert_array_equal(image[32:62, 48:51], 2)
+        np.testing.assert_array_equal(image[32:62, :48], 10)
+
+    def test_image_hts(self):
+        """
+        Bars as high as the heights between blank rows, padded to the total height
+        """
+        column = self.colormap.image_hts([0.001, 0.002], [2, 3], totalhts=7, h=5)[:, 0]
+        np.testing.assert_array_equal(column, [5, 5, 5, 1, 1, 5, 2, 2, 2, 5])
+        column = self.colormap.image_hts([0.001, 0.002], [2, 3], totalhts=3, h=5)[:, 0]
+        np.testing.assert_array_equal(column, [5, 1, 1, 5, 2, 2, 2, 5, 5, 5])
+
+    def test_figure_reused(self):
+        """
+        Headless, cmap draws in the same figure each time and saves it; only cmap titles it
+        """
+        path = os.path.join(self.directory, "cmap.png")
+        figure = self.colormap.cmap([0.001] * 3, [10, 20, 30], name=path)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(figure.axes[0].get_title(), path)
+        self.assertIs(self.colormap.cmap([0.001] * 5, [10, 20, 30, 40, 50]), figure)
+        self.assertIs(self.colormap.cmap_hts([0.001] * 2, [3, 4], 10, name=path), figure)
+        self.assertEqual(figure.axes[0].get_title(), "")
+        self.assertEqual(len(figure.axes[0].images), 1)
+
+    def test_figure_per_image(self):
+        """
+        Shown (not headless), each image is drawn in a new figure
+        """
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        with mock.patch.object(self.sim, "headless", return_value=False):
+            figures = [self.colormap.cmap([0.001] * 3, [10, 20, 30]) for _ in range(3)]
+        self.assertEqual(len({id(figure) for figure in figures}), 3)
+        for figure in figures:
+            plt.close(figure)
+
+    def test_frames(self):
+        """
+        Frames captured during a run are saved as images and an animation
+        """
+        protocol = self.colormap.capture_every(Protocol(), 0, 4e-6, 2e-6, var="ecl")
+        self.sim.run(stop=5e-6, dt=1e-6, print_time=False, protocol=protocol)
+        self.assertEqual(len(self.colormap.frames), 3)
+        np.testing.assert_allclose(self.colormap.frame_times, [0, 2e-6, 4e-6])
+        self.assertEqual(self.colormap.frames[0].shape, (1 + 31 * len(self.comps), 100))
+        names = self.colormap.save_frames(os.path.join(self.directory, "frame{index}.png"), r=-100, h=0)
+        self.assertEqual([os.path.basename(name) for name in names], ["frame0.png", "frame1.png", "frame2.png"])
+        for name in names:
+            self.assertTrue(os.path.exists(name))
+        path = self.colormap.save_animation(os.path.join(self.directory, "frames.gif"), r=-100, h=0)
+        self.assertGreater(os.path.getsize(path), 0)
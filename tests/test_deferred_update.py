@@ -0,0 +1,139 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from deferred_update import DeferredUpdateBuffer, UpdateType
+from test_engine import build_dendrite
+
+
+class Obj(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getitem__(self, item):
+        return self.__dict__[item]
+
+    def __setitem__(self, key, value):
+        self.__dict__[key] = value
+
+
+class TestDeferredUpdateBuffer(TestCase):
+    def setUp(self):
+        self.buffer = DeferredUpdateBuffer(capacity=2)
+
+    def test_change(self):
+        a = Obj(x=1.0, y=2.0)
+        b = Obj(x=10.0)
+        self.buffer.change(a, "x", 0.5)
+        self.buffer.change(b, "x", 1.0)
+        self.buffer.change(a, "x", 0.25)
+        self.buffer.add(a, "y", -1.0, UpdateType.CHANGE)
+        # nothing changes until applied
+        self.assertEqual(a.x, 1.0)
+        self.assertTrue(self.buffer.pending)
+        self.buffer.apply()
+        self.assertEqual(a.x, 1.75)
+        self.assertEqual(a.y, 1.0)
+        self.assertEqual(b.x, 11.0)
+        self.assertFalse(self.buffer.pending)
+        # deltas are cleared after being applied
+        self.buffer.apply()
+        self.assertEqual(a.x, 1.75)
+
+    def test_growth(self):
+        objs = [Obj(x=0.0) for i in range(9)]
+        for i, obj in enumerate(objs):
+            self.buffer.change(obj, "x", i)
+        self.buffer.apply()
+        for i, obj in enumerate(objs):
+            self.buffer.change(obj, "x", i)
+        self.buffer.apply()
+        self.assertListEqual([obj.x for obj in objs], [2.0 * i for i in range(9)])
+
+    def test_order(self):
+        """
+        CHANGE updates are applied before SET updates, which are applied before FUNCTION updates
+        """
+        a = Obj(x=1.0, y=0.0)
+        calls = []
+        self.buffer.function(lambda: calls.append(("first", a.x, a.y)))
+        self.buffer.set(a, "y", 5.0)
+        self.buffer.change(a, "x", 1.0)
+        self.buffer.add(None, None, lambda: calls.append(("second", a.x, a.y)), UpdateType.FUNCTION)
+        for i in range(3):
+            self.buffer.function(lambda: calls.append(("extra", a.x, a.y)))
+        self.buffer.apply()
+        self.assertEqual(calls[0], ("first", 2.0, 5.0))
+        self.assertEqual(calls[1], ("second", 2.0, 5.0))
+        self.assertEqual(len(calls), 5)
+
+    def test_method(self):
+        """
+        A method deferred as the function of its class is called with its object, in order with other functions
+        """
+        a = Obj(x=1.0)
+        calls = []
+        self.buffer.function(lambda: calls.append("function"))
+        self.buffer.method(a, lambda obj: calls.append(obj.x))
+        self.buffer.change(a, "x", 1.0)
+        self.buffer.apply()
+        self.assertEqual(calls, ["function", 2.0])
+
+    def test_ordered(self):
+        """
+        With ordered, updates are applied in the order they were deferred
+        """
+        buffer = DeferredUpdateBuffer(ordered=True)
+        a = Obj(x=1.0, y=0.0)
+        calls = []
+        buffer.function(lambda: calls.append(("first", a.x, a.y)))
+        buffer.set(a, "y", 5.0)
+        buffer.change(a, "x", 1.0)
+        buffer.method(a, lambda obj: calls.append(("second", obj.x, obj.y)))
+        buffer.change(a, "x", 1.0)
+        self.assertEqual(buffer.count(), 5)
+        buffer.apply()
+        self.assertEqual(calls, [("first", 1.0, 0.0), ("second", 2.0, 5.0)])
+        self.assertEqual(a.x, 3.0)
+        self.assertFalse(buffer.pending)
+
+    def test_clear(self):
+        a = Obj(x=1.0)
+        self.buffer.change(a, "x", 1.0)
+        self.buffer.set(a, "x", 3.0)
+        self.buffer.clear()
+        self.buffer.apply()
+        self.assertEqual(a.x, 1.0)
+
+    def test_reset(self):
+        a = Obj(x=1.0)
+        self.buffer.change(a, "x", 1.0)
+        # pending updates are not lost
+        self.buffer.reset()
+        self.assertEqual(a.x, 2.0)
+        self.buffer.change(a, "x", 1.0)
+        self.buffer.apply()
+        self.assertEqual(a.x, 3.0)
+
+
+class TestUpdateOrder(TestCase):
+
+    def tearDown(self):
+        simulator.Simulator.dispose()
+
+    def run_model(self, ordered_updates):
+        simulator.Simulator.dispose()
+        sim = simulator.Simulator(False, ordered_updates=ordered_updates)
+        comps = build_dendrite(3)
+        comps[0].cli *= 1.1
+        sim.run(stop=1e-3, dt=1e-6, engine="object", print_time=False)
+        return np.array([[comp[var] for var in ("nai", "ki", "cli", "V", "w")] for comp in comps])
+
+    def test_grouped(self):
+        """
+        Applying diffusion changes before rather than after update_values (see DeferredUpdateBuffer) only corrects
+        them for the volume change of the time step, which is small
+        """
+        grouped = self.run_model(False)
+        ordered = self.run_model(True)
+        self.assertFalse(np.array_equal(grouped, ordered))
+        np.testing.assert_allclose(grouped, ordered, rtol=1e-7)
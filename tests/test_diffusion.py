@@ -6,15 +6,78 @@ from common import default_length
 from tests.slow_increase import slow_increase
 
 
+def diffusion_ions():
+    """
+    :return: diffusion coefficients of all ions (dm2/s)
+    """
+    cli_D = 2.03
+    cli_D *= 1e-7  # um2 to dm2 (D in dm2/s)
+    ki_D = 1.96
+    ki_D *= 1e-7  # um2 to dm2 (D in dm2/s)
+    nai_D = 1.33
+    nai_D *= 1e-7
+    return {'cli': cli_D, 'ki': ki_D, 'nai': nai_D}
+
+
+def two_compartments(compartment=Compartment):
+    """
+    :return: two equal compartments (not connected)
+    """
+    comp = compartment("c1", pkcc2=0, z=-0.85,
+                       cli=0.005175478364339566, ki=0.111358641523315191, nai=0.025519187764070129)
+    comp2 = comp.copy("c2")
+    # get a reasonable negative voltage (V=--0.06892)
+    comp.cli += 2e-7
+    comp2.cli += 2e-7
+    return comp, comp2
+
+
+def one_is_two():
+    """
+    :return: a compartment, and two compartments of half its length connected by diffusion of all ions
+    """
+    comp_base = Compartment("c1", length=10e-5, pkcc2=0, z=-0.85,
+                            cli=0.015292947537423218,
+                            ki=0.023836660428807395,
+                            nai=0.1135388427892471)
+
+    comp = Compartment("c1", length=5e-5, pkcc2=0, z=-0.85,
+                       cli=0.015292947537423218,
+                       ki=0.023836660428807395,
+                       nai=0.1135388427892471)
+    comp2 = comp.copy("c2")
+    # create diffusion connection
+    Diffusion(comp, comp2, ions=diffusion_ions())
+    return comp_base, comp, comp2
+
+
+def three_and_single(compartment=Compartment):
+    """
+    :return: a compartment with two others connected to it by diffusion of all ions, and a single compartment of
+    their total length
+    """
+    comp_base = compartment("c1", pkcc2=1e-8, z=-0.85,
+                            cli=0.015292947537423218,
+                            ki=0.023836660428807395,
+                            nai=0.1135388427892471)
+
+    comp = comp_base.copy("left")
+    comp2 = comp.copy("right")
+    comp_single = compartment("cs", pkcc2=1e-8, z=-0.85,
+                              cli=0.015292947537423218,
+                              ki=0.023836660428807395,
+                              nai=0.1135388427892471,
+                              length=3 * default_length)
+    # create diffusion connection
+    Diffusion(comp, comp_base, ions=diffusion_ions())
+    Diffusion(comp2, comp_base, ions=diffusion_ions())
+    return comp_base, comp, comp2, comp_single
+
+
 class TestDiffusion(TestCase):
     def setUp(self):
         self.sim = simulator.Simulator.get_instance()
-        self.comp = SimpleCompartment("c1", pkcc2=0, z=-0.85,
-                                      cli=0.005175478364339566, ki=0.111358641523315191, nai=0.025519187764070129)
-        self.comp2 = self.comp.copy("c2")
-        # get a reasonable negative voltage (V=--0.06892)
-        self.comp.cli += 2e-7
-        self.comp2.cli += 2e-7
+        self.comp, self.comp2 = two_compartments(SimpleCompartment)
         self.ion = "cli"
         D = 1  # == 10-5 * cm2/s
         self.D = D * 1e-7  # um2 to dm2 (D in dm2/s)
@@ -106,25 +169,7 @@ class TestDiffusion(TestCase):
         """
         Changing to the same values of all (2) compartments is the same as changing as if it were compartment
         """
-        self.compBase = Compartment("c1", length=10e-5, pkcc2=0, z=-0.85,
-                                    cli=0.015292947537423218,
-                                    ki=0.023836660428807395,
-                                    nai=0.1135388427892471)
-
-        self.comp = Compartment("c1", length=5e-5, pkcc2=0, z=-0.85,
-                                cli=0.015292947537423218,
-                                ki=0.023836660428807395,
-                                nai=0.1135388427892471)
-        self.comp2 = self.comp.copy("c2")
-        # set diffusion value
-        cli_D = 2.03
-        cli_D *= 1e-7  # um2 to dm2 (D in dm2/s)
-        ki_D = 1.96
-        ki_D *= 1e-7  # um2 to dm2 (D in dm2/s)
-        nai_D = 1.33
-        nai_D *= 1e-7
-        # create diffusion connection
-        diffusion_object = Diffusion(self.comp, self.comp2, ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})
+        self.compBase, self.comp, self.comp2 = one_is_two()
 
         self.assertEqual(self.compBase.cli, self.comp.cli)
 
@@ -149,16 +194,9 @@ class TestDiffusion(TestCase):
         self.comp = self.compBase.copy("left")
         self.comp2 = self.comp.copy("right")
 
-        # set diffusion value
-        cli_D = 2.03
-        cli_D *= 1e-7  # um2 to dm2 (D in dm2/ss)
-        ki_D = 1.96
-        ki_D *= 1e-7  # um2 to dm2 (D in dm2/s)
-        nai_D = 1.33
-        nai_D *= 1e-7
         # create diffusion connection
-        diffusion_object = Diffusion(self.comp, self.comp2, ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})
-        diffusion_object = Diffusion(self.comp2, self.compBase, ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})
+        Diffusion(self.comp, self.comp2, ions=diffusion_ions())
+        Diffusion(self.comp2, self.compBase, ions=diffusion_ions())
 
         self.sim.run(stop=100, dt=0.001, block_after=False)
 
@@ -171,28 +209,7 @@ class TestDiffusion(TestCase):
         self.assertEqual(self.comp.cli, self.comp2.cli)
 
     def test_mols(self):
-        self.compBase = SimpleCompartment("c1", pkcc2=1e-8, z=-0.85,
-                                          cli=0.015292947537423218,
-                                          ki=0.023836660428807395,
-                                          nai=0.1135388427892471)
-
-        self.comp = self.compBase.copy("left")
-        self.comp2 = self.comp.copy("right")
-        self.compSingle = SimpleCompartment("cs", pkcc2=1e-8, z=-0.85,
-                                            cli=0.015292947537423218,
-                                            ki=0.023836660428807395,
-                                            nai=0.1135388427892471,
-                                            length=3 * default_length)
-        # set diffusion value
-        cli_D = 2.03
-        cli_D *= 1e-7  # um2 to dm2 (D in dm2/s)
-        ki_D = 1.96
-        ki_D *= 1e-7  # um2 to dm2 (D in dm2/s)
-        nai_D = 1.33
-        nai_D *= 1e-7
-        # create diffusion connection
-        diffusion_object = Diffusion(self.comp, self.compBase, ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})
-        diffusion_object = Diffusion(self.comp2, self.compBase, ions={'cli': cli_D, 'ki': ki_D, 'nai': nai_D})
+        self.compBase, self.comp, self.comp2, self.compSingle = three_and_single(SimpleCompartment)
 
         self.sim.run(stop=100, dt=0.001, block_after=False)
 
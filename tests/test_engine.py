@@ -0,0 +1,134 @@
+from unittest import TestCase
+from copy import deepcopy
+import numpy as np
+import simulator
+from compartment import Compartment
+from diffusion import Diffusion
+from engine import CompartmentView
+
+
+def build_dendrite(nrcomps=3):
+    """
+    Reference compartment with copies either side connected by Diffusion (as in main.main)
+    """
+    comp = Compartment("reference", z=-0.85, cli=0.0052, ki=0.0123, nai=0.014, length=10e-5, radius=0.5e-5)
+    comps = [comp] + [comp.copy("dendrite right " + str(i + 1)) for i in range(nrcomps)]
+    comp.gx = 1e-8
+    comp.jkccup = 1e-14
+    comp.dz = 1e-9
+    for comp_a, comp_b in zip(comps[:-1], comps[1:]):
+        Diffusion(comp_a, comp_b, ions={'cli': 2.03e-7, 'ki': 1.96e-7, 'nai': 1.33e-7})
+    return comps
+
+
+class TestVectorEngine(TestCase):
+    variables = ["nai", "ki", "cli", "xi", "V", "w", "L", "pkcc2", "z", "ecl", "ek"]
+
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def run_model(self, engine):
+        self.setUp()
+        comps = build_dendrite()
+        self.sim.run(stop=0.001, dt=1e-6, engine=engine, print_time=False)
+        return np.array([[comp[var] for var in self.variables] for comp in comps])
+
+    def test_same_as_object(self):
+        object_values = self.run_model("object")
+        vector_values = self.run_model("vector")
+        np.testing.assert_allclose(vector_values, object_values, rtol=1e-12)
+
+    def test_views(self):
+        comps = build_dendrite()
+        self.sim.run(stop=1e-5, dt=1e-6, engine="vector", print_time=False)
+        comp = comps[0]
+        state = self.sim.engine().state
+        self.assertIsInstance(comp, CompartmentView)
+        self.assertIsInstance(comp, Compartment)
+        self.assertEqual(comp["cli"], state["cli"][comp._index])
+        # attribute changes are seen by the arrays
+        comp.gx = 0
+        self.assertEqual(state["gx"][comp._index], 0)
+        comp["cli"] += 1e-3
+        self.assertEqual(state["cli"][comp._index], comp.cli)
+        self.assertIsNotNone(comp.jkccup)
+        comp.jkccup = None
+        self.assertIsNone(comp.jkccup)
+        # copies are plain compartments
+        copied = deepcopy(comp)
+        self.assertNotIsInstance(copied, CompartmentView)
+        self.assertEqual(copied.cli, comp.cli)
+        values = {var: comp[var] for var in self.variables}
+        # back to plain compartments
+        self.sim.use_engine("object")
+        self.assertNotIsInstance(comp, CompartmentView)
+        self.assertIs(type(comp), Compartment)
+        for var, value in values.items():
+            self.assertEqual(comp.__dict__[var], value)
+
+    def test_new_compartment(self):
+        comps = build_dendrite(1)
+        self.sim.run(stop=1e-5, dt=1e-6, engine="vector", print_time=False)
+        comp = comps[-1].copy("new")
+        self.assertNotIsInstance(comp, CompartmentView)
+        self.sim.run(continuefor=1e-5, dt=1e-6, print_time=False)
+        self.assertIsInstance(comp, CompartmentView)
+        self.assertEqual(len(self.sim.engine().state), 3)
+
+
+class TestDiffusionNetwork(TestCase):
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_flux(self):
+        """
+        Network fluxes are those of each Diffusion's Fick's and Ohm's laws, including for a branching morphology.
+        """
+        comps = build_dendrite(3)
+        branch = comps[1].copy("branch")
+        branch.cli *= 1.1
+        branch.L *= 2
+        edges = [obj for obj in self.sim.object_list() if isinstance(obj, Diffusion)]
+        edges.append(Diffusion(comps[1], branch, ions={'cli': 2.03e-7, 'ki': 1.96e-7}))
+        for comp in comps:
+            comp.step(self.sim.time())
+        branch.step(self.sim.time())
+        expected = [[diffusion.ficks_law(ion, D) + diffusion.ohms_law(ion, D) / 2
+                     for ion, D in diffusion.ions.items()] for diffusion in edges]
+        self.sim.dispose()
+        self.sim = simulator.Simulator(False)
+        self.sim.use_engine("vector")
+        for obj in comps + [branch] + edges:
+            self.sim.register_compartment(obj)
+        step_list = self.sim.engine().object_list(self.sim.object_list(), self.sim._Simulator__update_list)
+        network = self.sim.engine().network
+        self.assertListEqual(step_list, [self.sim.engine(), network])
+        self.assertEqual(network.n_edges, len(edges))
+        flux = network.flux()
+        for e, diffusion in enumerate(edges):
+            for i, ion in enumerate(diffusion.ions):
+                self.assertAlmostEqual(flux[e, network.ions.index(ion)], expected[e][i], delta=1e-15)
+        # the branch edge does not carry sodium
+        self.assertEqual(flux[-1, network.ions.index("nai")], 0)
+
+    def test_subclass_not_in_network(self):
+        comps = build_dendrite(1)
+
+        class NoDriftDiffusion(Diffusion):
+            def ohms_law(self, ion, D=None):
+                return 0
+
+        edge = NoDriftDiffusion(comps[0], comps[1], ions={'cli': 2.03e-7})
+        self.sim.run(stop=1e-5, dt=1e-6, engine="vector", print_time=False)
+        network = self.sim.engine().network
+        self.assertNotIn(edge, network.edges)
+        self.assertIsNone(network.row(edge))
+        self.assertEqual(network.n_edges, 1)
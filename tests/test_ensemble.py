@@ -0,0 +1,78 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from ensemble import Ensemble
+from test_engine import build_dendrite
+
+
+class TestEnsemble(TestCase):
+    variables = ["nai", "ki", "cli", "V", "w"]
+    gx = [0, 1e-8, 2e-8]
+    D = [2.03e-7, 1e-7, 4e-7]
+
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_same_as_separate_runs(self):
+        """
+        Each member follows the same trajectory as the model run on its own with that member's parameters
+        """
+        comps = build_dendrite(2)
+        ensemble = Ensemble(3, variables=self.variables, data_collect_interval=1e-4)
+        ensemble.set("gx", self.gx, comps[0])
+        ensemble.set_diffusion("cli", self.D)
+        ensemble.run(stop=1e-3, dt=1e-6, print_time=False)
+        self.assertEqual(len(ensemble.times), 10)
+        for m in range(3):
+            self.setUp()
+            comps = build_dendrite(2)
+            comps[0].gx = self.gx[m]
+            for obj in self.sim.object_list():
+                if hasattr(obj, "ions"):
+                    obj.ions["cli"] = self.D[m]
+            expected = []
+
+            class Probe(simulator.sim_time.TimeMixin):
+                def step(self, _time=None):
+                    if not expected or expected[-1][0] != _time.time:
+                        expected.append((_time.time, [[comp[var] for comp in comps] for var in TestEnsemble.variables]))
+
+            self.sim.register_compartment(Probe())
+            self.sim.run(stop=1e-3, dt=1e-6, engine="vector", print_time=False)
+            for i, var in enumerate(self.variables):
+                np.testing.assert_allclose(ensemble[var][m], [comp[var] for comp in comps], rtol=1e-12)
+                samples = [values[i] for t, values in expected if np.any(np.isclose(t, ensemble.times, rtol=0, atol=1e-9))]
+                np.testing.assert_allclose(ensemble.traces(var)[m], samples, rtol=1e-12)
+
+    def test_shapes(self):
+        build_dendrite(1)
+        ensemble = Ensemble(4, data_collect_interval=2e-6)
+        self.assertEqual(ensemble["cli"].shape, (4, 2))
+        ensemble.set("cli", np.full((4, 2), 0.006))
+        ensemble.run(stop=1e-5, dt=1e-6, print_time=False)
+        self.assertEqual(ensemble.traces("cli").shape, (4, 5, 2))
+        self.assertEqual(len(self.sim.engine().state), 8)
+        self.assertEqual(self.sim.engine().network.n_edges, 4)
+
+    def test_compartments_moved(self):
+        """
+        Values are read from the compartments themselves after compartments are removed and added (keeping the number
+        bound, but moving some in the engine's arrays)
+        """
+        from topology import Topology
+        comps = build_dendrite(1)
+        ensemble = Ensemble(2)
+        ensemble.set("cli", [0.005, 0.006])
+        ensemble.run(stop=1e-6, dt=1e-6, print_time=False)
+        np.testing.assert_array_equal(ensemble["cli"][:, 0], [comps[0].cli, ensemble.compartments[1][0].cli])
+        topology = Topology()
+        topology.remove(comps[0])
+        topology.split(comps[1], fraction=0.5, ions={'cli': 2.03e-7})
+        self.sim.run(continuefor=1e-6, dt=1e-6, print_time=False)
+        self.assertEqual(len(self.sim.engine().state), 4)
+        np.testing.assert_array_equal(ensemble["cli"], [[comp.cli for comp in members]
+                                                        for members in ensemble.compartments])
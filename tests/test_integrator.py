@@ -0,0 +1,126 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from common import F
+from diffusion import Diffusion
+from species import registry
+from system import CompartmentSystem
+from integrator import ImplicitIntegrator, AdaptiveIntegrator, sample_grid
+from test_engine import build_dendrite
+
+
+class TestCompartmentSystem(TestCase):
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+        self.comps = build_dendrite(3)
+        self.sim.use_engine("vector")
+        self.engine = self.sim.engine()
+        self.engine.object_list(self.sim.object_list(), self.sim._Simulator__update_list)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_rhs_is_euler_step(self):
+        """
+        One time step of the engine is a forward Euler step of the system
+        """
+        dt = 1e-9
+        self.sim.time().stepsize(dt)
+        system = CompartmentSystem(self.engine, dt)
+        y0 = system.pack()
+        expected = system.rhs(0, y0)
+        self.engine.step(self.sim.time())
+        self.engine.network.step(self.sim.time())
+        self.sim._Simulator__update_list.apply()
+        rate = (system.pack() - y0) / dt
+        np.testing.assert_allclose(rate, expected, rtol=1e-4, atol=1e-9 * np.max(np.abs(expected)))
+
+    def test_implicit_integrator(self):
+        """
+        BDF and Radau agree with a fine forward Euler integration of the system
+        """
+        dt = 1e-6
+        stop = 0.005
+        system = CompartmentSystem(self.engine, dt)
+        y0 = system.pack()
+        y = y0.copy()
+        for i in range(int(round(stop / dt))):
+            y += dt * system.rhs(i * dt, y)
+        for method in ("bdf", "radau"):
+            samples = []
+            result = ImplicitIntegrator(system, method, rtol=1e-8, atol=1e-10).integrate(
+                0, stop, sample_grid(0, stop, 0.001), lambda t, _y: samples.append(t))
+            np.testing.assert_allclose(result, y, rtol=1e-5)
+            np.testing.assert_allclose(samples, [0, 0.001, 0.002, 0.003, 0.004])
+            np.testing.assert_array_equal(system.pack(), y0)
+
+    def test_run(self):
+        for solver in ("bdf", "rk45"):
+            self.sim.run(stop=0.01, dt=1e-6, solver=solver, data_collect_interval=0.001, print_time=False)
+        self.assertAlmostEqual(self.sim.time().time, 0.01)
+        self.assertTrue(np.all(np.isfinite(self.engine.state["cli"])))
+        self.assertNotEqual(self.comps[0].cli, 0.0052)
+
+    def test_extra_species(self):
+        """
+        Species registered besides na, k and cl are variables of the system: their charge is part of V, and they cross
+        the membrane (if permeant) and diffuse as in a step of the engine
+        """
+        registry.register("hco3", z=-1, inside=15e-3, out=25e-3, g=0.2e-3 / F, D=1.18e-7)
+        registry.register("y", z=-1, inside=1e-3, D=1e-7)
+        try:
+            self.setUp()
+            self.comps[0].yi = 2e-3
+            # (osmolarity is otherwise only updated at the end of a step)
+            self.comps[0].osi += 1e-3
+            Diffusion(self.comps[-1], self.comps[0])
+            self.sim.use_engine("vector")
+            self.engine = self.sim.engine()
+            self.engine.object_list(self.sim.object_list(), self.sim._Simulator__update_list)
+            self.assertEqual(CompartmentSystem(self.engine, 1e-9).fields[-2:], ("hco3i", "yi"))
+            self.test_rhs_is_euler_step()
+            system = CompartmentSystem(self.engine, 1e-9)
+            self.engine.update_voltage()
+            V = self.engine.state["V"].copy()
+            system.unpack(system.pack())
+            np.testing.assert_allclose(self.engine.state["V"], V, atol=1e-12 * np.max(np.abs(V)))
+            self.sim.run(stop=0.001, dt=1e-6, solver="bdf", print_time=False)
+            self.assertTrue(np.all(np.isfinite(self.engine.state["hco3i"])))
+            self.assertLess(self.comps[0].yi, 2e-3)
+        finally:
+            registry.unregister("hco3")
+            registry.unregister("y")
+
+    def test_run_unsupported(self):
+        class NoDriftDiffusion(Diffusion):
+            def ohms_law(self, ion, D=None):
+                return 0
+
+        NoDriftDiffusion(self.comps[0], self.comps[1], ions={'cli': 2.03e-7})
+        with self.assertRaises(TypeError):
+            self.sim.run(stop=0.01, dt=1e-6, solver="bdf", print_time=False)
+
+    def test_adaptive_integrator(self):
+        """
+        Dormand-Prince agrees with BDF, samples at the requested times and sees parameter changes made in callbacks
+        """
+        dt = 1e-6
+        stop = 0.005
+        system = CompartmentSystem(self.engine, dt)
+        expected = ImplicitIntegrator(system, rtol=1e-10, atol=1e-12).integrate(0, stop)
+        samples = []
+        method = AdaptiveIntegrator(system, rtol=1e-8, atol=1e-10)
+        result = method.integrate(0, stop, sample_grid(0, stop, 0.0015), lambda t, y: samples.append(t))
+        np.testing.assert_allclose(result, expected, rtol=1e-5)
+        np.testing.assert_allclose(samples, [0, 0.0015, 0.003, 0.0045])
+        self.assertGreater(method.stats["accepted steps"], 0)
+        self.assertIn("rejected steps", method.stats)
+
+        def switch_on(t, y):
+            if t > 0:
+                self.engine.state["gx"][:] = 1e-8
+
+        switched = AdaptiveIntegrator(system, rtol=1e-8, atol=1e-10).integrate(0, stop, [0.001], switch_on)
+        xi_temp = system.split(switched)["xi_temp"]
+        self.assertTrue(np.all(xi_temp[1:] > system.split(result)["xi_temp"][1:]))
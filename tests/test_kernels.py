@@ -0,0 +1,98 @@
+from unittest import TestCase, skipUnless
+import numpy as np
+import simulator
+import kernels
+from diffusion import Diffusion
+from protocol import Protocol
+from test_engine import build_dendrite
+from test_diffusion import two_compartments, one_is_two, three_and_single
+
+
+def connected():
+    """
+    The two compartments of test_diffusion connected by diffusion of cli, the first with more cli
+    """
+    comps = two_compartments()
+    comps[0].cli += 1e-3
+    Diffusion(*comps, {"cli": 1e-7})
+    return comps
+
+
+def increase(comps):
+    """
+    Slow increase of cli in the first compartment over the run, as in test_diffusion.run_diffusion (see slow_increase)
+    """
+    return Protocol().ramp(0, 0.002, comps[0], "cli", by=1e-3, interval=1e-5)
+
+
+def halves():
+    """
+    The compartments of test_diffusion.test_one_is_two, with a change of gx
+    """
+    comps = one_is_two()
+    for comp in comps:
+        comp.gx = 1e-8
+    return comps
+
+
+def middle():
+    """
+    The compartments of test_diffusion.test_mols with the middle one changed
+    """
+    comp_base, comp, comp2, single = comps = three_and_single()
+    comp_base.gx = single.gx = 1e-8
+    comp_base.jkccup = 1e-14
+    comp2.stretch_w = True
+    return comps
+
+
+class TestKernels(TestCase):
+    """
+    The scenarios of test_diffusion that the vector engine advances (with Compartment and Diffusion: its subclasses
+    SimpleCompartment, FickDiffusion and OhmDiffusion are stepped individually whatever the backend), and a dendrite
+    """
+    variables = ["nai", "ki", "cli", "xi", "V", "w", "L", "pkcc2", "z", "ecl", "ek", "osi"]
+    # (model, function of its compartments giving a protocol of the run)
+    scenarios = [(connected, None), (connected, increase), (halves, None), (middle, None),
+                 (build_dendrite, None)]
+
+    def tearDown(self):
+        simulator.Simulator.dispose()
+
+    def run_model(self, model, backend, protocol=None, stop=0.002):
+        simulator.Simulator.dispose()
+        sim = simulator.Simulator(False)
+        comps = model()
+        sim.use_engine("vector", backend=backend)
+        sim.run(stop=stop, dt=1e-6, print_time=False, protocol=None if protocol is None else protocol(comps))
+        jnet = [dict(obj.ionjnet) for obj in sim.object_list() if isinstance(obj, Diffusion)]
+        return np.array([[comp[var] for var in self.variables] for comp in comps]), jnet
+
+    def assert_same_as_numpy(self, backend):
+        for model, protocol in self.scenarios:
+            expected, expected_jnet = self.run_model(model, "numpy", protocol)
+            values, jnet = self.run_model(model, backend, protocol)
+            np.testing.assert_allclose(values, expected, rtol=1e-10, err_msg=model.__name__)
+            for edge, expected_edge in zip(jnet, expected_jnet):
+                for ion in edge:
+                    self.assertAlmostEqual(edge[ion], expected_edge[ion], delta=1e-10 * abs(expected_edge[ion]))
+
+    def test_loop_same_as_numpy(self):
+        """
+        The loops of the kernels (run by the interpreter) give the same results as the NumPy array operations
+        """
+        self.assert_same_as_numpy("loop")
+
+    @skipUnless(kernels.numba, "numba is not installed")
+    def test_jit_same_as_numpy(self):
+        """
+        The loops as compiled by Numba give the same results as the NumPy array operations
+        """
+        self.assertTrue(kernels.kernels("jit").compiled)
+        self.assert_same_as_numpy("jit")
+
+    def test_backend(self):
+        self.assertIsNone(kernels.kernels("numpy"))
+        self.assertFalse(kernels.kernels("loop").compiled)
+        with self.assertRaises(ValueError):
+            kernels.kernels("fortran")
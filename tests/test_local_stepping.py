@@ -0,0 +1,102 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from local_stepping import LocalTimeStepping
+from splitting import final_values
+from test_engine import build_dendrite
+
+
+def build_perturbed(nrcomps=20):
+    """
+    Dendrite of build_dendrite with more potassium chloride in the reference compartment, which spreads along it
+    """
+    comps = build_dendrite(nrcomps)
+    comps[0].cli *= 1.1
+    comps[0].ki *= 1.1
+    return comps
+
+
+class TestLocalTimeStepping(TestCase):
+
+    def setUp(self):
+        self.new_simulator()
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            LocalTimeStepping(levels=0)
+        with self.assertRaises(ValueError):
+            LocalTimeStepping(tolerance=0)
+        build_dendrite(3)
+        with self.assertRaises(ValueError):
+            self.sim.run(stop=1e-5, dt=1e-6, solver="local", levels=0, print_time=False)
+
+    def test_one_level(self):
+        """
+        With one level, every compartment and edge is stepped every tick, as with forward Euler
+        """
+        values = []
+        for solver in ("euler", "local"):
+            self.new_simulator()
+            build_dendrite(3)
+            self.sim.run(stop=1e-4, dt=1e-6, engine="vector", solver=solver, levels=1, print_time=False)
+            values.append(final_values(self.sim, ("nai", "ki", "cli", "V", "w")))
+        np.testing.assert_allclose(values[1], values[0], rtol=1e-12)
+
+    def test_levels(self):
+        """
+        Compartments are grouped by their rate of change, with levels of neighbours differing by one at most
+        """
+        comps = build_dendrite(6)
+        self.sim.run(stop=1e-6, dt=1e-6, engine="vector", print_time=False)
+        engine = self.sim.engine()
+        local = LocalTimeStepping(levels=4, tolerance=1e-6)
+        local.bind(engine, [])
+        local.regroup()
+        self.assertEqual(local.level.tolist(), [0] * 7)
+        comps[0].cli *= 1 + 1e-3
+        local.regroup()
+        self.assertEqual(local.level.tolist(), [0, 1, 2, 3, 3, 3, 3])
+
+    def test_edges_conservative(self):
+        """
+        Diffusion along some of the edges only changes their compartments, and conserves the amount of each ion
+        """
+        comps = build_perturbed(6)
+        comps[5].cli *= 1.05
+        self.sim.run(stop=1e-6, dt=1e-6, engine="vector", print_time=False)
+        engine = self.sim.engine()
+        network = engine.network
+        rows = np.array([0, 1, 4])
+        network.step_edges(network.edges_subset(rows), np.array([1e-6, 2e-6, 4e-6]))
+        L = engine.state["L"]
+        for ion in network.ions:
+            delta = engine.delta[ion]
+            self.assertEqual(np.flatnonzero(delta).tolist(), [0, 1, 2, 4, 5])
+            self.assertAlmostEqual(np.sum(delta * L) / np.sum(np.abs(delta * L)), 0, places=12)
+        self.assertTrue(np.all(network.jnet[rows] != 0))
+
+    def test_accuracy(self):
+        """
+        Compartments far from the perturbation are stepped less often, close to forward Euler at the smallest time step
+        """
+        values = {}
+        for solver in ("euler", "local"):
+            self.new_simulator()
+            build_perturbed(20)
+            self.sim.run(stop=5e-4, dt=1e-6, engine="vector", solver=solver, levels=4, tolerance=2e-5,
+                         print_time=False)
+            values[solver] = final_values(self.sim, ("nai", "ki", "cli", "w"))
+            stats = self.sim.solver_stats()
+        self.assertEqual(stats["ticks"], 500)
+        self.assertLess(stats["compartment steps"], 500 * 21 / 2)
+        self.assertLess(stats["edge steps"], 500 * 20 / 2)
+        self.assertEqual(sum(stats["compartments per level"]), 21)
+        error = np.max(np.abs(values["local"] - values["euler"]), axis=0) / np.max(np.abs(values["euler"]), axis=0)
+        self.assertTrue(np.all(error < 1e-4), error)
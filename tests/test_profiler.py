@@ -0,0 +1,77 @@
+from unittest import TestCase
+import json
+import os
+import tempfile
+import numpy as np
+import simulator
+from test_engine import build_dendrite
+
+
+class TestProfiler(TestCase):
+
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_phases(self):
+        """
+        Each object type's steps, ticks and deferred updates are counted
+        """
+        for engine, types in (("object", ("step:Compartment", "step:Diffusion")),
+                              ("vector", ("step:VectorEngine", "step:DiffusionNetwork"))):
+            self.setUp()
+            comps = build_dendrite(3)
+            self.sim.use_engine(engine)
+            profiler = self.sim.profile()
+            self.sim.run(stop=2e-5, dt=1e-6, print_time=False)
+            stats = profiler.stats()
+            self.assertEqual(stats["runs"], 1)
+            self.assertEqual(stats["ticks"], 20)
+            self.assertEqual(stats["phases"]["updates"]["calls"], 20)
+            self.assertEqual(stats["phases"]["time"]["calls"], 20)
+            self.assertGreater(stats["updates"], 0)
+            for phase in types:
+                self.assertGreater(stats["phases"][phase]["calls"], 0)
+            self.assertGreater(stats["time"], 0)
+            self.assertLessEqual(sum(phase["time"] for phase in stats["phases"].values()), stats["time"])
+            self.assertIn("step:", profiler.summary())
+
+    def test_same_result(self):
+        """
+        Profiling does not change the run, and stops when disabled
+        """
+        values = []
+        for enable in (False, True):
+            self.setUp()
+            comps = build_dendrite(3)
+            self.sim.profile(enable)
+            self.sim.run(stop=5e-5, dt=1e-6, print_time=False)
+            values.append([comp.cli for comp in comps])
+        np.testing.assert_array_equal(values[0], values[1])
+        self.assertIsNotNone(self.sim.profiler())
+        self.assertIsNone(self.sim.profile(False))
+        self.assertIsNone(self.sim.profiler())
+
+    def test_trace(self):
+        """
+        Chrome trace with phases nested in ticks nested in the run
+        """
+        build_dendrite(2)
+        profiler = self.sim.profile(allocations=False)
+        self.sim.run(stop=1e-5, dt=1e-6, print_time=False, solver="bdf", data_collect_interval=2e-6)
+        path = os.path.join(tempfile.mkdtemp(), "run.trace.json")
+        profiler.write_trace(path)
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        os.remove(path)
+        self.assertEqual(events[0]["name"], "run")
+        ticks = [event for event in events if event["name"] == "tick"]
+        self.assertEqual(len(ticks), profiler.ticks)
+        end = events[0]["ts"] + events[0]["dur"] + 1e-3
+        for event in events:
+            self.assertEqual(event["ph"], "X")
+            self.assertGreaterEqual(event["ts"], events[0]["ts"])
+            self.assertLessEqual(event["ts"] + event["dur"], end)
@@ -0,0 +1,104 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from protocol import Protocol
+from test_engine import build_dendrite
+
+
+class TestProtocol(TestCase):
+
+    def setUp(self):
+        self.new_simulator()
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_times(self):
+        """
+        Actions are applied at their times, in order, within a single run
+        """
+        build_dendrite(2)
+        applied = []
+        protocol = Protocol() \
+            .call(3e-6, lambda: applied.append(("b", self.sim.time().time))) \
+            .call(0.5e-6, lambda: applied.append(("before", self.sim.time().time))) \
+            .call(1e-6, lambda: applied.append(("a", self.sim.time().time))) \
+            .call(3e-6, lambda: applied.append(("c", self.sim.time().time))) \
+            .call(1e-5, lambda: applied.append(("after", self.sim.time().time)))
+        self.sim.run(stop=1e-6, dt=1e-6, print_time=False)
+        self.sim.run(continuefor=5e-6, dt=1e-6, print_time=False, protocol=protocol)
+        self.assertEqual([name for name, t in applied], ["a", "b", "c"])
+        np.testing.assert_allclose([t for name, t in applied], [1e-6, 3e-6, 3e-6])
+
+    def test_step_change(self):
+        """
+        A parameter changed by the protocol is the same as one changed between two runs
+        """
+        values = []
+        for engine in ("object", "vector"):
+            for use_protocol in (False, True):
+                self.new_simulator()
+                comps = build_dendrite(3)
+                self.sim.use_engine(engine)
+                if use_protocol:
+                    protocol = Protocol().set(3e-5, comps[1], "gx", 1e-8).inject(3e-5, comps[0], "cli", 1e-4)
+                    self.sim.run(stop=6e-5, dt=1e-6, print_time=False, protocol=protocol)
+                else:
+                    self.sim.run(stop=3e-5, dt=1e-6, print_time=False)
+                    comps[1].gx = 1e-8
+                    comps[0].cli += 1e-4
+                    self.sim.run(continuefor=3e-5, dt=1e-6, print_time=False)
+                self.assertEqual(comps[1].gx, 1e-8)
+                values.append([[comp.cli, comp.xi, comp.V] for comp in comps])
+        np.testing.assert_allclose(values[1], values[0], rtol=1e-12)
+        np.testing.assert_allclose(values[3], values[2], rtol=1e-12)
+
+    def test_ramp(self):
+        """
+        Ramps change a variable in equal steps, to a value or by an amount
+        """
+        comps = build_dendrite(2)
+        pkcc2 = comps[0].pkcc2
+        pump = []
+        protocol = Protocol() \
+            .ramp(1e-5, 2e-5, comps[0], "pkcc2", to=2 * pkcc2) \
+            .ramp(0, 1e-5, comps[1], "p", by=-comps[1].p, interval=2e-6) \
+            .call(1.5e-5, lambda: self.assertAlmostEqual(comps[0].pkcc2, 1.5 * pkcc2, delta=pkcc2 * 0.11)) \
+            .call(0.7e-5, lambda: pump.append(comps[1].p))
+        comps[0].jkccup = None
+        p = comps[1].p
+        self.sim.run(stop=3e-5, dt=1e-6, print_time=False, protocol=protocol)
+        self.assertAlmostEqual(comps[0].pkcc2, 2 * pkcc2)
+        np.testing.assert_allclose(pump, [p / 5])
+        self.assertAlmostEqual(comps[1].p, 0)
+        with self.assertRaises(ValueError):
+            protocol.ramp(0, 1, comps[0], "gx")
+        with self.assertRaises(ValueError):
+            protocol.ramp(1, 0, comps[0], "gx", to=0)
+
+    def test_adaptive_solver(self):
+        """
+        An adaptive solver is restarted at each action
+        """
+        values = []
+        for use_protocol in (False, True):
+            self.new_simulator()
+            comps = build_dendrite(3)
+            if use_protocol:
+                protocol = Protocol().inject(2e-3, comps[0], "cli", 1e-3).set(3e-3, comps[2], "gx", 1e-8)
+                self.sim.run(stop=5e-3, dt=1e-6, solver="bdf", data_collect_interval=1e-3, print_time=False,
+                             protocol=protocol)
+                self.assertGreater(self.sim.solver_stats()["steps"], 0)
+            else:
+                self.sim.run(stop=2e-3, dt=1e-6, solver="bdf", data_collect_interval=1e-3, print_time=False)
+                comps[0].cli += 1e-3
+                self.sim.run(continuefor=1e-3, dt=1e-6, solver="bdf", data_collect_interval=1e-3, print_time=False)
+                comps[2].gx = 1e-8
+                self.sim.run(continuefor=2e-3, dt=1e-6, solver="bdf", data_collect_interval=1e-3, print_time=False)
+            self.assertAlmostEqual(self.sim.time().time, 5e-3)
+            values.append([[comp.cli, comp.xi, comp.w] for comp in comps])
+        np.testing.assert_allclose(values[1], values[0], rtol=1e-9)
@@ -0,0 +1,132 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+import simulator
+from recorder import TraceBuffer, Recorder
+from test_engine import build_dendrite
+
+
+class TestTraceBuffer(TestCase):
+    def test_growth(self):
+        buffer = TraceBuffer(2, capacity=4)
+        for i in range(100):
+            buffer.append([i, -i])
+        self.assertEqual(len(buffer), 100)
+        self.assertEqual(buffer.capacity, 128)
+        np.testing.assert_array_equal(buffer.column(1), -np.arange(100))
+        self.assertTrue(np.shares_memory(buffer.view(), buffer.data))
+        buffer.reserve(buffer.capacity, 3)
+        self.assertTrue(np.all(np.isnan(buffer.column(2))))
+        buffer.clear()
+        self.assertEqual(len(buffer.view()), 0)
+
+    def test_spill(self):
+        directory = tempfile.mkdtemp()
+        buffer = TraceBuffer(3, capacity=8, max_bytes=1024, spill_directory=directory)
+        for i in range(1000):
+            buffer.append([i, 2 * i, 3 * i])
+        self.assertTrue(buffer.spilled())
+        np.testing.assert_array_equal(buffer.column(2), 3 * np.arange(1000))
+        buffer.close()
+        self.assertListEqual(os.listdir(directory), [])
+        os.rmdir(directory)
+
+
+class TestRecorder(TestCase):
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+        self.comps = build_dendrite(3)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def record_run(self, engine):
+        self.setUp()
+        recorder = self.sim.register_recorder(Recorder(capacity=2))
+        t = recorder.add(self.sim.time(), "time")
+        cli = [recorder.add(comp, "cli", 1e3) for comp in self.comps]
+        v = [recorder.add(comp, "V") for comp in self.comps]
+        self.assertEqual(recorder.add(self.comps[0], "cli", 1e3), cli[0])
+        self.sim.run(stop=0.0005, dt=1e-6, data_collect_interval=1e-6, engine=engine, print_time=False)
+        return recorder, t, cli, v
+
+    def test_same_as_object(self):
+        """
+        Samples gathered from the vector engine's arrays are those of the object engine
+        """
+        recorders = {}
+        for engine in ("object", "vector"):
+            recorder, t, cli, v = self.record_run(engine)
+            self.assertEqual(len(recorder), 500)
+            np.testing.assert_allclose(recorder[t], np.arange(500) * 1e-6, atol=1e-15)
+            self.assertAlmostEqual(recorder[cli[1]][0], 5.2)
+            recorders[engine] = recorder.buffer.view().copy()
+        np.testing.assert_allclose(recorders["vector"], recorders["object"], rtol=1e-10)
+
+    def test_cleared_by_new_run(self):
+        recorder, t, cli, v = self.record_run("vector")
+        self.sim.run(continuefor=0.0001, dt=1e-6, print_time=False)
+        self.assertEqual(len(recorder), 600)
+        self.sim.run(stop=0.0001, dt=1e-6, print_time=False)
+        self.assertEqual(len(recorder), 100)
+
+    def test_compartments_moved(self):
+        """
+        Channels follow their compartments when others are removed and added (keeping the number bound)
+        """
+        from topology import Topology
+        self.comps[3].cli *= 1.5
+        recorder = self.sim.register_recorder(Recorder(capacity=2))
+        columns = [recorder.add(comp, "cli") for comp in self.comps]
+        self.sim.run(stop=2e-6, dt=1e-6, engine="vector", print_time=False)
+        topology = Topology()
+        # the last compartment is moved into the place of the merged one, and the new one takes its place
+        topology.merge(self.comps[1], self.comps[2])
+        topology.split(self.comps[2], fraction=0.5)
+        self.sim.run(continuefor=1e-6, dt=1e-6, print_time=False)
+        self.assertEqual(self.sim.engine().state.n, 4)
+        recorder.record()
+        np.testing.assert_array_equal(recorder.buffer.view()[-1, columns], [comp.cli for comp in self.comps])
+
+
+class TestGraph(TestCase):
+    def setUp(self):
+        import matplotlib
+        matplotlib.use("Agg")
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_data(self):
+        from graph import Graph
+        comps = build_dendrite(1)
+        graph = Graph(self.sim.time()).add_ion_conc(comps[0], "cli", y_units_scale=1e3)
+        for i in range(10):
+            self.sim.time().step()
+            graph.update()
+        graph.add_voltage(comps[1])
+        graph.plot_graph()
+        data = graph.data()
+        x, y = data["reference.cli"]
+        self.assertEqual(len(x), 12)
+        np.testing.assert_allclose(y, 5.2)
+        self.assertTrue(np.all(np.isnan(data["dendrite right 1.V"][1][:11])))
+        self.assertTrue(np.shares_memory(x, graph.recorder.buffer.data))
+
+    def test_values(self):
+        from graph import Graph
+        comps = build_dendrite(1)
+        graph = Graph(self.sim.time())
+        channels = graph.recorder.add(comps[0], "cli"), graph.recorder.add(comps[0], "ki")
+        graph.recorder.add(comps[1], "cli")
+        graph.update()
+        values = graph._Graph__values(list(channels))
+        self.assertTrue(np.shares_memory(values, graph.recorder.buffer.data))
+        np.testing.assert_array_equal(np.ravel(values), [comps[0].cli, comps[0].ki])
+        values = graph._Graph__values([channels[0], channels[0] + 2])
+        self.assertFalse(np.shares_memory(values, graph.recorder.buffer.data))
+        np.testing.assert_array_equal(np.ravel(values), [comps[0].cli, comps[1].cli])
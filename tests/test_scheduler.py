@@ -0,0 +1,70 @@
+from unittest import TestCase
+import simulator
+from scheduler import Scheduler, MEMBRANE, DIFFUSION, OBSERVER
+from sim_time import TimeMixin
+from test_engine import build_dendrite
+
+
+class Recorded(TimeMixin):
+    """
+    Object that records each of its steps
+    """
+
+    def __init__(self, name, phase, steps):
+        self.name = name
+        self.phase = phase
+        self.steps = steps
+
+    def step(self, _time=None):
+        self.steps.append((self.name, _time.time))
+
+
+class TestScheduler(TestCase):
+
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_registries(self):
+        scheduler = Scheduler()
+        observer, membrane, other = Recorded("o", OBSERVER, []), Recorded("m", MEMBRANE, []), Recorded("x", "?", [])
+        for obj in (observer, membrane, other):
+            scheduler.register(obj)
+        self.assertEqual(scheduler.objects, [observer, membrane, other])
+        self.assertEqual(scheduler.registries, {MEMBRANE: [membrane], DIFFUSION: [], OBSERVER: [observer, other]})
+        self.assertEqual([(phase.name, phase.objects) for phase in scheduler.phases()],
+                         [(MEMBRANE, [membrane]), (OBSERVER, [observer, other])])
+        scheduler.unregister(observer)
+        self.assertEqual(scheduler.registries[OBSERVER], [other])
+
+    def test_once_per_tick(self):
+        """
+        Each object is stepped once per tick, phase by phase (and in order of registration within a phase)
+        """
+        steps = []
+        for name, phase in (("observer", OBSERVER), ("diffusion", DIFFUSION), ("membrane 1", MEMBRANE),
+                            ("membrane 2", MEMBRANE)):
+            self.sim.object_list(Recorded(name, phase, steps))
+        self.sim.run(stop=3e-6, dt=1e-6, print_time=False)
+        self.assertEqual([name for name, t in steps], ["membrane 1", "membrane 2", "diffusion", "observer"] * 3)
+        self.assertEqual([t for name, t in steps], [0] * 4 + [1e-6] * 4 + [2e-6] * 4)
+
+    def test_engines(self):
+        """
+        With the vector engine, the membrane and diffusion phases are single batched steps
+        """
+        for engine in ("object", "vector"):
+            self.setUp()
+            build_dendrite(3)
+            profiler = self.sim.profile(trace=False, allocations=False)
+            self.sim.run(stop=1e-5, dt=1e-6, engine=engine, print_time=False)
+            calls = {phase: stats["calls"] for phase, stats in profiler.stats()["phases"].items()}
+            if engine == "object":
+                self.assertEqual(calls["step:Compartment"], 4 * 10)
+                self.assertEqual(calls["step:Diffusion"], 3 * 10)
+            else:
+                self.assertEqual(calls["step:VectorEngine"], 10)
+                self.assertEqual(calls["step:DiffusionNetwork"], 10)
@@ -1,7 +1,14 @@
 from unittest import TestCase
 from simulator import Simulator
 from compartment import Compartment
+import os
+import subprocess
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from test_engine import build_dendrite
 
 
 class TestSimulator(TestCase):
@@ -16,6 +23,28 @@ class TestSimulator(TestCase):
         self.sim = Simulator(_gui=False)
         self.assertIsNotNone(self.sim.gui())
 
+    def test_headless(self):
+        """
+        Without a GUI, a simulation imports nothing from matplotlib (nor scipy with the object engine), and graphs are
+        drawn off-screen when requested
+        """
+        code = "\n".join(["import sys",
+                          "import simulator, compartment, diffusion, recorder",
+                          "sim = simulator.Simulator.get_instance()",
+                          "a = compartment.Compartment('a')",
+                          "diffusion.Diffusion(a, a.copy('b'), {'cli': 1e-7})",
+                          "sim.run(stop=1e-5, dt=1e-6, print_time=False)",
+                          "assert sim.headless()",
+                          "assert not [name for name in sys.modules if name.startswith(('matplotlib', 'scipy'))]",
+                          "sim.gui().add_graph().add_voltage(a)",
+                          "import matplotlib",
+                          "assert matplotlib.get_backend().lower() == 'agg', matplotlib.get_backend()"])
+        env = dict(os.environ, MCMA_HEADLESS="1")
+        env.pop("MPLBACKEND", None)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
     def test_get_instance(self):
         self.sim.dispose()
         self.sim = Simulator.get_instance()
@@ -84,3 +113,66 @@ class TestSimulator(TestCase):
         self.sim.dispose()
         self.assertIsNone(sim2.time())
         self.assertIs(self.sim.time(), sim2.time())
+
+    def test_independent(self):
+        """
+        Simulators have their own clock, objects and graphs; objects register with the current Simulator of their
+        thread
+        """
+        self.sim.dispose()
+        self.sim = Simulator(_gui=False)
+        sim2 = Simulator(_gui=False, current=False)
+        comp = Compartment("comp")
+        with sim2.activate():
+            self.assertIs(Simulator.get_instance(), sim2)
+            comp2 = Compartment("comp2")
+        self.assertIs(Simulator.get_instance(), self.sim)
+        self.assertListEqual(self.sim.object_list(), [comp])
+        self.assertListEqual(sim2.object_list(), [comp2])
+        graph = self.sim.gui().add_graph()
+        graph.add_voltage(comp)
+        graph2 = sim2.gui().add_graph()
+        graph2.add_voltage(comp2)
+        self.assertIsNot(self.sim.gui(), sim2.gui())
+        self.assertListEqual(sim2.gui().graphs(), [graph2])
+        recorded = graph.data()
+        sim2.run(stop=1e-5, dt=1e-6, print_time=False)
+        self.assertAlmostEqual(sim2.time().time, 1e-5)
+        self.assertEqual(self.sim.time().time, 0)
+        self.assertEqual(repr(graph.data()), repr(recorded))
+        self.sim.run(stop=3e-6, dt=1e-6, print_time=False)
+        (t, v), = graph.data().values()
+        (t2, v2), = graph2.data().values()
+        np.testing.assert_allclose(t, [0, 1e-6, 2e-6], atol=1e-15)
+        np.testing.assert_allclose(t2, np.arange(10) * 1e-6, atol=1e-15)
+        # other threads have no current Simulator until they create one
+        current = []
+        thread = threading.Thread(target=lambda: current.extend([Simulator.current(), Simulator(_gui=False)]))
+        thread.start()
+        thread.join()
+        self.assertIsNone(current[0])
+        self.assertIsNot(current[1], self.sim)
+        self.assertIs(Simulator.current(), self.sim)
+        sim2.dispose()
+        self.sim.dispose()
+
+    def test_threads(self):
+        """
+        Independent Simulators run concurrently in threads give the results of running them one after the other
+        """
+
+        def simulate(dz):
+            sim = Simulator(_gui=False, current=False)
+            with sim.activate():
+                comps = build_dendrite(3)
+                comps[0].dz = dz
+            sim.run(stop=1e-4, dt=1e-6, engine="vector", print_time=False)
+            sim.dispose()
+            return [[comp.V, comp.cli, comp.w] for comp in comps]
+
+        values = [1e-9, 2e-9, 4e-9, 8e-9]
+        serial = [simulate(dz) for dz in values]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            concurrent = list(pool.map(simulate, values))
+        np.testing.assert_array_equal(concurrent, serial)
+        self.assertFalse(np.array_equal(serial[0], serial[-1]))
@@ -0,0 +1,78 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from common import F
+from constants import valence
+from diffusion import Diffusion
+from species import registry, CORE
+from test_engine import build_dendrite
+
+
+class TestSpecies(TestCase):
+
+    def setUp(self):
+        self.new_simulator()
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+        for sp in list(registry):
+            if sp.name not in CORE:
+                registry.unregister(sp.name)
+
+    def test_valence(self):
+        self.assertEqual(valence("cli"), -1)
+        self.assertEqual(valence("Nao"), 1)
+        self.assertEqual(registry.valence("k"), 1)
+        registry.register("hco3", z=-1)
+        self.assertEqual(valence("hco3i"), -1)
+        with self.assertRaises(KeyError):
+            valence("cai")
+        with self.assertRaises(ValueError):
+            registry.register("na", z=2)
+        with self.assertRaises(ValueError):
+            registry.register("hco3i", z=-1)
+
+    def test_compile(self):
+        """
+        The species axis has na, k and cl first, then the other permeant species, then the impermeant ones
+        """
+        registry.register("y", z=-1, inside=1e-3, D=1e-7)
+        registry.register("hco3", z=-1, inside=15e-3, out=25e-3, g=0.2e-3 / F)
+        compiled = registry.compile()
+        self.assertEqual(compiled.names, ("nai", "ki", "cli", "hco3i", "yi"))
+        self.assertEqual(compiled.n_permeant, 4)
+        np.testing.assert_array_equal(compiled.z, [1, 1, -1, -1, -1])
+        self.assertIs(registry.compile(), compiled)
+        self.assertEqual(registry.extra_fields(), ("hco3i", "hco3o", "yi", "yo"))
+        self.assertEqual(set(registry.diffusion_coefficients()), {"nai", "ki", "cli", "yi"})
+
+    def test_extra_species(self):
+        """
+        Compartments carry the species registered besides na, k and cl, which cross the membrane (if permeant) and
+        diffuse, the same with both engines
+        """
+        registry.register("hco3", z=-1, inside=15e-3, out=25e-3, g=0.2e-3 / F, D=1.18e-7)
+        registry.register("y", z=-1, inside=1e-3, D=1e-7)
+        values = []
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            comps = build_dendrite(2)
+            comps[0].yi = 2e-3
+            Diffusion(comps[-1], comps[0])
+            self.sim.use_engine(engine)
+            self.sim.run(stop=1e-3, dt=1e-6, print_time=False)
+            values.append([[comp.hco3i, comp.yi, comp.V, comp.w] for comp in comps])
+        np.testing.assert_allclose(values[1], values[0], rtol=1e-10)
+        hco3i, yi = np.array(values[0])[:, 0], np.array(values[0])[:, 1]
+        # bicarbonate leaks in towards its reversal potential; the impermeant only diffuses
+        self.assertTrue(np.all(hco3i != 15e-3))
+        self.assertTrue(yi[0] < 2e-3 and yi[-1] > 1e-3)
+
+    def test_backend(self):
+        registry.register("hco3", z=-1, inside=15e-3, out=25e-3, g=0.2e-3 / F)
+        with self.assertRaises(ValueError):
+            self.sim.use_engine("vector", backend="loop")
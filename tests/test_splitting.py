@@ -0,0 +1,88 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from splitting import StrangSplitting, accuracy_report, final_values
+from test_engine import build_dendrite
+
+
+def build_passive():
+    """
+    Dendrite of build_dendrite without the kcc2 and impermeant charge ramps (whose increments are per time step, and so
+    differ between runs with different time steps)
+    """
+    comps = build_dendrite(3)
+    comps[0].jkccup = None
+    comps[0].dz = 0
+    return comps
+
+
+class TestSplitting(TestCase):
+
+    def setUp(self):
+        self.new_simulator()
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            StrangSplitting("osmosis")
+        with self.assertRaises(ValueError):
+            StrangSplitting(substeps=0)
+
+    def test_substeps(self):
+        """
+        The split process is stepped 2 * substeps times per tick, the other one once
+        """
+        for split, fast, slow in (("diffusion", "step:DiffusionNetwork", "step:VectorEngine"),
+                                  ("membrane", "step:VectorEngine", "step:DiffusionNetwork")):
+            self.new_simulator()
+            build_dendrite(3)
+            profiler = self.sim.profile(trace=False, allocations=False)
+            self.sim.run(stop=1e-4, dt=1e-5, engine="vector", solver="strang", split=split, substeps=3,
+                         print_time=False)
+            calls = {phase: stats["calls"] for phase, stats in profiler.stats()["phases"].items()}
+            self.assertEqual(calls[fast], 2 * 3 * 10)
+            self.assertEqual(calls[slow], 10)
+            self.assertAlmostEqual(self.sim.time().time, 1e-4)
+            self.assertAlmostEqual(self.sim.time().dt, 1e-5)
+
+    def test_engines(self):
+        values = []
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            build_dendrite(3)
+            self.sim.run(stop=1e-4, dt=1e-5, engine=engine, solver="strang", substeps=4, print_time=False)
+            values.append(final_values(self.sim, ("nai", "ki", "cli", "V", "w")))
+        np.testing.assert_allclose(values[1], values[0], rtol=1e-10)
+
+    def test_accuracy(self):
+        """
+        Sub-cycling diffusion is stable with a time step at which forward Euler is not, and close to a single-rate run
+        with the small time step
+        """
+        build_passive()
+        self.sim.run(stop=2e-3, dt=1e-4, engine="vector", print_time=False)
+        self.assertFalse(np.all(np.isfinite(final_values(self.sim, ("cli", "V")))))
+        report = accuracy_report(build_passive, stop=5e-3, dt=1e-4, substeps=20, reference_dt=1e-6)
+        self.assertEqual(report["dt"], {"slow": 1e-4, "fast": 2.5e-6, "reference": 1e-6})
+        for var in ("nai", "ki", "cli", "w"):
+            self.assertLess(report["error"][var], 1e-4, var)
+        self.assertLess(report["error"]["V"], 1e-2)
+        self.assertGreater(report["speedup"], 1)
+
+    def test_membrane_increments(self):
+        """
+        With the membrane as the fast process, the kcc2 and impermeant charge ramps (increments per tick) are those of
+        a single-rate run with the same dt, whatever the number of substeps
+        """
+        for substeps in (1, 5):
+            report = accuracy_report(build_dendrite, stop=2e-4, dt=1e-5, split="membrane", substeps=substeps,
+                                     reference_dt=1e-5, variables=("pkcc2", "xz", "cli", "V"))
+            self.assertLess(report["error"]["pkcc2"], 1e-12, substeps)
+            self.assertLess(report["error"]["xz"], 1e-12, substeps)
+            self.assertLess(report["error"]["cli"], 1e-4, substeps)
@@ -0,0 +1,181 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+import stability
+from compartment import Compartment
+from diffusion import Diffusion
+from protocol import Protocol
+from recorder import Recorder
+from sim_time import TimeMixin
+from splitting import final_values
+from topology import Topology
+from test_engine import build_dendrite
+
+
+class Widen(TimeMixin):
+    """
+    Widens compartments by a factor every tick for a number of ticks, so that they become shorter (through
+    Compartment.update_length), and records the time step and the stability limit of each tick
+    """
+    phase = "observer"
+
+    def __init__(self, compartments, factor, ticks):
+        self.compartments = compartments
+        self.factor = factor
+        self.ticks = ticks
+        self.dt = []
+        self.limit = []
+        simulator.Simulator.get_instance().register_compartment(self)
+
+    def step(self, _time=None):
+        objects = simulator.Simulator.get_instance().object_list()
+        rate = stability.object_rate_bound(self.compartments, [obj for obj in objects if isinstance(obj, Diffusion)])
+        self.dt.append(_time.dt)
+        self.limit.append(2 / np.max(rate))
+        if len(self.dt) <= self.ticks:
+            for comp in self.compartments:
+                comp.r *= self.factor
+
+
+class TestStability(TestCase):
+
+    def setUp(self):
+        self.new_simulator()
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_round_dt(self):
+        for dt, rounded in ((1.8e-5, 1e-5), (2.07e-7, 2e-7), (9.9e-3, 5e-3), (0.03, 0.02), (1, 1)):
+            self.assertEqual(stability.round_dt(dt), rounded)
+        self.assertIsNone(stability.stable_dt(np.zeros(0)))
+
+    def test_engines(self):
+        """
+        The bound is the same from the objects and from the vector engine
+        """
+        build_dendrite(5)
+        objects = self.sim.object_list()
+        rate = stability.object_rate_bound([obj for obj in objects if isinstance(obj, Compartment)],
+                                           [obj for obj in objects if isinstance(obj, Diffusion)])
+        self.sim.use_engine("vector")
+        self.assertEqual(self.sim.stable_dt(), 1e-5)
+        np.testing.assert_allclose(stability.engine_rate_bound(self.sim.engine()), rate, rtol=1e-12)
+
+    def test_stable_dt(self):
+        """
+        The limit falls with the square of the length of the compartments, and is that of the membrane without
+        diffusion
+        """
+        self.assertIsNone(self.sim.stable_dt())
+        comps = build_dendrite(5)
+        self.assertEqual(self.sim.stable_dt(), 1e-5)
+        for comp in comps:
+            comp.L /= 3
+        self.assertEqual(self.sim.stable_dt(), 1e-6)
+        self.new_simulator()
+        Compartment("reference", z=-0.85, cli=0.0052, ki=0.0123, nai=0.014, length=10e-5, radius=0.5e-5)
+        self.assertEqual(self.sim.stable_dt(), 0.02)
+
+    def test_run(self):
+        """
+        A run with dt "auto" is stable, and its time step follows the stability limit as the model changes
+        """
+        build_dendrite(3)
+        with self.assertRaises(ValueError):
+            self.sim.run(stop=1e-4, dt="auto", solver="strang", print_time=False)
+        self.sim.run(stop=1e-3, dt="auto", print_time=False)
+        self.assertEqual(self.sim.time().dt, 1e-5)
+        self.assertAlmostEqual(self.sim.time().time, 1e-3)
+        self.assertTrue(np.all(np.isfinite(final_values(self.sim, ("cli", "V")))))
+        # splitting a compartment in half during the run
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            comps = build_dendrite(3)
+            topology = Topology()
+            protocol = Protocol().call(1e-4, lambda: topology.split(comps[2], fraction=0.5,
+                                                                    edges=[topology.edge(comps[2], comps[3])]))
+            self.sim.run(stop=3e-4, dt="auto", engine=engine, protocol=protocol, print_time=False)
+            self.assertEqual(self.sim.time().dt, 2e-6, engine)
+            self.assertAlmostEqual(self.sim.time().time, 3e-4)
+            self.assertTrue(np.all(np.isfinite(final_values(self.sim, ("cli", "V")))), engine)
+
+    def test_local(self):
+        """
+        With solver "local", compartments are stepped within their own stability limits
+        """
+        comps = build_dendrite(6)
+        comps[0].cli *= 1.1
+        topology = Topology()
+        topology.split(comps[1], fraction=0.25, edges=[topology.edge(comps[1], comps[2])])
+        self.sim.run(stop=5e-4, dt="auto", solver="local", levels=4, tolerance=1, print_time=False)
+        self.assertEqual(self.sim.time().dt, 2e-6)
+        self.assertTrue(np.all(np.isfinite(final_values(self.sim, ("cli", "V")))))
+        level = self.sim.solver_stats()["compartments per level"]
+        self.assertEqual(sum(level), 8)
+        self.assertGreater(level[3], 0)
+        self.assertLess(level[3], 8)
+
+    def test_shortened(self):
+        """
+        The time step follows compartments that become shorter during a run within the tick, without events
+        """
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            comps = build_dendrite(3)
+            widen = Widen(comps, 1.02, 20)
+            self.sim.run(stop=5e-4, dt="auto", engine=engine, print_time=False)
+            self.assertEqual(widen.dt[0], 1e-5)
+            self.assertLess(widen.dt.index(widen.dt[-1]), stability.CHECK_INTERVAL)
+            self.assertLess(widen.dt[-1], 1e-5)
+            self.assertTrue(np.all(np.array(widen.dt) <= widen.limit), engine)
+            self.assertEqual(comps[0].L_stable, 0)
+
+    def test_intervals(self):
+        """
+        When the time step changes, data is still collected at the first tick at or after each multiple of the
+        interval, and the run stops at stop
+        """
+        comps = build_dendrite(3)
+        topology = Topology()
+        new = topology.split(comps[2], fraction=0.5, edges=[topology.edge(comps[2], comps[3])])
+        protocol = Protocol().call(1e-4, lambda: topology.merge(new, comps[2]))
+        recorder = self.sim.register_recorder(Recorder())
+        t = recorder.add(self.sim.time(), "time")
+        self.sim.run(stop=3.003e-4, dt="auto", protocol=protocol, print_time=False)
+        self.assertEqual(self.sim.time().dt, 1e-5)
+        self.assertAlmostEqual(self.sim.time().time, 3.003e-4, places=15)
+        # every tick of 2e-6 (the default interval), then every tick of 1e-5
+        times = recorder[t]
+        np.testing.assert_allclose(np.diff(times), [2e-6] * 50 + [1e-5] * 19, rtol=1e-6)
+        for interval in (5e-6, 3e-5):
+            self.new_simulator()
+            comps = build_dendrite(3)
+            protocol = Protocol().call(1e-4, lambda: topology.split(comps[2], fraction=0.5,
+                                                                    edges=[topology.edge(comps[2], comps[3])]))
+            topology = Topology()
+            recorder = self.sim.register_recorder(Recorder())
+            t = recorder.add(self.sim.time(), "time")
+            self.sim.run(stop=3e-4, dt="auto", protocol=protocol, data_collect_interval=interval, print_time=False)
+            self.assertEqual(self.sim.time().dt, 2e-6)
+            expected = [max(interval, 1e-5) * k for k in range(int(round(1e-4 / max(interval, 1e-5))))]
+            expected += [np.ceil(interval * k / 2e-6 - 1e-6) * 2e-6
+                         for k in range(int(round(1e-4 / interval)), int(round(3e-4 / interval)))]
+            np.testing.assert_allclose(recorder[t], expected, rtol=1e-6, atol=1e-12)
+
+    def test_partial_increments(self):
+        """
+        The shorter last tick of a run that stops between ticks is given its fraction of jkccup and dz
+        """
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            comps = build_dendrite(3)
+            pkcc2, xz = comps[0].pkcc2, comps[0].xz
+            self.sim.run(stop=1.05e-4, dt="auto", engine=engine, print_time=False)
+            self.assertAlmostEqual(self.sim.time().time, 1.05e-4, places=15)
+            self.assertAlmostEqual(comps[0].pkcc2, pkcc2 + 10.5 * comps[0].jkccup, delta=1e-6 * comps[0].jkccup)
+            self.assertAlmostEqual(comps[0].xz, xz - 10.5 * comps[0].dz, delta=1e-6 * comps[0].dz)
@@ -0,0 +1,150 @@
+from unittest import TestCase
+import shutil
+import tempfile
+import numpy as np
+import common
+import simulator
+from diffusion import Diffusion
+from species import registry
+from steady_state_cache import SteadyStateCache
+from test_engine import build_dendrite
+
+
+class TestSteadyState(TestCase):
+    variables = ["nai", "ki", "cli", "xi", "w", "V"]
+
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+        self.comps = build_dendrite(3)
+        for comp in self.comps:
+            comp.gx = 0
+            comp.jkccup = None
+            comp.dz = 0
+        self.comps[-1].cli *= 1.5
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def test_same_as_long_run(self):
+        info = self.sim.solve_steady_state()
+        self.assertEqual(self.sim.time().time, 0)
+        self.assertLess(info["residual"], 1e-8)
+        solved = np.array([[comp[var] for var in self.variables] for comp in self.comps])
+        # solved values are written into the compartments
+        self.assertNotAlmostEqual(self.comps[0].ki, 0.0123)
+        self.sim.run(continuefor=3000, dt=1e-3, solver="bdf", rtol=1e-9, data_collect_interval=1000, print_time=False)
+        np.testing.assert_allclose(solved, [[comp[var] for var in self.variables] for comp in self.comps], rtol=1e-8)
+
+    def test_engine_and_time(self):
+        """
+        The engine in use before solving is used again afterwards, and the time is moved forward by advance
+        """
+        self.sim.solve_steady_state(advance=100)
+        self.assertIsNone(self.sim.engine())
+        self.assertEqual(self.sim.time().time, 100)
+        self.sim.use_engine("vector")
+        self.sim.solve_steady_state()
+        self.assertIsNotNone(self.sim.engine())
+        self.assertEqual(self.sim.time().time, 100)
+
+    def test_newton(self):
+        """
+        Newton's method converges directly from near the steady state
+        """
+        self.sim.solve_steady_state()
+        for comp in self.comps:
+            comp.cli *= 1.001
+        info = self.sim.solve_steady_state()
+        self.assertEqual(info["method"], "newton")
+        self.assertLess(info["iterations"], 10)
+
+    def test_extra_species(self):
+        """
+        Registered species are part of the steady state: a permeant one is solved for, the amount of an impermeant one
+        is held, and a diffusing impermeant one cannot be solved for
+        """
+        registry.register("hco3", z=-1, inside=15e-3, out=25e-3, g=0.2e-3 / common.F, D=1.18e-7)
+        registry.register("y", z=-1, inside=1e-3)
+        try:
+            self.setUp()
+            Diffusion(self.comps[-1], self.comps[0])
+            info = self.sim.solve_steady_state()
+            self.assertLess(info["residual"], 1e-8)
+            variables = self.variables + ["hco3i", "yi"]
+            solved = np.array([[comp[var] for var in variables] for comp in self.comps])
+            self.assertTrue(np.all(solved[:, -2] != 15e-3))
+            self.sim.run(continuefor=3000, dt=1e-3, solver="bdf", rtol=1e-9, data_collect_interval=1000,
+                         print_time=False)
+            np.testing.assert_allclose(solved, [[comp[var] for var in variables] for comp in self.comps], rtol=1e-7)
+            registry.register("y", z=-1, inside=1e-3, D=1e-7)
+            self.setUp()
+            Diffusion(self.comps[-1], self.comps[0])
+            with self.assertRaises(ValueError):
+                self.sim.solve_steady_state()
+        finally:
+            registry.unregister("hco3")
+            registry.unregister("y")
+
+
+class TestSteadyStateCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SteadyStateCache(self.directory, max_entries=2)
+
+    def tearDown(self):
+        simulator.Simulator.dispose()
+        shutil.rmtree(self.directory)
+
+    def solve(self, cli=0.0052):
+        simulator.Simulator.dispose()
+        sim = simulator.Simulator(False)
+        comps = build_dendrite(2)
+        for comp in comps:
+            comp.gx = 0
+            comp.cli = cli
+        info = sim.solve_steady_state(cache=self.cache)
+        return info, [comp.cli for comp in comps]
+
+    def test_hit(self):
+        info, solved = self.solve()
+        self.assertNotEqual(info["method"], "cache")
+        info, cached = self.solve()
+        self.assertEqual(info["method"], "cache")
+        self.assertListEqual(cached, solved)
+        # a different model is not found
+        info, _ = self.solve(cli=0.006)
+        self.assertNotEqual(info["method"], "cache")
+
+    def test_species(self):
+        """
+        The registered species are part of the key, including their extracellular concentration
+        """
+        methods = []
+        try:
+            for out in (25e-3, 25e-3, 20e-3):
+                registry.register("hco3", z=-1, inside=15e-3, out=out, g=0.2e-3 / common.F)
+                methods.append(self.solve()[0]["method"])
+        finally:
+            registry.unregister("hco3")
+        self.assertNotEqual(methods[0], "cache")
+        self.assertEqual(methods[1], "cache")
+        self.assertNotEqual(methods[2], "cache")
+
+    def test_eviction(self):
+        for cli in (0.005, 0.006, 0.007):
+            self.solve(cli)
+        self.assertEqual(len(self.cache.entries()), 2)
+        # least recently used is evicted
+        info, _ = self.solve(0.005)
+        self.assertNotEqual(info["method"], "cache")
+
+    def test_constants(self):
+        self.solve()
+        oso = common.oso
+        try:
+            common.oso = oso * 1.01
+            info, _ = self.solve()
+        finally:
+            common.oso = oso
+        self.assertNotEqual(info["method"], "cache")
@@ -0,0 +1,72 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import time
+import simulator
+from sweep import Sweep, parameter_grid, traces
+
+
+def scenario(gx=0.0, fail=False, crash=False, sleep=0.0):
+    from simulator import Simulator
+    from compartment import Compartment
+    sim = Simulator.get_instance()
+    comp = Compartment("soma", gx=gx)
+    graph = sim.gui().add_graph().add_ion_conc(comp, "cli")
+    if fail:
+        raise ValueError("failed")
+    if crash:
+        os._exit(3)
+    time.sleep(sleep)
+    sim.run(stop=1e-5, dt=1e-6, data_collect_interval=1e-6, plot_update_interval=1e-5)
+    graph.save("graphs/cli.png")
+    return comp.cli
+
+
+def headless():
+    from simulator import Simulator
+    return os.environ.get("MCMA_HEADLESS"), Simulator.get_instance().headless()
+
+
+class TestSweep(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_grid(self):
+        grid = parameter_grid(a=[1, 2], b=["x", "y", "z"])
+        self.assertEqual(len(grid), 6)
+        self.assertDictEqual(grid[0], {"a": 1, "b": "x"})
+
+    def test_traces_without_gui(self):
+        """
+        A simulator without a GUI has no traces, and is not given a GUI
+        """
+        sim = simulator.Simulator(False, current=False)
+        self.assertDictEqual(traces(sim), {})
+        self.assertIsNone(sim.gui(create=False))
+
+    def test_headless(self):
+        result, = Sweep(headless, [{}], self.directory).run(verbose=False)
+        self.assertEqual(result["value"], ("1", True))
+
+    def test_run(self):
+        grid = [{"gx": 0.0}, {"gx": 1e-8}, {"fail": True}, {"crash": True}, {"sleep": 60}]
+        sweep = Sweep(scenario, grid, self.directory, timeout=20, processes=5)
+        results = sweep.run(verbose=False)
+        self.assertListEqual([result["status"] for result in results], ["done", "done", "error", "crashed", "timeout"])
+        done = results[0]
+        self.assertEqual(done["final"]["soma"]["cli"], done["value"])
+        self.assertEqual(len(done["traces"]["soma.cli"][1]), 10)
+        self.assertTrue(any(figure.endswith("cli.png") for figure in done["figures"]))
+        self.assertIn("ValueError", results[2]["error"])
+        # resume: only tasks that are not done are run again
+        self.assertEqual(len(sweep.pending()), 3)
+        mtime = os.path.getmtime(sweep.result_path(grid[0]))
+        sweep = Sweep(scenario, grid[:2] + [{"gx": 2e-8}], self.directory)
+        self.assertEqual(sweep.pending(), [{"gx": 2e-8}])
+        sweep.run(verbose=False)
+        self.assertEqual(os.path.getmtime(sweep.result_path(grid[0])), mtime)
+        self.assertEqual(sweep.results()[2]["status"], "done")
@@ -0,0 +1,151 @@
+from unittest import TestCase
+import numpy as np
+import simulator
+from diffusion import Diffusion
+from protocol import Protocol
+from topology import Topology, CONCENTRATIONS
+from test_engine import build_dendrite
+
+
+class TestTopology(TestCase):
+
+    def setUp(self):
+        self.new_simulator()
+
+    def new_simulator(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+
+    def tearDown(self):
+        self.sim.dispose()
+
+    def assert_conserved(self, before, after):
+        for var in CONCENTRATIONS:
+            self.assertAlmostEqual(after[var] / before[var], 1, places=12, msg=var)
+
+    def test_split(self):
+        """
+        A split keeps the amounts and the concentrations, and connects the new compartment
+        """
+        comps = build_dendrite(3)
+        self.sim.run(stop=1e-5, dt=1e-6, print_time=False)
+        topology = Topology()
+        before = topology.amounts()
+        L, cli = comps[2].L, comps[2].cli
+        new = topology.split(comps[2], fraction=0.25, edges=[topology.edge(comps[2], comps[3])])
+        self.assert_conserved(before, topology.amounts())
+        self.assertAlmostEqual(new.L, 0.25 * L)
+        self.assertAlmostEqual(comps[2].L, 0.75 * L)
+        self.assertEqual(new.cli, cli)
+        self.assertEqual(topology.compartments.index(new), topology.compartments.index(comps[2]) + 1)
+        self.assertIsNone(topology.edge(comps[2], comps[3]))
+        self.assertIsNotNone(topology.edge(new, comps[3]))
+        self.assertIsNotNone(topology.edge(new, comps[2]))
+        self.assertIn(new, self.sim.object_list())
+        with self.assertRaises(ValueError):
+            topology.split(comps[2], fraction=1)
+
+    def test_split_perturbations(self):
+        """
+        A compartment cut from a perturbed one does not have its perturbations
+        """
+        comps = build_dendrite(1)
+        topology = Topology()
+        new = topology.split(comps[0], fraction=0.5)
+        self.assertEqual((comps[0].gx, comps[0].jkccup, comps[0].dz), (1e-8, 1e-14, 1e-9))
+        self.assertEqual((new.gx, new.jkccup, new.dz), (0, None, 0))
+
+    def test_order(self):
+        """
+        Compartments are placed next to others (split and insert) or at a position (add), and removed
+        """
+        comps = build_dendrite(2)
+        topology = Topology()
+        before = topology.split(comps[1], fraction=0.5, name="before", after=False)
+        after = topology.split(comps[1], fraction=0.5, name="after")
+        last = topology.split(comps[2], fraction=0.5, name="last")
+        self.assertListEqual(list(topology.compartments), comps[:1] + [before, comps[1], after, comps[2], last])
+        middle = comps[0].copy("middle")
+        topology.insert(middle, after, comps[1])
+        first = comps[0].copy("first")
+        topology.add(first, 0)
+        topology.remove(comps[1])
+        expected = [first, comps[0], before, middle, after, comps[2], last]
+        self.assertListEqual(list(topology.compartments), expected)
+        self.assertEqual((topology.compartments[0], topology.compartments[-1]), (first, last))
+        self.assertEqual(len(topology.compartments), 7)
+        self.assertListEqual([topology.compartments.index(comp) for comp in expected], list(range(7)))
+        self.assertIs(topology.compartments.previous(after), middle)
+        self.assertNotIn(comps[1], topology.compartments)
+        with self.assertRaises(ValueError):
+            topology.compartments.index(comps[1])
+
+    def test_merge(self):
+        """
+        Merging a compartment into its neighbour keeps the amounts and removes it from the model
+        """
+        comps = build_dendrite(3)
+        topology = Topology()
+        new = topology.split(comps[1], fraction=0.5, edges=[topology.edge(comps[1], comps[2])])
+        self.sim.run(stop=2e-5, dt=1e-6, print_time=False)
+        before = topology.amounts()
+        edges = list(topology.edges[new])
+        topology.merge(new, comps[1])
+        self.assert_conserved(before, topology.amounts())
+        self.assertNotIn(new, topology.compartments)
+        self.assertNotIn(new, self.sim.object_list())
+        self.assertEqual([edge for edge in edges if edge in self.sim.object_list()], [topology.edge(comps[1], comps[2])])
+
+    def test_engines(self):
+        """
+        Changes between runs and within a run (with a protocol) give the same results with both engines
+        """
+        values = []
+        for engine in ("object", "vector"):
+            self.new_simulator()
+            comps = build_dendrite(3)
+            self.sim.use_engine(engine)
+            self.sim.run(stop=1e-5, dt=1e-6, print_time=False)
+            topology = Topology()
+            tip = topology.split(comps[0], fraction=0.25, name="tip", after=False)
+            mid = topology.split(comps[2], fraction=0.5, edges=[topology.edge(comps[2], comps[3])])
+            self.sim.run(continuefor=2e-5, dt=1e-6, print_time=False)
+            topology.merge(mid, comps[2])
+            topology.remove(tip)
+            protocol = Protocol().call(4e-5, lambda: topology.split(comps[1], 0.5, name="x",
+                                                                     edges=[topology.edge(comps[1], comps[2])]))
+            self.sim.run(continuefor=2e-5, dt=1e-6, print_time=False, protocol=protocol)
+            self.assertEqual([comp.name for comp in topology.compartments][1:4],
+                             [comps[1].name, "x", comps[2].name])
+            values.append([[comp.cli, comp.V, comp.w] for comp in topology.compartments])
+        np.testing.assert_allclose(values[1], values[0], rtol=1e-10)
+
+    def test_growth(self):
+        """
+        Many splits of a growing tip with the vector engine, whose arrays and network follow the model
+        """
+        comps = build_dendrite(1)
+        self.sim.use_engine("vector")
+        self.sim.run(stop=1e-6, dt=1e-6, print_time=False)
+        topology = Topology()
+        before = topology.amounts()
+        for i in range(300):
+            # cut the tip into 301 compartments of the same length
+            topology.split(topology.compartments[-1], fraction=1 - 1 / (301 - i), name="tip " + str(i))
+        self.assert_conserved(before, topology.amounts())
+        self.sim.run(continuefor=1e-9, dt=1e-9, print_time=False)
+        engine = self.sim.engine()
+        self.assertEqual(len(engine.state.compartments), len(topology.compartments))
+        self.assertEqual(len(engine.network.edges), len(topology.compartments) - 1)
+        before = topology.amounts()
+        for i in range(100):
+            topology.merge(topology.compartments[-1], topology.compartments[-2])
+        self.assert_conserved(before, topology.amounts())
+        self.assertEqual(len(engine.network.edges), len(topology.compartments) - 1)
+        # rows follow the edges moved into the rows of removed ones
+        self.assertListEqual([engine.network.row(edge) for edge in engine.network.edges],
+                             list(range(engine.network.n_edges)))
+        self.sim.run(continuefor=2e-9, dt=1e-9, print_time=False)
+        self.assertEqual(len(engine.state.compartments), len(topology.compartments))
+        self.assertTrue(np.all(np.isfinite([comp.V for comp in topology.compartments])))
+        self.assertIsInstance(topology.edges[comps[0]][0], Diffusion)
@@ -0,0 +1,69 @@
+from unittest import TestCase
+import shutil
+import tempfile
+import numpy as np
+import simulator
+from recorder import Recorder
+from trajectory import TrajectoryWriter, Trajectory
+from test_engine import build_dendrite
+
+
+class TestTrajectory(TestCase):
+    def setUp(self):
+        simulator.Simulator.dispose()
+        self.sim = simulator.Simulator(False)
+        self.comps = build_dendrite(2)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.sim.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_stream(self):
+        """
+        Samples written in chunks are read back as recorded in memory, across runs
+        """
+        path = self.directory + "/run"
+        writer = self.sim.write_trajectory(path, variables=("cli", "V"), chunk_size=64)
+        recorder = self.sim.register_recorder(Recorder())
+        for comp in self.comps:
+            recorder.add(comp, "cli")
+            recorder.add(comp, "V")
+        self.sim.run(stop=0.0003, dt=1e-6, engine="vector", print_time=False)
+        expected = recorder.buffer.view().copy()
+        # the trajectory can be read while it is being written
+        self.assertEqual(len(Trajectory(path)), 300)
+        self.assertLessEqual(len(writer.buffer.data), 64)
+        self.sim.run(continuefor=0.0001, dt=1e-6, print_time=False)
+        writer.close()
+        self.sim.run(continuefor=0.0001, dt=1e-6, print_time=False)
+        with Trajectory(path) as traj:
+            self.assertEqual(len(traj), 400)
+            self.assertListEqual(traj.names[:3], ["time", "reference.cli", "reference.V"])
+            np.testing.assert_allclose(traj.times, np.arange(400) * 1e-6, atol=1e-15)
+            self.assertIsInstance(traj.data, np.memmap)
+            np.testing.assert_array_equal(traj["dendrite right 2.V"][:300], expected[:, 5])
+            with self.assertRaises(KeyError):
+                traj["reference.ki"]
+
+    def test_channels_fixed(self):
+        writer = TrajectoryWriter(self.directory + "/run", variables=("cli",))
+        writer.record()
+        with self.assertRaises(RuntimeError):
+            writer.add(self.comps[0], "ki")
+        with self.assertRaises(ValueError):
+            TrajectoryWriter(self.directory + "/other", file_format="npz")
+
+    def test_duplicate_names(self):
+        """
+        Channels of compartments with the same name cannot be told apart, and are refused
+        """
+        writer = TrajectoryWriter(self.directory + "/run", variables=("cli",), compartments=self.comps[:1])
+        self.assertEqual(writer.add(self.comps[0], "cli"), 1)
+        self.comps[1].name = self.comps[0].name
+        with self.assertRaises(ValueError):
+            writer.add(self.comps[1], "cli")
+        writer.add(self.comps[1], "cli", name="second.cli")
+        self.assertListEqual(writer.names[-1:], ["second.cli"])
+        with self.assertRaises(ValueError):
+            TrajectoryWriter(self.directory + "/other", variables=("cli",))
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Changes to the structure of a model (compartments and the diffusion between them) during a simulation, e.g. a growing
+neurite, that keep the amount of every ion and impermeant anion.
+
+Compartments bound to the vector engine are added to its arrays, and removed by moving the last compartment into their
+place; diffusion edges are added to and removed from its network in the same way (see engine.CompartmentState and
+diffusion_network.DiffusionNetwork). Each change therefore costs O(1) (amortized) rather than rebuilding the arrays or
+the diffusion operator. Changes can be made between runs, or during a run with a protocol (see protocol.Protocol.call).
+The order of the compartments is a linked list (see CompartmentOrder), so that placing one next to another is O(1) too.
+"""
+import copy
+import time
+from collections.abc import Sequence
+import simulator
+import species
+from compartment import Compartment
+from diffusion import Diffusion
+
+# variables proportional to the size of a compartment (the rest, e.g. concentrations, are the same along it)
+EXTENSIVE = ("L", "w", "w2", "sa", "absox")
+# amounts (concentration * volume) kept when compartments are merged
+CONCENTRATIONS = ("nai", "ki", "cli", "xi", "xm", "xi_temp")
+# perturbations of a compartment (anion conductance, kcc2 ramp and charge change) that a compartment cut from it does
+# not have: their values in a new Compartment (as with Compartment.copy)
+PERTURBATIONS = {"gx": 0e-9, "jkccup": None, "dz": 0}
+
+
+def concentrations():
+    """
+    :return: CONCENTRATIONS and those of the species registered besides na, k and cl (see species.registry)
+    """
+    return CONCENTRATIONS + tuple(sp.internal for sp in species.registry.extra())
+
+
+class CompartmentOrder(Sequence):
+    """
+    Compartments in order, linked to the ones before and after them: a compartment is placed next to another or
+    removed in O(1). Positions (indexing other than of the ends, index) are of a list built again after changes.
+    """
+
+    def __init__(self, compartments=()):
+        self.__previous = {}
+        self.__next = {}
+        self.__first = None
+        self.__last = None
+        # compartments in order, and their positions (None after a change)
+        self.__list = None
+        self.__positions = None
+        for comp in compartments:
+            self.append(comp)
+
+    def __link(self, comp, previous, following):
+        if comp in self.__next:
+            raise ValueError("{} is already in the order".format(comp.name))
+        self.__previous[comp] = previous
+        self.__next[comp] = following
+        if previous is None:
+            self.__first = comp
+        else:
+            self.__next[previous] = comp
+        if following is None:
+            self.__last = comp
+        else:
+            self.__previous[following] = comp
+        self.__list = self.__positions = None
+
+    def append(self, comp):
+        self.__link(comp, self.__last, None)
+
+    def place_after(self, comp, anchor):
+        """
+        Place comp right after anchor
+        """
+        self.__link(comp, anchor, self.__next[anchor])
+
+    def place_before(self, comp, anchor):
+        """
+        Place comp right before anchor
+        """
+        self.__link(comp, self.__previous[anchor], anchor)
+
+    def next(self, comp):
+        """
+        :return: compartment after comp (None if it is last)
+        """
+        return self.__next[comp]
+
+    def previous(self, comp):
+        """
+        :return: compartment before comp (None if it is first)
+        """
+        return self.__previous[comp]
+
+    def remove(self, comp):
+        """
+        :raise ValueError if comp is not in the order
+        """
+        if comp not in self.__next:
+            raise ValueError("{} is not in the order".format(comp.name))
+        previous, following = self.__previous.pop(comp), self.__next.pop(comp)
+        if previous is None:
+            self.__first = following
+        else:
+            self.__next[previous] = following
+        if following is None:
+            self.__last = previous
+        else:
+            self.__previous[following] = previous
+        self.__list = self.__positions = None
+
+    def __ordered(self):
+        if self.__list is None:
+            self.__list = []
+            comp = self.__first
+            while comp is not None:
+                self.__list.append(comp)
+                comp = self.__next[comp]
+        return self.__list
+
+    def __getitem__(self, index):
+        if index == 0 and self.__first is not None:
+            return self.__first
+        if index == -1 and self.__last is not None:
+            return self.__last
+        return self.__ordered()[index]
+
+    def __len__(self):
+        return len(self.__next)
+
+    def __contains__(self, comp):
+        return comp in self.__next
+
+    def __iter__(self):
+        return iter(self.__ordered())
+
+    def index(self, comp):
+        """
+        :return: position of comp
+        :raise ValueError if comp is not in the order
+        """
+        if comp not in self.__next:
+            raise ValueError("{} is not in the order".format(comp.name))
+        if self.__positions is None:
+            self.__positions = {c: i for i, c in enumerate(self.__ordered())}
+        return self.__positions[comp]
+
+
+class Topology(object):
+    """
+    Compartments in order (e.g. along a neurite) and the Diffusion edges of each.
+
+    Usage:
+        topology = Topology()
+        tip = topology.split(comp[0], fraction=1/3, name="growth cone", after=False)
+        Colormap("dendrite", 0, topology.compartments)   # follows the compartments as they change
+    """
+
+    def __init__(self, compartments: list = None):
+        """
+        :param compartments: compartments in order (default: all registered compartments, in order of registration)
+        """
+        objects = simulator.Simulator.get_instance().object_list()
+        if compartments is None:
+            compartments = [obj for obj in objects if isinstance(obj, Compartment)]
+        self.compartments = CompartmentOrder(compartments)
+        # compartment -> list of its Diffusion edges
+        self.edges = {comp: [] for comp in self.compartments}
+        for obj in objects:
+            if isinstance(obj, Diffusion):
+                for comp in (obj.comp_a, obj.comp_b):
+                    self.edges.setdefault(comp, []).append(obj)
+
+    def neighbours(self, comp):
+        """
+        :return: compartments connected to comp by diffusion
+        """
+        return [edge.comp_b if edge.comp_a is comp else edge.comp_a for edge in self.edges.get(comp, [])]
+
+    def edge(self, comp_a, comp_b):
+        """
+        :return: Diffusion between comp_a and comp_b (None if they are not connected)
+        """
+        for edge in self.edges.get(comp_a, []):
+            if edge.comp_b is comp_b or edge.comp_a is comp_b:
+                return edge
+        return None
+
+    def connect(self, comp_a, comp_b, ions: dict = None):
+        """
+        Connect two compartments with a Diffusion.
+
+        :param ions: diffusion coefficients {ion: D} (default: those of an edge of comp_a or comp_b)
+        :return: Diffusion
+        :raise ValueError if ions is not given and neither compartment has an edge
+        """
+        if ions is None:
+            existing = self.edges.get(comp_a) or self.edges.get(comp_b)
+            if not existing:
+                raise ValueError("no diffusion coefficients for {}<-{}".format(comp_a.name, comp_b.name))
+            ions = existing[0].ions
+        edge = Diffusion(comp_a, comp_b, ions=dict(ions))
+        self.edges.setdefault(comp_a, []).append(edge)
+        self.edges.setdefault(comp_b, []).append(edge)
+        return edge
+
+    def disconnect(self, edge):
+        """
+        Remove a Diffusion from the model
+        """
+        self.edges[edge.comp_a].remove(edge)
+        self.edges[edge.comp_b].remove(edge)
+        simulator.Simulator.get_instance().unregister(edge)
+
+    def __move_edge(self, edge, old, new):
+        """
+        Reconnect the end of edge at compartment old to compartment new
+        """
+        if edge.comp_a is old:
+            edge.comp_a = new
+        else:
+            edge.comp_b = new
+        edge.name = edge.comp_a.name + '<-' + edge.comp_b.name
+        self.edges[old].remove(edge)
+        self.edges.setdefault(new, []).append(edge)
+        engine = simulator.Simulator.get_instance().engine()
+        if engine is not None and edge in engine.network:
+            if engine.is_network_edge(edge):
+                engine.network.reconnect(edge)
+            else:
+                engine.network.remove(edge)
+
+    def add(self, comp, position: int = None):
+        """
+        Add a (registered) compartment to the topology, e.g. before connecting it
+
+        :param position: index in compartments (default: at the end)
+        """
+        if position is None or position >= len(self.compartments):
+            self.compartments.append(comp)
+        else:
+            self.compartments.place_before(comp, self.compartments[position])
+        self.__bind(comp)
+
+    def __bind(self, comp):
+        """
+        Give comp its (empty) list of edges and bind it to the vector engine if there is one
+        """
+        self.edges.setdefault(comp, [])
+        engine = simulator.Simulator.get_instance().engine()
+        if engine is not None:
+            from engine import is_vectorizable, CompartmentView
+            if not isinstance(comp, CompartmentView) and is_vectorizable(comp):
+                engine.state.bind(comp)
+
+    def split(self, comp, fraction: float = 0.5, name: str = None, after: bool = True, edges: list = (),
+              ions: dict = None):
+        """
+        Cut a new compartment from comp, e.g. a new segment of a growing neurite.
+        The new compartment has a fraction of comp's length (and volume, surface area and impermeant anions) and the
+        same concentrations, so the amount of everything is conserved; it is connected to comp by a new Diffusion.
+        It does not have comp's perturbations (see PERTURBATIONS).
+
+        :param fraction: fraction of comp that becomes the new compartment (0 < fraction < 1)
+        :param name: name of the new compartment (default: comp's name with a suffix)
+        :param after: place the new compartment after comp in compartments (otherwise before)
+        :param edges: edges of comp that are moved to the new compartment (e.g. to the compartments beyond the cut)
+        :param ions: diffusion coefficients of the new Diffusion (default: those of an edge of comp)
+        :return: new compartment
+        :raise ValueError if fraction is not between 0 and 1
+        """
+        if not 0 < fraction < 1:
+            raise ValueError("fraction must be between 0 and 1 (not {})".format(fraction))
+        if ions is None and not self.edges.get(comp):
+            raise ValueError("no diffusion coefficients for the split of {}".format(comp.name))
+        # a copy of a view (see engine.CompartmentView) is a plain Compartment
+        new = copy.copy(comp)
+        new.name = name if name is not None else comp.name + " " + str(len(self.compartments))
+        new.unique_id = str(time.time())
+        for var in EXTENSIVE:
+            new[var] = comp[var] * fraction
+            comp[var] = comp[var] * (1 - fraction)
+        for var, value in PERTURBATIONS.items():
+            new[var] = value
+        simulator.Simulator.get_instance().register_compartment(new)
+        if after:
+            self.compartments.place_after(new, comp)
+        else:
+            self.compartments.place_before(new, comp)
+        self.__bind(new)
+        for edge in list(edges):
+            self.__move_edge(edge, comp, new)
+        self.connect(new, comp, ions)
+        return new
+
+    def insert(self, comp, comp_a, comp_b, ions: dict = None):
+        """
+        Place a (registered) compartment between two connected compartments: the edge between them is replaced by
+        edges from each of them to comp.
+
+        :param ions: diffusion coefficients of the new edges (default: those of the replaced edge)
+        :raise ValueError if comp_a and comp_b are not connected
+        """
+        edge = self.edge(comp_a, comp_b)
+        if edge is None:
+            raise ValueError("{} and {} are not connected".format(comp_a.name, comp_b.name))
+        ions = dict(edge.ions) if ions is None else ions
+        if self.compartments.next(comp_a) is comp_b:
+            self.compartments.place_after(comp, comp_a)
+            self.__bind(comp)
+        elif self.compartments.next(comp_b) is comp_a:
+            self.compartments.place_after(comp, comp_b)
+            self.__bind(comp)
+        else:
+            self.add(comp, max(self.compartments.index(comp_a), self.compartments.index(comp_b)))
+        self.disconnect(edge)
+        self.connect(comp_a, comp, ions)
+        self.connect(comp, comp_b, ions)
+
+    def remove(self, comp):
+        """
+        Remove a compartment and its edges from the model (its contents are lost, see merge)
+        """
+        for edge in list(self.edges.get(comp, [])):
+            self.disconnect(edge)
+        self.edges.pop(comp, None)
+        self.compartments.remove(comp)
+        simulator.Simulator.get_instance().unregister(comp)
+
+    def merge(self, comp, into):
+        """
+        Remove comp after adding its contents to a neighbouring compartment, the reverse of split: the length, volume
+        and surface area are summed and the concentrations become those of the combined amounts.
+        The other edges of comp are moved to into.
+        """
+        w = comp.w + into.w
+        for var in concentrations():
+            into[var] = (comp[var] * comp.w + into[var] * into.w) / w
+        for var in EXTENSIVE:
+            into[var] = comp[var] + into[var]
+        for edge in list(self.edges.get(comp, [])):
+            if edge.comp_a is into or edge.comp_b is into:
+                self.disconnect(edge)
+            else:
+                self.__move_edge(edge, comp, into)
+        self.remove(comp)
+
+    def amounts(self):
+        """
+        :return: dictionary of the total amount (mol) of each ion and impermeant anion in the compartments
+        """
+        return {var: sum(comp[var] * comp.w for comp in self.compartments) for var in concentrations()}
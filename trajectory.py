@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+Python 3.x targeted
+@author: Chris Currin & Kira Dusterwald
+
+Stream traces of a run to disk, and read them back lazily.
+
+Usage:
+    writer = sim.write_trajectory("runs/grow", variables=("cli", "w", "V"))
+    sim.run(...)
+    ...
+    writer.close()
+
+    from trajectory import Trajectory
+    traj = Trajectory("runs/grow")
+    plt.plot(traj.times, traj["soma.cli"])
+"""
+import json
+import os
+import numpy as np
+import simulator
+from recorder import Recorder
+
+# files of a trajectory stored as raw binary
+DATA_FILE = "data.bin"
+META_FILE = "meta.json"
+FORMATS = ("binary", "hdf5")
+
+
+class TrajectoryWriter(Recorder):
+    """
+    Recorder that streams its samples to disk in chunks, so that the memory used does not grow with the length of the
+    run. Registered with the Simulator, it records the time and the chosen variables of the compartments at every data
+    collection. Samples are kept when a run starts again from time 0 (time then moves back in the trajectory).
+
+    Formats:
+        "binary"    a directory with the samples as raw float64 (samples x channels, row by row) in data.bin and the
+                    names of the channels in meta.json. It can be memory-mapped (see Trajectory) even while written.
+        "hdf5"      an HDF5 file with a resizable dataset "traces" (requires h5py)
+    """
+
+    def __init__(self, path: str, variables=("nai", "ki", "cli", "xi", "V", "w"), compartments=None,
+                 chunk_size: int = 4096, file_format: str = "binary"):
+        """
+        :param path: directory (binary) or file (hdf5) to write; an existing trajectory there is replaced
+        :param variables: compartment variables written
+        :param compartments: compartments whose variables are written (default: all registered compartments)
+        :param chunk_size: number of samples kept in memory before they are written
+        :param file_format: "binary" or "hdf5"
+        :raise ValueError if file_format is not recognised
+        """
+        if file_format not in FORMATS:
+            raise ValueError("unknown trajectory format '{}' (expected one of {})".format(file_format, FORMATS))
+        super().__init__(capacity=chunk_size)
+        self.path = path
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+        self.names = []
+        self.written = 0
+        self.closed = False
+        self.__file = None
+        sim = simulator.Simulator.get_instance()
+        if compartments is None:
+            from compartment import Compartment
+            compartments = [obj for obj in sim.object_list() if isinstance(obj, Compartment)]
+        self.add(sim.time(), "time")
+        for comp in compartments:
+            for var in variables:
+                self.add(comp, var)
+
+    def add(self, obj, var, scale: float = 1.0, name: str = None):
+        """
+        Add a channel (see Recorder.add) before any sample is recorded.
+
+        :param name: name of the channel in the trajectory (default: "<object name>.<var>", or "time")
+        :raise RuntimeError if samples were already recorded
+        :raise ValueError if another channel has the same name (e.g. of compartments with the same name), as it could
+        not be told apart when read
+        """
+        if self.written or len(self.buffer):
+            raise RuntimeError("channels cannot be added to {} after recording started".format(self.path))
+        if name is None:
+            var_name = var if isinstance(var, str) else ".".join(str(v) for v in next(iter(var.items())))
+            name = var_name if not hasattr(obj, "name") else "{}.{}".format(obj.name, var_name)
+        if name in self.names:
+            other_obj, other_var, other_scale = self.channels[self.names.index(name)]
+            key = tuple(next(iter(var.items()))) if isinstance(var, dict) else var
+            if other_obj is not obj or other_var != key or other_scale != float(scale):
+                raise ValueError("{} has two channels named '{}' (give the compartments different names)".format(
+                    self.path, name))
+        count = len(self.channels)
+        j = super().add(obj, var, scale)
+        if len(self.channels) > count:
+            self.names.append(name)
+        return j
+
+    def record(self):
+        super().record()
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def __open(self):
+        meta = {"channels": self.names, "dtype": "float64"}
+        if self.file_format == "binary":
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, META_FILE), "w") as f:
+                json.dump(meta, f, indent=1)
+            self.__file = open(os.path.join(self.path, DATA_FILE), "wb")
+        else:
+            import h5py
+            self.__file = h5py.File(self.path, "w")
+            self.__file.create_dataset("traces", shape=(0, len(self.names)), maxshape=(None, len(self.names)),
+                                       dtype=np.float64, chunks=(min(self.chunk_size, 1024), len(self.names)))
+            self.__file.attrs["meta"] = json.dumps(meta)
+
+    def flush(self):
+        """
+        Write the samples in memory to disk
+        """
+        if self.__file is None:
+            self.__open()
+        samples = self.buffer.view()
+        if len(samples):
+            if self.file_format == "binary":
+                self.__file.write(np.ascontiguousarray(samples).tobytes())
+            else:
+                dataset = self.__file["traces"]
+                dataset.resize(self.written + len(samples), axis=0)
+                dataset[self.written:] = samples
+            self.written += len(samples)
+            self.buffer.clear()
+        self.__file.flush()
+
+    def clear(self):
+        """
+        Samples are not discarded when a run starts again from time 0, they are written.
+        """
+        self.flush()
+
+    def close(self):
+        """
+        Write the remaining samples, close the file and stop recording
+        """
+        if self.closed:
+            return
+        simulator.Simulator.unregister_recorder(self)
+        self.flush()
+        self.__file.close()
+        self.__file = None
+        self.buffer.close()
+        self.closed = True
+
+    def __len__(self):
+        return self.written + len(self.buffer)
+
+
+class Trajectory(object):
+    """
+    Traces written by a TrajectoryWriter, read lazily: the binary format is memory-mapped, so that opening a trajectory
+    does not read it, and reading a channel only reads its values.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: directory (binary) or file (hdf5) of the trajectory
+        """
+        self.path = path
+        self.__h5 = None
+        if os.path.isdir(path):
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+            self.names = meta["channels"]
+            data_path = os.path.join(path, DATA_FILE)
+            # samples completely written (the file may be growing)
+            n = os.path.getsize(data_path) // (8 * len(self.names))
+            if n:
+                self.data = np.memmap(data_path, dtype=np.float64, mode="r", shape=(n, len(self.names)))
+            else:
+                self.data = np.zeros((0, len(self.names)))
+        else:
+            import h5py
+            self.__h5 = h5py.File(path, "r")
+            self.names = json.loads(self.__h5.attrs["meta"])["channels"]
+            self.data = self.__h5["traces"]
+        self.__columns = {name: j for j, name in enumerate(self.names)}
+
+    @property
+    def times(self):
+        return self["time"]
+
+    def __getitem__(self, name: str):
+        """
+        :param name: channel, e.g. "time" or "soma.cli"
+        :return: values of the channel at every sample
+        """
+        try:
+            j = self.__columns[name]
+        except KeyError:
+            raise KeyError("'{}' is not in trajectory {} (channels: {})".format(name, self.path, self.names))
+        return self.data[:, j]
+
+    def __contains__(self, name):
+        return name in self.__columns
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def close(self):
+        if self.__h5 is not None:
+            self.__h5.close()
+            self.__h5 = None
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()